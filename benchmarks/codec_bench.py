@@ -0,0 +1,50 @@
+"""Compares JSON codecs on large API bodies, run with
+`python -m pytest benchmarks/codec_bench.py`."""
+
+import json
+
+import pytest
+
+from benchmarks import conftest
+from benchmarks import responses
+from google_objects.codec import model
+
+CODECS = ['json', 'ujson', 'orjson']
+
+FIXTURES = {
+    'value_range': lambda: responses.value_range(
+        'Sheet1', conftest.SHEET_ROWS, conftest.SHEET_COLUMNS
+    ),
+    'presentation': lambda: responses.presentation(
+        'deck', slides=conftest.DECK_SLIDES
+    ),
+}
+
+
+def _model(name):
+    try:
+        return model(name)
+    except ImportError:
+        pytest.skip('{} not installed'.format(name))
+
+
+@pytest.mark.parametrize('fixture', sorted(FIXTURES))
+@pytest.mark.parametrize('name', CODECS)
+def test_deserialize(benchmark, name, fixture):
+    codec_model = _model(name)
+    content = json.dumps(FIXTURES[fixture]()).encode()
+
+    body = benchmark.pedantic(
+        codec_model.deserialize, args=(content,), rounds=5
+    )
+    assert body == json.loads(content)
+
+
+@pytest.mark.parametrize('fixture', sorted(FIXTURES))
+@pytest.mark.parametrize('name', CODECS)
+def test_serialize(benchmark, name, fixture):
+    codec_model = _model(name)
+    body = FIXTURES[fixture]()
+
+    text = benchmark.pedantic(codec_model.serialize, args=(body,), rounds=5)
+    assert json.loads(text) == body
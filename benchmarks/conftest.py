@@ -0,0 +1,64 @@
+import pytest
+
+from benchmarks import responses
+from benchmarks.server import ReplayServer
+from google_objects.drive import DriveClient
+from google_objects.sheets import SheetsClient
+from google_objects.slides import SlidesClient
+
+SHEET_ROWS = responses.scaled(100000)
+SHEET_COLUMNS = 8
+DECK_SLIDES = responses.scaled(500)
+DRIVE_FILES = responses.scaled(50000)
+
+
+def _build(client_cls, url):
+    """Builds a client whose requests are sent to :url:"""
+    return client_cls.from_api_key('benchmark', base_url=url)
+
+
+@pytest.fixture(scope='session')
+def server():
+    server = ReplayServer()
+
+    # sheets
+    server.add('GET', '/v4/spreadsheets/big', responses.spreadsheet(
+        'big', rows=SHEET_ROWS + 1, columns=SHEET_COLUMNS
+    ))
+    server.add('GET', '/v4/spreadsheets/big/values/[^/]+', responses.value_range(
+        "'Sheet1'!A1:H{}".format(SHEET_ROWS + 1), SHEET_ROWS, SHEET_COLUMNS
+    ))
+    server.add('POST', '/v4/spreadsheets', responses.spreadsheet('created'))
+
+    # slides
+    server.add('GET', '/v1/presentations/deck',
+               responses.presentation('deck', slides=DECK_SLIDES))
+
+    # drive
+    def list_files(query, body):
+        start = int(query.get('pageToken', 0))
+        size = int(query.get('pageSize', 100))
+        return responses.file_page(start, size, DRIVE_FILES)
+
+    server.add('GET', '/drive/v3/files', list_files)
+    server.add('GET', '/drive/v3/files/[^/]+',
+               responses.file_page(0, 1, 1)['files'][0])
+
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def sheets(server):
+    return _build(SheetsClient, server.url)
+
+
+@pytest.fixture
+def slides(server):
+    return _build(SlidesClient, server.url)
+
+
+@pytest.fixture
+def drive(server):
+    return _build(DriveClient, server.url)
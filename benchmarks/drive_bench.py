@@ -0,0 +1,13 @@
+from benchmarks import conftest
+
+
+def test_get_file(benchmark, drive):
+    gfile = benchmark(drive.get_file, 'file_0')
+    assert gfile.id == 'file_0'
+
+
+def test_list_files(benchmark, drive):
+    files = benchmark.pedantic(
+        drive.list_files, args=('spreadsheet',), rounds=5
+    )
+    assert len(files) == conftest.DRIVE_FILES
@@ -0,0 +1,21 @@
+"""Measures the cost of importing google_objects in a fresh interpreter,
+run with `python -m pytest benchmarks`."""
+
+import sys
+import subprocess
+
+import pytest
+
+
+def _run(statement):
+    subprocess.check_call([sys.executable, '-c', statement])
+
+
+@pytest.mark.parametrize('statement', [
+    'pass',
+    'import google_objects',
+    'from google_objects import SlidesClient',
+    'import google_objects.cli',
+])
+def test_import(benchmark, statement):
+    benchmark.pedantic(_run, args=(statement,), rounds=10)
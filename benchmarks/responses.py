@@ -0,0 +1,90 @@
+"""Generators for API responses of realistic size."""
+
+import os
+
+# shrinks or grows every generated payload, e.g. BENCH_SCALE=0.01
+SCALE = float(os.getenv('BENCH_SCALE', '1'))
+
+
+def scaled(size):
+    return max(1, int(size * SCALE))
+
+
+def spreadsheet(spreadsheet_id, sheet_count=1, rows=1000, columns=26):
+    return {
+        'spreadsheetId': spreadsheet_id,
+        'properties': {'title': 'Benchmark Spreadsheet'},
+        'sheets': [{
+            'properties': {
+                'sheetId': i,
+                'title': 'Sheet{}'.format(i + 1),
+                'index': i,
+                'gridProperties': {'rowCount': rows, 'columnCount': columns}
+            }
+        } for i in range(sheet_count)],
+        'namedRanges': []
+    }
+
+
+def value_range(rng, rows, columns):
+    header = ['Column {}'.format(c) for c in range(columns)]
+    values = [header]
+    for r in range(rows):
+        values.append([
+            str(r * columns + c) if c % 2 else 'text {}-{}'.format(r, c)
+            for c in range(columns)
+        ])
+
+    return {'range': rng, 'majorDimension': 'ROWS', 'values': values}
+
+
+def _shape(object_id, text):
+    return {
+        'objectId': object_id,
+        'size': {'width': {'magnitude': 3000000, 'unit': 'EMU'},
+                 'height': {'magnitude': 3000000, 'unit': 'EMU'}},
+        'transform': {'scaleX': 1, 'scaleY': 1, 'unit': 'EMU'},
+        'shape': {
+            'shapeType': 'TEXT_BOX',
+            'text': {'textElements': [
+                {'endIndex': len(text), 'paragraphMarker': {'style': {}}},
+                {'endIndex': len(text),
+                 'textRun': {'content': text, 'style': {}}},
+            ]}
+        }
+    }
+
+
+def presentation(presentation_id, slides=100, elements=20):
+    return {
+        'presentationId': presentation_id,
+        'title': 'Benchmark Deck',
+        'slides': [{
+            'objectId': 'slide_{}'.format(s),
+            'pageElements': [
+                _shape('shape_{}_{}'.format(s, e), 'Text {} {}'.format(s, e))
+                for e in range(elements)
+            ]
+        } for s in range(slides)],
+        'masters': [],
+        'layouts': []
+    }
+
+
+def file_page(start, count, total):
+    """Returns a files.list page holding files [start, start + count)."""
+    end = min(start + count, total)
+    page = {
+        'kind': 'drive#fileList',
+        'incompleteSearch': False,
+        'files': [{
+            'kind': 'drive#file',
+            'id': 'file_{}'.format(i),
+            'name': 'File {}'.format(i),
+            'mimeType': 'application/vnd.google-apps.spreadsheet'
+        } for i in range(start, end)]
+    }
+    if end < total:
+        page['nextPageToken'] = str(end)
+
+    return page
@@ -0,0 +1,42 @@
+"""Local HTTP server replaying canned Google API responses, so that
+benchmarks exercise the full client stack without touching the network.
+"""
+
+import re
+import json
+
+from google_objects.testing import FakeGoogleAPI
+from google_objects.testing import _Media
+
+_JSON = {'Content-Type': 'application/json'}
+
+
+class ReplayServer(FakeGoogleAPI):
+
+    """Serves registered responses on localhost, through the
+    <FakeGoogleAPI> server but without its in-memory model.
+
+    Routes are matched on method and path regex, a route's response is
+    either JSON-serializable data, encoded once on registration, or a
+    callable receiving (query, body) and returning data.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.routes = []
+
+    def add(self, method, path, response):
+        """Registers :response: for requests matching :method: and
+        the :path: regular expression."""
+        if callable(response):
+            def handler(query, body, headers, *args):
+                return _Media(json.dumps(response(query, body)).encode(),
+                              headers=_JSON)
+        else:
+            media = _Media(json.dumps(response).encode(), headers=_JSON)
+
+            def handler(query, body, headers, *args):
+                return media
+
+        # raw routes, so that request bodies are not decoded
+        self.routes.append((method, re.compile(path + '$'), handler, True))
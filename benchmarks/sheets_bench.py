@@ -0,0 +1,44 @@
+import pytest
+
+from benchmarks import conftest
+from benchmarks import responses
+
+
+def test_get_spreadsheet(benchmark, sheets):
+    spreadsheet = benchmark(sheets.get_spreadsheet, 'big')
+    assert spreadsheet.id == 'big'
+
+
+def test_get_values(benchmark, sheets):
+    block = benchmark.pedantic(
+        sheets.get_values, args=('big', 'Sheet1'), rounds=5
+    )
+    assert len(block.values) == conftest.SHEET_ROWS + 1
+
+
+def test_dataframe(benchmark, sheets):
+    sheet = sheets.get_spreadsheet('big')['Sheet1']
+    frame = benchmark.pedantic(sheet.dataframe, rounds=5)
+    assert len(frame) == conftest.SHEET_ROWS
+
+
+def test_create_spreadsheet_from_dataframes(benchmark, sheets):
+    pandas = pytest.importorskip('pandas')
+
+    values = responses.value_range('Sheet1', conftest.SHEET_ROWS, 8)['values']
+    frame = pandas.DataFrame(values[1:], columns=values[0])
+
+    spreadsheet = benchmark.pedantic(
+        sheets.create_spreadsheet_from_dataframes, args=(frame,), rounds=5
+    )
+    assert spreadsheet.id == 'created'
+
+
+def test_to_arrow(benchmark, sheets):
+    pytest.importorskip('pyarrow')
+
+    sheet = sheets.get_spreadsheet('big')['Sheet1']
+    table = benchmark.pedantic(
+        sheet.to_arrow, kwargs={'window': conftest.SHEET_ROWS + 1}, rounds=5
+    )
+    assert table.num_rows == conftest.SHEET_ROWS
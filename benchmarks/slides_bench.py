@@ -0,0 +1,23 @@
+from benchmarks import conftest
+
+
+def test_get_presentation(benchmark, slides):
+    presentation = benchmark.pedantic(
+        slides.get_presentation, args=('deck',), rounds=5
+    )
+    assert len(presentation.slides()) == conftest.DECK_SLIDES
+
+
+def test_get_element_by_id(benchmark, slides):
+    presentation = slides.get_presentation('deck')
+    last = 'shape_{}_19'.format(conftest.DECK_SLIDES - 1)
+
+    element = benchmark(presentation.get_element_by_id, last)
+    assert element.id == last
+
+
+def test_elements(benchmark, slides):
+    presentation = slides.get_presentation('deck')
+
+    elements = benchmark(lambda: list(presentation.elements()))
+    assert len(elements) == conftest.DECK_SLIDES * 20
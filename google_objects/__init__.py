@@ -12,6 +12,30 @@ except ImportError:
 
 logging.getLogger(__name__).addHandler(NullHandler())
 
-from .drive import DriveClient
-from .sheets import SheetsClient
-from .slides import SlidesClient
+# clients are imported on first access, so that importing a single
+# client doesn't pay for the dependencies of the others
+_lazy_attributes = {
+    'DriveClient': 'drive',
+    'SheetsClient': 'sheets',
+    'SlidesClient': 'slides',
+}
+
+__all__ = list(_lazy_attributes)
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name)
+        )
+
+    import importlib
+    module = importlib.import_module('.' + _lazy_attributes[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+A1 Notation
+    parsing, formatting and arithmetic of Sheets ranges
+
+"""
+
+import re
+import functools
+import collections
+
+# columns run up to ZZZ
+_CELL = re.compile(r'^([A-Za-z]{0,3})(\d*)$')
+_R1C1 = re.compile(r'^[Rr](\d+)[Cc](\d+)$')
+
+_GRID_KEYS = ('startRowIndex', 'endRowIndex',
+              'startColumnIndex', 'endColumnIndex')
+
+
+@functools.lru_cache(maxsize=1024)
+def column_index(letters):
+    """Returns the 0-based index of column letters, 'A' is 0, 'AA' 26."""
+    if not letters.isalpha():
+        raise ValueError('Invalid column: {!r}'.format(letters))
+
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+@functools.lru_cache(maxsize=1024)
+def column_letters(index):
+    """Returns the letters of a 0-based column index, 26 is 'AA'."""
+    if index < 0:
+        raise ValueError('Invalid column index: {!r}'.format(index))
+
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(rem + 65) + letters
+    return letters
+
+
+def quote(title):
+    """Returns a sheet title quoted for use in a range."""
+    return "'{}'".format(title.replace("'", "''"))
+
+
+_GridRange = collections.namedtuple(
+    'GridRange', ['sheet', 'start_row', 'end_row', 'start_col', 'end_col']
+)
+
+
+class GridRange(_GridRange):
+
+    """Sheet title and 0-based, half-open row and column bounds of a
+    range, each None if unbounded, as in the API's GridRange. The sheet
+    is None for ranges without a sheet name.
+
+        >>> parse("'My Sheet'!B2:C")
+        GridRange(sheet='My Sheet', start_row=1, end_row=None,
+                  start_col=1, end_col=3)
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, sheet=None, start_row=None, end_row=None,
+                start_col=None, end_col=None):
+        return super().__new__(
+            cls, sheet, start_row, end_row, start_col, end_col
+        )
+
+    @classmethod
+    def from_grid(cls, grid, sheet=None):
+        """Returns the range of an API GridRange dict, whose sheetId
+        is replaced by the sheet title given."""
+        return cls(sheet, *(grid.get(key) for key in _GRID_KEYS))
+
+    def to_grid(self, sheet_id=None):
+        """Returns an API GridRange dict, omitting unbounded sides."""
+        grid = {key: value for key, value in zip(_GRID_KEYS, self[1:])
+                if value is not None}
+        if sheet_id is not None:
+            grid['sheetId'] = sheet_id
+        return grid
+
+    @property
+    def rows(self):
+        """Number of rows, None if unbounded."""
+        if self.end_row is None:
+            return None
+        return self.end_row - (self.start_row or 0)
+
+    @property
+    def columns(self):
+        """Number of columns, None if unbounded."""
+        if self.end_col is None:
+            return None
+        return self.end_col - (self.start_col or 0)
+
+    @property
+    def a1(self):
+        return format_a1(self)
+
+    @property
+    def r1c1(self):
+        return format_r1c1(self)
+
+    def __str__(self):
+        return self.a1
+
+    def __and__(self, other):
+        return intersection(self, other)
+
+    def __or__(self, other):
+        return union(self, other)
+
+    def chunks(self, size, height=None):
+        return split(self, size, height)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse(rng):
+    """Parses a range in A1 or R1C1 notation, e.g. 'Sheet1', 'A1',
+    "'Q1 ''21'!A2:C", 'B:B', '2:5' or 'Sheet1!R1C1:R10C3', into a
+    <GridRange>. A name that isn't a cell reference is a sheet title,
+    titles such as 'Q1' must be quoted.
+    """
+    if '!' in rng:
+        sheet, cells = rng.rsplit('!', 1)
+    elif _is_cells(rng):
+        sheet, cells = None, rng
+    else:
+        sheet, cells = rng, ''
+
+    if sheet and sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+
+    if not cells:
+        return GridRange(sheet)
+
+    start, _, end = cells.partition(':')
+    start_row, start_col = _parse_cell(start)
+    end_row, end_col = _parse_cell(end or start)
+
+    return GridRange(
+        sheet,
+        start_row - 1 if start_row else None,
+        end_row if end_row else None,
+        start_col - 1 if start_col else None,
+        end_col if end_col else None,
+    )
+
+
+def _is_cells(cells):
+    """True if cells is a cell, e.g. 'B2', or a range of cells."""
+    start, colon, end = cells.partition(':')
+    try:
+        parsed = [_parse_cell(each) for each in (start, end)]
+    except ValueError:
+        return False
+
+    if colon:
+        return (None, None) not in parsed
+    return None not in parsed[0]
+
+
+def _parse_cell(cell):
+    """Returns the 1-based (row, column) of a cell, None if absent."""
+    match = _R1C1.match(cell)
+    if match:
+        row, col = match.groups()
+        return int(row) if row else None, int(col) if col else None
+
+    match = _CELL.match(cell)
+    if not match:
+        raise ValueError('Invalid cell: {!r}'.format(cell))
+
+    col, row = match.groups()
+    return (int(row) if row else None,
+            column_index(col) + 1 if col else None)
+
+
+def format_a1(rng):
+    """Formats a <GridRange> in A1 notation, quoting the sheet title."""
+    sheet = quote(rng.sheet) + '!' if rng.sheet is not None else ''
+    start_row, end_row, start_col, end_col = rng[1:]
+
+    if (start_row, end_row, start_col, end_col) == (None,) * 4:
+        if rng.sheet is None:
+            raise ValueError('Range has neither sheet nor bounds.')
+        return sheet[:-1]
+
+    def cell(row, col):
+        return (column_letters(col) if col is not None else '') + \
+            (str(row) if row is not None else '')
+
+    # whole rows when columns are unbounded, which need a last row
+    if start_col is None and end_col is None:
+        if end_row is None:
+            raise ValueError('Range {!r} has no A1 notation.'.format(rng))
+        return '{}{}:{}'.format(sheet, (start_row or 0) + 1, end_row)
+
+    # whole columns when rows are unbounded
+    rows = start_row is not None or end_row is not None
+    start = cell((start_row or 0) + 1 if rows else None, start_col or 0)
+    end = cell(end_row, end_col - 1 if end_col is not None else None)
+    if not end:
+        raise ValueError('Range {!r} has no A1 notation.'.format(rng))
+    if end == start and end_row is not None:
+        return sheet + start
+    return '{}{}:{}'.format(sheet, start, end)
+
+
+def format_r1c1(rng):
+    """Formats a bounded <GridRange> in R1C1 notation, quoting the sheet
+    title."""
+    sheet = quote(rng.sheet) + '!' if rng.sheet is not None else ''
+    start_row, end_row, start_col, end_col = rng[1:]
+    if end_row is None or end_col is None:
+        raise ValueError('Range {!r} is unbounded.'.format(rng))
+
+    def cell(row, col):
+        return 'R{}C{}'.format(row, col)
+
+    start = cell((start_row or 0) + 1, (start_col or 0) + 1)
+    end = cell(end_row, end_col)
+    if end == start:
+        return sheet + start
+    return '{}{}:{}'.format(sheet, start, end)
+
+
+def _check_sheets(a, b):
+    if a.sheet != b.sheet:
+        raise ValueError(
+            'Ranges on different sheets: {!r}, {!r}'.format(a.sheet, b.sheet)
+        )
+
+
+def intersection(a, b):
+    """Returns the <GridRange> covered by both ranges, None if they
+    don't overlap."""
+    _check_sheets(a, b)
+
+    bounds = []
+    for start, end in ((1, 2), (3, 4)):
+        low = max(a[start] or 0, b[start] or 0)
+        ends = [each for each in (a[end], b[end]) if each is not None]
+        high = min(ends) if ends else None
+        if high is not None and high <= low:
+            return None
+        starts = (a[start], b[start])
+        bounds += [None if starts == (None, None) else low, high]
+
+    return GridRange(a.sheet, *bounds)
+
+
+def union(a, b):
+    """Returns the smallest <GridRange> covering both ranges."""
+    _check_sheets(a, b)
+
+    bounds = []
+    for start, end in ((1, 2), (3, 4)):
+        starts = (a[start], b[start])
+        low = None if None in starts else min(starts)
+        ends = (a[end], b[end])
+        high = None if None in ends else max(ends)
+        bounds += [low, high]
+
+    return GridRange(a.sheet, *bounds)
+
+
+def split(rng, size, height=None):
+    """Returns consecutive <GridRange>s of at most size rows covering
+    rng, whose end row, if unbounded, is taken from height, e.g. the
+    sheet's rowCount."""
+    if isinstance(rng, str):
+        rng = parse(rng)
+
+    end = rng.end_row if rng.end_row is not None else height
+    if end is None:
+        raise ValueError('Height required to split an unbounded range.')
+
+    return [rng._replace(start_row=start, end_row=min(start + size, end))
+            for start in range(rng.start_row or 0, end, size)]
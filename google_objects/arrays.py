@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Array Blocks
+    NumPy backed value ranges, imported on first use
+
+"""
+
+import logging
+import itertools
+
+import numpy
+
+from google_objects import a1
+from google_objects.sheets import Block
+
+log = logging.getLogger(__name__)
+
+# Sheets holds every number as a double
+_NUMBERS = {int, float}
+
+
+def _column(values):
+    """Returns a <numpy.ma.MaskedArray> of unformatted cell values,
+    float64 for numbers, bool for booleans, object otherwise, empty
+    cells masked."""
+    kinds = set(map(type, values))
+    if str in kinds and \
+            not any(value for value in values if type(value) is str):
+        # empty cells among numbers or booleans
+        kinds.discard(str)
+    mask = numpy.fromiter((value == '' for value in values), bool,
+                          len(values))
+
+    if kinds and (kinds <= _NUMBERS or kinds == {bool}):
+        dtype = bool if kinds == {bool} else numpy.float64
+        fill = dtype(0)
+        data = numpy.array(
+            [fill if value == '' else value for value in values]
+            if mask.any() else values, dtype=dtype
+        )
+    else:
+        data = numpy.empty(len(values), dtype=object)
+        data[:] = values
+
+    return numpy.ma.MaskedArray(data, mask=mask)
+
+
+def _bounds(key, length):
+    """Returns (start, stop) of an int or step 1 slice key."""
+    if isinstance(key, slice):
+        start, stop, step = key.indices(length)
+        if step != 1:
+            raise ValueError('Only contiguous slices are supported.')
+        return start, max(start, stop)
+
+    index = key + length if key < 0 else key
+    if not 0 <= index < length:
+        raise IndexError('Index {} out of range.'.format(key))
+    return index, index + 1
+
+
+class ArrayBlock(Block):
+
+    """A <Block> holding its values as one masked NumPy array per
+    column: numbers as float64, booleans as bool and other values as
+    objects, with empty cells masked. Read unformatted values, as
+    `SheetsClient.get_array` does, for typed columns.
+
+    Slicing returns a block of views onto the same arrays, covering
+    the matching part of the range, so in-place changes are shared:
+
+        block = client.get_array(spreadsheet_id, 'Sales!A1:D', header=True)
+        block.column('price')[:] *= 1.2
+        block[:100].update()
+
+    :header: holds the first row as column labels, outside the arrays,
+             views keep the labels but only cover rows of values
+    """
+
+    def __init__(self, client=None, spreadsheet=None, header=False,
+                 **kwargs):
+        rows = kwargs.pop('values', [])
+        super().__init__(client, spreadsheet, **kwargs)
+
+        self.header = None
+        self.__with_header = bool(header)
+        if header:
+            self.header = list(rows[0]) if rows else []
+            rows = rows[1:]
+
+        width = max([len(row) for row in rows] or [0])
+        if self.header is not None:
+            width = max(width, len(self.header))
+        padded = itertools.zip_longest(*rows, fillvalue='')
+        self.columns = [_column(list(column)) for column in padded]
+        self.columns += [_column([''] * len(rows))
+                         for _ in range(width - len(self.columns))]
+        self.__height = len(rows)
+
+    @classmethod
+    def from_block(cls, block, header=False):
+        """Returns an <ArrayBlock> of a <Block>'s values."""
+        return cls(block.client, block.spreadsheet, header=header,
+                   **block.data)
+
+    @property
+    def shape(self):
+        """(rows, columns), without the header row."""
+        return self.__height, len(self.columns)
+
+    def __len__(self):
+        return self.__height
+
+    def column(self, key):
+        """Returns the masked array of a column, by 0-based index or
+        header label."""
+        if isinstance(key, str):
+            if self.header is None or key not in self.header:
+                raise KeyError(key)
+            key = self.header.index(key)
+        return self.columns[key]
+
+    def set_column(self, key, values):
+        """Writes values into a column, masking None, and NaN in
+        number columns."""
+        column = self.column(key)
+        data = numpy.empty(len(column), dtype=column.dtype)
+        if column.dtype.kind == 'f':
+            data[:] = [numpy.nan if value is None else value
+                       for value in values]
+            column[:] = numpy.ma.masked_invalid(data)
+        else:
+            data[:] = values
+            column[:] = numpy.ma.MaskedArray(data, numpy.equal(data, None))
+
+    def __getitem__(self, key):
+        """Returns a view of rows, or of (rows, columns), as an
+        <ArrayBlock> over the matching part of the range."""
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        row_start, row_stop = _bounds(rows, self.__height)
+        col_start, col_stop = _bounds(cols, len(self.columns))
+
+        view = ArrayBlock.__new__(ArrayBlock)
+        Block.__init__(view, self.client, self.spreadsheet, **self.data)
+        view.columns = [column[row_start:row_stop]
+                        for column in self.columns[col_start:col_stop]]
+        view.header = self.header[col_start:col_stop] \
+            if self.header is not None else None
+        view._ArrayBlock__height = row_stop - row_start
+        view._ArrayBlock__with_header = False
+
+        if 'range' in self.data:
+            rng = a1.parse(self.range)
+            # the header row precedes the first row of values
+            first_row = (rng.start_row or 0) + self.__with_header
+            start_col = rng.start_col or 0
+            view.data = dict(self.data, range=a1.GridRange(
+                rng.sheet,
+                first_row + row_start, first_row + row_stop,
+                start_col + col_start, start_col + col_stop
+            ).a1)
+        return view
+
+    def __setitem__(self, key, item):
+        raise TypeError('Use column() or set_column() to change values.')
+
+    def __iter__(self):
+        return self.yield_rows()
+
+    @property
+    def values(self):
+        """Rows of values as sent by `update`, masked cells as ''."""
+        columns = []
+        for column in self.columns:
+            values = column.data.tolist()
+            for index in numpy.flatnonzero(numpy.ma.getmaskarray(column)):
+                values[index] = ''
+            columns.append(values)
+
+        rows = [list(row) for row in zip(*columns)] if columns \
+            else [[] for _ in range(self.__height)]
+        if self.__with_header:
+            rows.insert(0, list(self.header))
+        return rows
+
+    def yield_rows(self):
+        return iter(self.values)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays and masks."""
+        return sum(column.data.nbytes + numpy.ma.getmaskarray(column).nbytes
+                   for column in self.columns)
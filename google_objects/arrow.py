@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Arrow helpers for Sheets reads and writes
+    imported on first use, as they depend on pyarrow
+
+"""
+
+import logging
+import itertools
+
+import pyarrow
+import pyarrow.compute
+
+from google_objects import codec
+from google_objects.sheets import _typed_cell
+
+log = logging.getLogger(__name__)
+
+# Sheets holds every number as a double
+_NUMBERS = {int, float}
+
+
+def _column_type(kinds):
+    """Returns the Arrow type of a column holding values of kinds,
+    string if they are mixed or all empty."""
+    kinds = kinds - {type(None)}
+    if kinds == {bool}:
+        return pyarrow.bool_()
+    if kinds and kinds <= _NUMBERS:
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def _column(values, arrow_type=None):
+    """Returns a <pyarrow.Array> of unformatted cell values, empty
+    strings as nulls, its type inferred if not given."""
+    kinds = set(map(type, values))
+    if str in kinds and len(kinds - {str, type(None)}) and \
+            not any(value for value in values if type(value) is str):
+        # empty cells among numbers or booleans
+        values = [None if value == '' else value for value in values]
+        kinds.discard(str)
+
+    if arrow_type is None:
+        arrow_type = _column_type(kinds)
+    if arrow_type == pyarrow.string() and kinds - {str, type(None)}:
+        values = [value if value is None or type(value) is str
+                  else str(value) for value in values]
+
+    try:
+        array = pyarrow.array(values, type=arrow_type)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+        raise ValueError(
+            'Values don\'t fit {}, pass a schema: {}'.format(arrow_type, e)
+        )
+
+    if arrow_type == pyarrow.string():
+        array = pyarrow.compute.if_else(
+            pyarrow.compute.equal(array, ''), None, array
+        )
+    return array
+
+
+def record_batch(rows, names, schema=None):
+    """Returns a <pyarrow.RecordBatch> of rows of unformatted values,
+    in the schema's types or, without one, numbers as float64,
+    booleans as bool and others as string."""
+    width = len(names)
+    columns = list(itertools.zip_longest(*rows))[:width]
+    columns += [(None,) * len(rows)] * (width - len(columns))
+
+    types = [field.type for field in schema] if schema is not None \
+        else [None] * width
+    arrays = [_column(list(column), arrow_type)
+              for column, arrow_type in zip(columns, types)]
+    if schema is None:
+        schema = pyarrow.schema([
+            (name, array.type) for name, array in zip(names, arrays)
+        ])
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _batches(data):
+    """Yields the record batches of a Table, RecordBatch, reader or
+    iterable of batches."""
+    if isinstance(data, pyarrow.Table):
+        yield from data.to_batches()
+    elif isinstance(data, pyarrow.RecordBatch):
+        yield data
+    else:
+        yield from data
+
+
+def _values(array):
+    """Returns the Python values of an array, as strings unless they
+    are numbers, booleans or strings already, nulls as None."""
+    kind = array.type
+    if pyarrow.types.is_integer(kind) or pyarrow.types.is_floating(kind) \
+            or pyarrow.types.is_boolean(kind) or pyarrow.types.is_string(kind):
+        return array.to_pylist()
+    return [None if value is None else str(value)
+            for value in array.to_pylist()]
+
+
+def _row_data(rows):
+    return [{'values': [_typed_cell(value) for value in row]}
+            for row in rows]
+
+
+def row_chunks(data, max_bytes, header=True):
+    """Yields (rows, RowData) chunks whose JSON is at most max_bytes,
+    cells typed by column: numbers as numberValue, booleans as
+    boolValue and others as stringValue, taken literally, with nulls
+    as empty cells.
+
+    :data: <pyarrow.Table>, RecordBatch or iterable of RecordBatches
+    :header: write the column names as the first row
+    """
+    step = None
+    for batch in _batches(data):
+        if header:
+            yield 1, _row_data([batch.schema.names])
+            header = False
+
+        if step is None:
+            # estimate rows per chunk from the batch's in-memory size
+            per_row = max(1, batch.nbytes // max(1, batch.num_rows))
+            step = max(1, max_bytes // (4 * per_row))
+        offset = 0
+        while offset < batch.num_rows:
+            chunk = batch.slice(offset, step)
+            rows = _row_data(zip(*[_values(column)
+                                   for column in chunk.columns]))
+            if len(codec.dumps(rows)) > max_bytes and chunk.num_rows > 1:
+                step = max(1, step // 2)
+                continue
+            yield chunk.num_rows, rows
+            offset += chunk.num_rows
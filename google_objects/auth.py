@@ -1,8 +1,5 @@
 import os
 
-import httplib2
-# from apiclient import discovery
-
 _SCOPES = {
     'drive',
     'spreadsheets',
@@ -14,8 +11,8 @@ def _gen_scopes(scopes):
     return ['https://www.googleapis.com/auth/' + each for each in scopes]
 
 
-def service_account_creds(creds_path, delegated_user=None, scope=None):
-    """Return httplib2 client, used for discovery.build usage."""
+def service_account_credentials(creds_path, delegated_user=None, scope=None):
+    """Return service account credentials, delegated to the given user."""
     from oauth2client.service_account import ServiceAccountCredentials
 
     # use env vars if parameters aren't given
@@ -33,4 +30,18 @@ def service_account_creds(creds_path, delegated_user=None, scope=None):
     if delegated_user:
         creds = creds.create_delegated(delegated_user)
 
+    return creds
+
+
+def authorized_http(creds):
+    """Return a new httplib2 client authorized by creds, httplib2
+    clients aren't thread-safe so each thread needs its own."""
+    import httplib2
+
     return creds.authorize(httplib2.Http())
+
+
+def service_account_creds(creds_path, delegated_user=None, scope=None):
+    """Return httplib2 client, used for discovery.build usage."""
+    creds = service_account_credentials(creds_path, delegated_user, scope)
+    return authorized_http(creds)
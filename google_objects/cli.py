@@ -2,17 +2,101 @@
 
 import os
 import sys
+import csv
 import json
 import logging
-
-import fire
-import pandas as pd
+import itertools
 
 from google_objects.sheets import SheetsClient
 
 log = logging.getLogger(__name__)
 
 
+def _sniff_format(line):
+    """Guesses the input format from its first non-empty line."""
+    stripped = line.strip()
+    if stripped.startswith('['):
+        return 'json'
+
+    if stripped.startswith('{'):
+        try:
+            record = json.loads(stripped)
+        except ValueError:
+            # object spanning several lines, a plain JSON document
+            return 'json'
+
+        return 'json' if list(record) == ['records'] else 'ndjson'
+
+    return 'csv'
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _records_to_rows(records, header=None):
+    """Yields a header row followed by one row per record, the header
+    being taken from the first record if not given.
+
+    Raises ValueError on a record with keys missing from the header,
+    as a streamed header cannot grow once sent.
+    """
+    records = iter(records)
+    if header is None:
+        first = next(records, None)
+        if first is None:
+            return
+        header = list(first)
+        records = itertools.chain([first], records)
+
+    yield header
+    columns = set(header)
+    for number, record in enumerate(records, 1):
+        unknown = [key for key in record if key not in columns]
+        if unknown:
+            raise ValueError('record {} has keys missing from the header '
+                             '{}: {}'.format(number, header, unknown))
+        yield [_cell(record.get(key)) for key in header]
+
+
+def _iter_rows(stream, input_format=None):
+    """Parses a stream of CSV, NDJSON or JSON records incrementally,
+    yielding the header row followed by data rows.
+
+    :stream: file-like object opened in text mode
+    :input_format: one of 'csv', 'ndjson' or 'json', sniffed if omitted
+
+    """
+    first = stream.readline()
+    while first and not first.strip():
+        first = stream.readline()
+
+    lines = itertools.chain([first], stream)
+    input_format = input_format or _sniff_format(first)
+
+    if input_format == 'csv':
+        return csv.reader(lines)
+
+    if input_format == 'ndjson':
+        records = (json.loads(line) for line in lines if line.strip())
+        return _records_to_rows(records)
+
+    # a single JSON document has to be loaded whole
+    records = json.loads(''.join(lines))
+    if 'records' in records:
+        records = records['records']
+
+    header = []
+    for record in records:
+        header.extend(key for key in record if key not in header)
+
+    return _records_to_rows(records, header)
+
+
 class SheetsCLI(object):
 
     """Command line tool for fetching tabular data
@@ -41,33 +125,41 @@ class SheetsCLI(object):
         #  sys.stdout.write(dataframe.to_json(orient='records'))
         sys.stdout.write(json.dumps(output))
 
-    def create_spreadsheet(self, file_path=None, user=None):
-        """Create a new Google Spreadsheet.
+    def create_spreadsheet(self, file_path=None, user=None,
+                           input_format=None, chunk_size=1000):
+        """Create a new Google Spreadsheet from CSV, NDJSON or JSON records,
+        streamed into the spreadsheet as they are read.
 
-        :file_name: JSON File name
+        :file_path: input file, read from STDIN if omitted
+        :input_format: one of 'csv', 'ndjson' or 'json', sniffed if omitted
+        :chunk_size: number of rows sent per append request
         :returns: URL of newly created Google Sheet.
 
         """
         client = SheetsClient.from_service_account(user=user)
+        stream = open(file_path, 'r') if file_path else sys.stdin
 
-        if file_path:
-            with open(file_path, 'r') as f:
-                json_data = f.read()
-        else:
-            json_data = sys.stdin.read()
-
-        input_data = json.loads(json_data)
-        if 'records' in input_data:
-            input_data = input_data['records']
-
-        df = pd.DataFrame(input_data)
         try:
-            spreadsheet = client.create_spreadsheet_from_dataframe(df)
+            rows = _iter_rows(stream, input_format)
+            spreadsheet = client.create_spreadsheet_from_rows(
+                rows, chunk_size=chunk_size
+            )
             sys.stdout.write(spreadsheet.url)
         except Exception as e:
-            sys.stdout.write(e)
+            sys.stderr.write(str(e))
+            # rows failing after creation leave a partial spreadsheet
+            partial = getattr(e, 'spreadsheet', None)
+            if partial is not None:
+                sys.stderr.write('\nPartially written spreadsheet: {}'.format(
+                    partial.url
+                ))
             sys.exit(1)
+        finally:
+            if file_path:
+                stream.close()
 
 
 def main():
+    import fire
+
     fire.Fire(SheetsCLI)
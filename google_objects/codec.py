@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+JSON Codecs
+    the fastest available JSON library, for API bodies and payload sizing
+
+"""
+
+import json
+import logging
+import functools
+
+log = logging.getLogger(__name__)
+
+# tried in order when no codec is named
+PREFERENCE = ('orjson', 'ujson', 'json')
+
+
+class Codec(object):
+
+    """Encodes objects to JSON text and decodes JSON text or bytes.
+
+    :name: name of the JSON library
+    :dumps: callable returning a str
+    :loads: callable accepting a str or bytes
+    """
+
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return '<Codec {}>'.format(self.name)
+
+
+def _orjson():
+    import orjson
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        try:
+            return orjson.dumps(obj, option=option).decode('utf-8')
+        except TypeError:
+            # e.g. integers beyond 64 bits, which json handles
+            return json.dumps(obj)
+
+    return Codec('orjson', dumps, orjson.loads)
+
+
+def _ujson():
+    import ujson
+
+    dumps = functools.partial(
+        ujson.dumps, ensure_ascii=False, escape_forward_slashes=False
+    )
+    return Codec('ujson', dumps, ujson.loads)
+
+
+def _json():
+    return Codec('json', json.dumps, json.loads)
+
+
+_CODECS = {'orjson': _orjson, 'ujson': _ujson, 'json': _json}
+
+
+@functools.lru_cache(maxsize=None)
+def get_codec(name=None):
+    """Returns the named <Codec>, or the first importable one of
+    PREFERENCE, raises ImportError if a named library is missing."""
+
+    if name is not None:
+        if name not in _CODECS:
+            raise ValueError('Unknown JSON codec: {!r}'.format(name))
+        return _CODECS[name]()
+
+    for each in PREFERENCE:
+        try:
+            return _CODECS[each]()
+        except ImportError:
+            continue
+
+
+def dumps(obj):
+    """Encodes obj with the fastest available codec."""
+    return get_codec().dumps(obj)
+
+
+def loads(data):
+    """Decodes JSON text or bytes with the fastest available codec."""
+    return get_codec().loads(data)
+
+
+@functools.lru_cache(maxsize=None)
+def model(name=None):
+    """Returns a googleapiclient JsonModel serializing request and
+    deserializing response bodies with the named, or fastest, codec,
+    passed as the `model` of a discovery Resource."""
+    from googleapiclient.model import JsonModel
+
+    codec = get_codec(name)
+
+    class CodecModel(JsonModel):
+
+        def serialize(self, body_value):
+            if isinstance(body_value, dict) and 'data' not in body_value \
+                    and self._data_wrapper:
+                body_value = {'data': body_value}
+            return codec.dumps(body_value)
+
+        def deserialize(self, content):
+            try:
+                body = codec.loads(content)
+            except ValueError:
+                # not JSON, returned as text like JsonModel does
+                if isinstance(content, bytes):
+                    content = content.decode('utf-8')
+                return content
+
+            if self._data_wrapper and 'data' in body:
+                body = body['data']
+            return body
+
+    CodecModel.__name__ = CodecModel.__qualname__ = \
+        codec.name.capitalize() + 'Model'
+    return CodecModel()
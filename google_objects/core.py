@@ -1,11 +1,28 @@
 # -*- coding: utf-8 -*-
 
 import os
+import copy
+import json
+import time
+import socket
 import logging
+import weakref
+import threading
+import functools
+import contextlib
+import collections
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 
-from apiclient import discovery
-
-from google_objects.auth import service_account_creds
+from google_objects.auth import authorized_http
+from google_objects.auth import service_account_credentials
+from google_objects.codec import model as codec_model
+from google_objects.limits import AdaptiveExecutor
+from google_objects.limits import AdaptiveLimit
+from google_objects.limits import throttled
+from google_objects.transport import GzipHttp
+from google_objects.transport import TransportStats
 
 log = logging.getLogger(__name__)
 
@@ -13,6 +30,13 @@ log = logging.getLogger(__name__)
 ENV_API_KEY = 'GOOGLE_API_KEY'
 ENV_SERVICE_ACCOUNT = 'GOOGLE_SERVICE_ACCOUNT_PATH'
 ENV_DELEGATED_USER = 'GOOGLE_DELEGATED_USER'
+ENV_BASE_URL = 'GOOGLE_API_BASE_URL'
+
+
+class DeadlineExceeded(TimeoutError):
+
+    """Raised when a call outlives its deadline, the request is
+    abandoned, though a write may still have been applied"""
 
 
 class GoogleClient(object):
@@ -21,17 +45,426 @@ class GoogleClient(object):
     and build Resource objects. Responsible for permissions
     as well.
 
+    Clients built by the `from_*` constructors hold a resource factory
+    and build one Resource per thread on first use, as the underlying
+    httplib2 client isn't thread-safe, so a single client can be shared
+    by many threads, see `map`.
+
     """
 
     service = None
     version = None
     scope = {}
 
-    def __init__(self, resource=None):
-        self.resource = resource
+    # requests per batch HTTP request, Drive allows at most 100
+    batch_size = 100
+
+    # gzip JSON request bodies of at least this many bytes, None to
+    # send them as is, see <google_objects.transport.GzipHttp>
+    compress_min_size = None
+
+    # JSON library of request and response bodies, e.g. 'orjson', the
+    # fastest available one if None, see <google_objects.codec>
+    codec = None
+
+    # seconds each call may take, None for no limit, see `deadline`
+    call_timeout = None
+
+    # resend idempotent reads still unanswered after the hedge_percentile
+    # latency of their method, once hedge_samples latencies are known
+    hedge = False
+    hedge_percentile = 95
+    hedge_samples = 20
+
+    # threads running calls bounded by a deadline or hedged
+    call_workers = 8
+
+    # concurrent identical idempotent reads share one request, off by
+    # default as a read made after a write could join one sent before
+    coalesce = False
+
+    # bounds of the calls in flight, adapted to quota feedback and
+    # shared by clients of the same credentials, see <AdaptiveLimit>;
+    # it holds calls made by `executor` tasks, and every call if
+    # adaptive is set
+    adaptive = False
+    initial_concurrency = 8
+    max_concurrency = 32
+
+    def __init__(self, resource=None, factory=None, stats=None,
+                 concurrency=None):
+        self._resource = resource
+        self._factory = factory
+        self._local = threading.local()
+        self.stats = stats
+        self.concurrency = concurrency or self._concurrency()
+        self.latencies = LatencyWindow()
+        self.hedged_count = 0
+        self.coalesced_count = 0
+        self.__flights = {}
+        self.__executor = None
+        self.__finalizer = None
+        self.__lock = threading.Lock()
+
+    @property
+    def resource(self):
+        """Discovery Resource owned by the calling thread."""
+        if self._factory is None:
+            return self._resource
+
+        resource = getattr(self._local, 'resource', None)
+        if resource is None:
+            resource = self._local.resource = _CachedResource(self._factory())
+
+        return resource
+
+    @contextlib.contextmanager
+    def deadline(self, seconds):
+        """Bounds the time of every call made within the context by the
+        calling thread, or by `map` and `imap` workers it starts, raising
+        <DeadlineExceeded> once seconds have passed. Nested deadlines
+        can only shorten the outer one:
+
+            with client.deadline(30):
+                spreadsheet = client.get_spreadsheet(spreadsheet_id)
+                blocks = client.map(read, ranges)
+        """
+        expires = time.monotonic() + seconds
+        previous = getattr(self._local, 'expires', None)
+        if previous is not None:
+            expires = min(expires, previous)
+
+        self._local.expires = expires
+        try:
+            yield expires
+        finally:
+            self._local.expires = previous
+
+    def _expires(self):
+        """Returns the monotonic time the next call must end by, None
+        if unbounded, raises DeadlineExceeded if it has passed."""
+        expires = getattr(self._local, 'expires', None)
+        if self.call_timeout is not None:
+            call_expires = time.monotonic() + self.call_timeout
+            expires = call_expires if expires is None \
+                else min(expires, call_expires)
+
+        if expires is not None and expires <= time.monotonic():
+            raise DeadlineExceeded('Deadline exceeded.')
+        return expires
+
+    def _execute(self, request, idempotent=None):
+        """Executes an HttpRequest within the current deadline. If it
+        is idempotent, by default if it is a GET, it is hedged when hedge
+        is set, and shares the response of an identical request already
+        in flight when coalesce is set.
+        """
+        if idempotent is None:
+            idempotent = request.method == 'GET'
+
+        expires = self._expires()
+        if not (self.coalesce and idempotent):
+            return self.__send(request, idempotent, expires)
+
+        # ranged media reads differ only by their range header
+        key = (request.method, request.uri, request.headers.get('range'))
+        with self.__lock:
+            flight = self.__flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.__flights[key] = _Flight()
+            else:
+                self.coalesced_count += 1
+
+        if not leader:
+            try:
+                return flight.wait(expires)
+            except _LeaderDeadline:
+                # the leader's own deadline, this caller's may be longer
+                return self.__send(request, idempotent, expires)
+
+        try:
+            response = self.__send(request, idempotent, expires)
+            # a copy kept apart, as the caller may change its response
+            # while waiting callers copy the shared one
+            flight.response = copy.deepcopy(response)
+            return response
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__flights[key]
+            flight.done.set()
+
+    def __send(self, request, idempotent, expires):
+        """Sends a request, holding a concurrency slot if adaptive or
+        within an `executor` task, reporting its latency, or its
+        throttling, to the limit."""
+        if not (self.adaptive or self.concurrency.held):
+            return self.__attempt(request, idempotent, expires)
+
+        timeout = None if expires is None \
+            else max(0, expires - time.monotonic())
+        if not self.concurrency.acquire(timeout):
+            raise DeadlineExceeded(
+                'Deadline exceeded waiting to send {}.'.format(
+                    request.methodId
+                )
+            )
+
+        start = time.monotonic()
+        try:
+            response = self.__attempt(request, idempotent, expires)
+        except Exception as e:
+            self.concurrency.release(e)
+            raise
+        except BaseException:
+            self.concurrency.release()
+            raise
+        self.concurrency.release()
+
+        self.concurrency.record(
+            time.monotonic() - start, _latency_key(request)
+        )
+        return response
+
+    def __attempt(self, request, idempotent, expires):
+        # latencies are only kept for hedging, under the key of the
+        # request's method, media or ranged read
+        key = delay = None
+        if self.hedge and idempotent:
+            key = _latency_key(request)
+            delay = self.latencies.percentile(
+                key, self.hedge_percentile, self.hedge_samples
+            )
+
+        # attempts run on other threads need their own Resource, and
+        # a shared one's http couldn't be cancelled safely
+        if self._factory is None or (expires is None and delay is None):
+            start = time.monotonic()
+            response = request.execute()
+            if key is not None:
+                self.latencies.add(key, time.monotonic() - start)
+            return response
+
+        return self.__execute_async(request, key, expires, delay)
+
+    def __execute_async(self, request, key, expires, delay):
+        """Runs request attempts on worker threads, each sending it from
+        its own Resource's http, returns the first response, cancelling
+        the other attempts."""
+
+        executor = self._executor()
+
+        def attempt(state):
+            # a copy, as the original is bound to the caller's http
+            clone = copy.copy(request)
+            clone.headers = dict(request.headers)
+            clone.http = self.resource._http
+
+            state.start(clone.http)
+            try:
+                start = time.monotonic()
+                response = clone.execute()
+            finally:
+                state.finish()
+            if key is not None:
+                self.latencies.add(key, time.monotonic() - start)
+            return response
+
+        attempts = {}
+
+        def submit():
+            state = _Attempt()
+            attempts[executor.submit(attempt, state)] = state
+
+        def remaining():
+            if expires is None:
+                return None
+            return max(0, expires - time.monotonic())
+
+        submit()
+        try:
+            if delay is not None:
+                timeout = delay if expires is None else min(delay, remaining())
+                done, _ = wait(attempts, timeout)
+                if not done and (expires is None or remaining()):
+                    log.debug('hedging %s after %.3fs',
+                              request.methodId, delay)
+                    with self.__lock:
+                        self.hedged_count += 1
+                    submit()
+
+            errors = []
+            while True:
+                done, pending = wait(
+                    [f for f in attempts if f not in errors], remaining(),
+                    return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    errors.append(future)
+                if not pending:
+                    # every attempt failed, raise the first one's error
+                    first = min(errors, key=list(attempts).index)
+                    return first.result()
+                if not done:
+                    raise DeadlineExceeded(
+                        'Deadline exceeded by {}.'.format(request.methodId)
+                    )
+        finally:
+            for future, state in attempts.items():
+                if not future.cancel():
+                    state.cancel()
+
+    def _executor(self):
+        """Returns the pool running calls bounded by a deadline or
+        hedged, shut down by `close`."""
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(self.call_workers)
+                self.__finalizer = weakref.finalize(
+                    self, self.__executor.shutdown, wait=False
+                )
+            return self.__executor
+
+    def close(self):
+        """Shuts down the threads running deadline bound and hedged
+        calls, started again if another is made."""
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+        if executor is not None:
+            self.__finalizer.detach()
+            executor.shutdown()
+
+    def _bounded(self, fn, *args):
+        """Calls fn, which sends requests from the calling thread's
+        http, e.g. a media download's next_chunk, within the current
+        deadline. Once it passes, the sockets of the request are shut
+        down and <DeadlineExceeded> raised."""
+        expires = self._expires()
+        if expires is None or self._factory is None:
+            return fn(*args)
+
+        http = self.resource._http
+        future = self._executor().submit(fn, *args)
+        done, _ = wait([future], max(0, expires - time.monotonic()))
+        if done:
+            return future.result()
+
+        if not future.cancel():
+            _cancel(http)
+            # the abandoned call may still use the http, so the thread
+            # builds another Resource for its next call
+            self._local.resource = None
+        raise DeadlineExceeded('Deadline exceeded.')
+
+    def executor(self):
+        """Returns an <AdaptiveExecutor> running at most as many tasks
+        at once as the client's concurrency limit currently allows."""
+        return AdaptiveExecutor(self.concurrency)
+
+    def map(self, fn, items, workers=4):
+        """Calls fn on each item from a pool of worker threads, each
+        using its own Resource, returns the results in order. Clients
+        built with a single Resource call fn sequentially, as its http
+        isn't thread-safe.
+
+        :fn: callable, e.g. lambda rng: client.get_values(sheet_id, rng)
+        :items: iterable of arguments
+        :workers: number of concurrent threads, None to adapt them to
+                  the quota, see `executor`
+        :returns: list of results
+
+        """
+        return list(self.imap(fn, items, workers))
+
+    def imap(self, fn, items, workers=4, prefetch=None):
+        """Generates fn(item) results in order, like `map`, keeping at most
+        :prefetch: calls (twice the workers by default) in flight so that
+        long iterables are consumed lazily.
+        """
+        if self._factory is None:
+            yield from map(fn, items)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=workers) if workers \
+            else self.executor()
+        prefetch = prefetch or (workers or self.concurrency.maximum) * 2
+        pending = collections.deque()
+
+        # workers share the caller's deadline
+        expires = getattr(self._local, 'expires', None)
+        if expires is not None:
+            fn = functools.partial(self.__call_until, expires, fn)
+
+        with executor:
+            try:
+                for item in items:
+                    pending.append(executor.submit(fn, item))
+                    if len(pending) >= prefetch:
+                        yield pending.popleft().result()
+
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def __call_until(self, expires, fn, item):
+        self._local.expires = expires
+        try:
+            return fn(item)
+        finally:
+            self._local.expires = None
+
+    def execute_batch(self, requests):
+        """Sends HttpRequests from this client's Resource as batch
+        requests of up to `batch_size` each, returns their responses
+        in order. Every batch is sent before the first error, if any,
+        is raised.
+
+        :requests: list of unexecuted HttpRequest objects
+        :returns: list of response dicts, None for empty responses
+
+        """
+        responses = [None] * len(requests)
+        errors = {}
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                errors[int(request_id)] = exception
+            else:
+                responses[int(request_id)] = response
+
+        for start in range(0, len(requests), self.batch_size):
+            batch = self.resource.new_batch_http_request(callback=callback)
+            chunk = requests[start:start + self.batch_size]
+            for index, request in enumerate(chunk, start):
+                batch.add(request, request_id=str(index))
+
+            if not (self.adaptive or self.concurrency.held):
+                self._bounded(batch.execute)
+                continue
+
+            with self.concurrency.slot():
+                batch_start = time.monotonic()
+                self._bounded(batch.execute)
+            self.concurrency.record(time.monotonic() - batch_start, 'batch')
+
+            if any(throttled(errors[index])
+                   for index in range(start, start + len(chunk))
+                   if index in errors):
+                self.concurrency.throttle()
+        if errors:
+            raise errors[min(errors)]
+
+        return responses
 
     @classmethod
-    def from_api_key(cls, api_key=None):
+    def from_api_key(cls, api_key=None, base_url=None):
         """Authorizes a client from an Api Key."""
 
         api_key = api_key or os.getenv(ENV_API_KEY)
@@ -39,11 +472,17 @@ class GoogleClient(object):
         if not api_key:
             raise ValueError('API Key not provided.')
 
-        resource = discovery.build(cls.service, cls.version, developerKey=api_key)
-        return cls(resource)
+        stats = TransportStats()
+        factory = functools.partial(
+            cls._build_resource, base_url, stats, developerKey=api_key
+        )
+        concurrency = cls._concurrency(
+            ('api_key', api_key, base_url or os.getenv(ENV_BASE_URL))
+        )
+        return cls(factory=factory, stats=stats, concurrency=concurrency)
 
     @classmethod
-    def from_service_account(cls, creds_path=None, user=None):
+    def from_service_account(cls, creds_path=None, user=None, base_url=None):
         """Authorizes a client from an Service Account Credential File."""
 
         creds_path = creds_path or os.getenv(ENV_SERVICE_ACCOUNT)
@@ -52,9 +491,215 @@ class GoogleClient(object):
         if not creds_path:
             raise ValueError('Service Account path not provided.')
 
-        http_client = service_account_creds(creds_path, user, scope=cls.scope)
-        resource = discovery.build(cls.service, cls.version, http=http_client)
-        return cls(resource)
+        creds = service_account_credentials(creds_path, user, scope=cls.scope)
+        stats = TransportStats()
+
+        def factory():
+            return cls._build_resource(
+                base_url, stats, http=authorized_http(creds)
+            )
+
+        # quotas are per project, whichever user is impersonated
+        concurrency = cls._concurrency(
+            ('service_account', os.path.abspath(creds_path),
+             base_url or os.getenv(ENV_BASE_URL))
+        )
+        return cls(factory=factory, stats=stats, concurrency=concurrency)
+
+    @classmethod
+    def _concurrency(cls, key=None):
+        """Returns the <AdaptiveLimit> shared by clients of key, the
+        credentials and endpoint, or a limit of its own without one."""
+        options = {'initial': cls.initial_concurrency,
+                   'maximum': cls.max_concurrency}
+        if key is None:
+            return AdaptiveLimit(**options)
+        return AdaptiveLimit.shared(key, **options)
+
+    @classmethod
+    def _build_resource(cls, base_url=None, stats=None, **kwargs):
+        """Builds the discovery Resource, sending requests to :base_url:
+        instead of Google's endpoints if given, e.g. a local
+        <google_objects.testing.FakeGoogleAPI>, through a <GzipHttp>
+        counting into stats, encoding bodies with the client's codec.
+        """
+        from apiclient import discovery
+        from googleapiclient.http import build_http
+
+        kwargs['http'] = GzipHttp(
+            kwargs.get('http') or build_http(), stats, cls.compress_min_size
+        )
+        kwargs.setdefault('model', codec_model(cls.codec))
+
+        base_url = base_url or os.getenv(ENV_BASE_URL)
+        if not base_url:
+            return discovery.build(cls.service, cls.version, **kwargs)
+
+        # the static document's rootUrl prefixes every method, media
+        # and batch path, overriding it redirects all of them
+        from googleapiclient import discovery_cache
+
+        document = json.loads(
+            discovery_cache.get_static_doc(cls.service, cls.version)
+        )
+        document['rootUrl'] = base_url.rstrip('/') + '/'
+
+        return discovery.build_from_document(document, **kwargs)
+
+
+def _latency_key(request):
+    """Returns the key latencies of request are compared under, its
+    method, told apart from media and ranged reads of the same method,
+    as a chunk of content takes far longer than the metadata."""
+    key = request.methodId
+    if 'alt=media' in request.uri:
+        key += ':media'
+    if 'range' in {name.lower() for name in request.headers}:
+        key += ':range'
+    return key
+
+
+class _Attempt(object):
+
+    """The http an attempt running on a worker thread sends from, its
+    sockets shut down on cancellation only while the attempt uses it,
+    as the thread's http serves other attempts afterwards"""
+
+    def __init__(self):
+        self.http = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def start(self, http):
+        with self.lock:
+            if self.cancelled:
+                raise DeadlineExceeded('Attempt cancelled.')
+            self.http = http
+
+    def finish(self):
+        with self.lock:
+            self.http = None
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            if self.http is not None:
+                _cancel(self.http)
+
+
+class _Flight(object):
+
+    """A request in flight, whose response or error is shared with
+    the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+    def wait(self, expires=None):
+        """Returns a copy of the response, as each caller may change
+        its own, or raises a copy of the error, caused by the original,
+        so callers don't share one exception object and traceback."""
+        timeout = None if expires is None \
+            else max(0, expires - time.monotonic())
+        if not self.done.wait(timeout):
+            raise DeadlineExceeded('Deadline exceeded.')
+
+        if isinstance(self.error, DeadlineExceeded):
+            raise _LeaderDeadline()
+        if self.error is not None:
+            try:
+                error = copy.copy(self.error)
+            except Exception:
+                error = type(self.error)(*self.error.args)
+            raise error from self.error
+        return copy.deepcopy(self.response)
+
+
+class _LeaderDeadline(Exception):
+
+    """The request a caller waited on outlived its sender's deadline"""
+
+
+class LatencyWindow(object):
+
+    """Keeps the latest latencies of each API method, e.g.
+    'sheets.spreadsheets.get', or its media and ranged reads, see
+    `_latency_key`, for percentiles used as hedging delays.
+    """
+
+    def __init__(self, size=200):
+        self.size = size
+        self.__samples = {}
+        self.__lock = threading.Lock()
+
+    def add(self, method, seconds):
+        with self.__lock:
+            samples = self.__samples.get(method)
+            if samples is None:
+                samples = self.__samples[method] = \
+                    collections.deque(maxlen=self.size)
+            samples.append(seconds)
+
+    def percentile(self, method, percent, min_samples=1):
+        """Returns the percent percentile latency of method, None with
+        fewer than min_samples."""
+        with self.__lock:
+            samples = sorted(self.__samples.get(method, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+
+def _cancel(http):
+    """Shuts down the sockets of an httplib2 client, so a request
+    blocked on them fails instead of waiting for its response."""
+    connections = getattr(http, 'connections', None)
+    if not isinstance(connections, dict):
+        return
+
+    for connection in list(connections.values()):
+        sock = getattr(connection, 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _CachedResource(object):
+
+    """Wraps a discovery Resource, caching the nested resources it
+    returns, e.g. `spreadsheets()`, which the client library otherwise
+    rebuilds, docstrings included, on every call.
+    """
+
+    def __init__(self, resource):
+        self._wrapped = resource
+        self._nested = {}
+
+    def __getattr__(self, name):
+        attribute = getattr(self._wrapped, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            if args or kwargs:
+                return attribute(*args, **kwargs)
+
+            if name not in self._nested:
+                result = attribute()
+                # only nested resources are cached, never requests
+                if not hasattr(result, '_resourceDesc'):
+                    return result
+                self._nested[name] = _CachedResource(result)
+
+            return self._nested[name]
+
+        return call
 
 
 class GoogleObject(object):
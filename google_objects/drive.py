@@ -7,14 +7,41 @@ Google Drive API
 
 """
 
+import os
 import uuid
 import logging
+import contextlib
+import collections
 
 from google_objects.core import GoogleClient
 from google_objects.core import GoogleObject
+from google_objects.index import FileIndex
+from google_objects.limits import TokenBucket
 
 log = logging.getLogger(__name__)
 
+_MEDIA_FIELDS = 'id, name, mimeType, parents, md5Checksum, size, webViewLink'
+_PERMISSION_FIELDS = 'id, type, role, emailAddress, domain'
+
+PermissionChanges = collections.namedtuple(
+    'PermissionChanges', ['created', 'updated', 'deleted']
+)
+
+# progress of copy_files and copy_tree, completed counts from 1
+CopyEvent = collections.namedtuple(
+    'CopyEvent', ['source_id', 'file', 'completed']
+)
+
+
+@contextlib.contextmanager
+def _opened(target, mode):
+    """Yields target if it is a file object, else opens it as a path."""
+    if hasattr(target, 'read') or hasattr(target, 'write'):
+        yield target
+    else:
+        with open(target, mode) as fd:
+            yield fd
+
 
 class DriveClient(GoogleClient):
 
@@ -28,10 +55,24 @@ class DriveClient(GoogleClient):
     version = 'v3'
     scope = {'drive'}
 
+    # local <FileIndex> answering query_files, see index_files
+    index = None
+
+    # webhook URL receiving push notifications, see watch_file
+    callback = None
+
+    # sustained writes per second allowed by write_limiter
+    write_rate = 3
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # <TokenBucket> shared by this client's bulk writes
+        self.write_limiter = TokenBucket(self.write_rate)
+
     def get_about(self, fields=['user']):
-        data = self.resource.about().get(
+        data = self._execute(self.resource.about().get(
             fields=', '.join(fields)
-        ).execute()
+        ))
 
         return About.from_existing(data)
 
@@ -44,9 +85,9 @@ class DriveClient(GoogleClient):
 
         """
 
-        data = self.resource.files().get(
+        data = self._execute(self.resource.files().get(
             fileId=file_id
-        ).execute()
+        ))
 
         return File.from_existing(data, self)
 
@@ -59,53 +100,215 @@ class DriveClient(GoogleClient):
 
         """
 
-        # get old file metadata if none provided
-        if not file_body:
-            file_body = self.resource.files().get(
-                fileId=file_id
-            ).execute()
-
-        new_file = self.resource.files().copy(
+        # Drive copies the source's metadata for omitted fields
+        new_file = self._execute(self.resource.files().copy(
             fileId=file_id,
-            body=file_body,
-            fields='id, webViewLink'
-        ).execute()
+            body=file_body or {},
+            fields='id, name, mimeType, parents, webViewLink'
+        ))
 
         return File.from_existing(new_file, self)
 
-    def list_files(self, file_type=None,
-                   parents=[], fields=['files(id, name)']):
-        """Shows basic usage of the Google Drive API.
+    def copy_files(self, copies, workers=None, limiter=None):
+        """Copies many files concurrently, each copy waiting on the
+        write limiter so bulk copies stay within Drive's write quota.
+        Generates a <CopyEvent> per copy, in the order given.
+
+        :copies: iterable of (file_id, name, parents) tuples, a name or
+                 parents of None keeps the source's
+        :workers: number of concurrent copies, adapted to the quota
+                  by default
+        :limiter: <TokenBucket>, the client's write_limiter by default
+
+        """
+        limiter = limiter or self.write_limiter
+
+        def copy(item):
+            file_id, name, parents = item
+            body = {}
+            if name is not None:
+                body['name'] = name
+            if parents is not None:
+                body['parents'] = list(parents)
+
+            limiter.acquire()
+            return file_id, self.copy_file(file_id, body)
+
+        results = self.imap(copy, copies, workers)
+        for completed, (file_id, new) in enumerate(results, 1):
+            yield CopyEvent(file_id, new, completed)
+
+    def copy_tree(self, folder_id, name=None, parents=None, workers=None,
+                  limiter=None):
+        """Copies a folder with all its subfolders and files, level by
+        level, listing folders and copying files concurrently. Generates
+        a <CopyEvent> per folder created and file copied, the new root
+        folder first.
+
+        :folder_id: Google Drive folder ID
+        :name: name of the new folder, the source's by default
+        :parents: parent folder IDs of the new folder, the source's by
+                  default
+        :workers: number of concurrent requests, adapted to the quota
+                  by default
+        :limiter: <TokenBucket>, the client's write_limiter by default
+
+        """
+        limiter = limiter or self.write_limiter
+        folder_type = File._type_prefix + 'folder'
+        completed = 0
+
+        def create(item):
+            source, parents = item
+            limiter.acquire()
+            data = self._execute(self.resource.files().create(body={
+                'name': source['name'],
+                'mimeType': folder_type,
+                'parents': parents,
+            }, fields='id, name, mimeType, parents, webViewLink'))
+            return source['id'], File.from_existing(data, self)
+
+        def children(item):
+            source_id, target_id = item
+            files = self.yield_files(
+                parents=[source_id],
+                fields='files(id, name, mimeType, trashed)'
+            )
+            return target_id, [
+                f.data for f in files if not f.data.get('trashed')
+            ]
+
+        source = self._execute(self.resource.files().get(
+            fileId=folder_id, fields='id, name, parents'
+        ))
+        source['name'] = name or source['name']
+        _, root = create((source, parents or source.get('parents', [])))
+        completed += 1
+        yield CopyEvent(folder_id, root, completed)
+
+        level = [(folder_id, root.id)]
+        while level:
+            folders, files = [], []
+            for target_id, items in self.imap(children, level, workers):
+                for item in items:
+                    if item['mimeType'] == folder_type:
+                        folders.append((item, [target_id]))
+                    else:
+                        files.append((item['id'], item['name'], [target_id]))
+
+            for event in self.copy_files(files, workers, limiter):
+                completed += 1
+                yield event._replace(completed=completed)
+
+            level = []
+            for source_id, new in self.imap(create, folders, workers):
+                level.append((source_id, new.id))
+                completed += 1
+                yield CopyEvent(source_id, new, completed)
+
+    def list_files(self, file_type=None, parents=[],
+                   fields=['files(id, name, mimeType)'], page_size=1000):
+        """Returns a list of <File> objects of the given type
+        within the given parent folders, following result pages.
+
+        :file_type: google-apps type, e.g. 'spreadsheet' or 'folder'
+        :parents: list of parent folder IDs
+        :returns: list of <File>
 
-        Creates a Google Drive API service object and outputs the names and IDs
-        for up to 10 files.
         """
+        return list(self.yield_files(file_type, parents, fields, page_size))
 
-        if hasattr(fields, '__iter__'):
+    def yield_files(self, file_type=None, parents=[],
+                    fields=['files(id, name, mimeType)'], page_size=1000):
+        """Generates <File> objects page by page, see list_files."""
+
+        if not isinstance(fields, str):
             fields = ', '.join(fields)
+        fields = 'nextPageToken, ' + fields
 
-        query = ''
+        clauses = []
         if file_type:
             prfx = 'application/vnd.google-apps.'
-            query = query + "mimeType='{}'".format('application/vnd.google-apps.' + file_type.lower())
+            clauses.append("mimeType='{}'".format(prfx + file_type.lower()))
         for p in parents:
-            query = query + ' and \'{}\' in parents'.format(p)
+            clauses.append('\'{}\' in parents'.format(p))
+
+        page_token = None
+        while True:
+            result = self._execute(self.resource.files().list(
+                q=' and '.join(clauses), pageSize=page_size,
+                pageToken=page_token, fields=fields
+            ))
+
+            for each in result.get('files', []):
+                yield File.from_existing(each, self)
+
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+
+    def get_start_page_token(self):
+        """Returns the token marking the current end of the changes feed."""
+
+        data = self._execute(self.resource.changes().getStartPageToken())
+        return data['startPageToken']
+
+    def list_changes(self, page_token, fields=None, page_size=1000):
+        """Returns a single changes.list page from page_token, holding
+        either a nextPageToken or, on the last page, a newStartPageToken.
+        """
+
+        return self._execute(self.resource.changes().list(
+            pageToken=page_token, pageSize=page_size, fields=fields,
+            includeRemoved=True
+        ))
+
+    def sync(self, index):
+        """Returns a <DriveSync> mirroring this drive into index, a
+        <FileIndex> or the path of its database."""
+
+        if not isinstance(index, FileIndex):
+            index = FileIndex(index)
 
-        result = self.resource.files().list(
-            q=query, pageSize=100,  # fields=fields
-        ).execute()
+        return DriveSync(self, index)
 
-        files = result.get('files')
+    def index_files(self, index=':memory:'):
+        """Brings a local <FileIndex> of this drive's file metadata up to
+        date, seeding it on first use, and answers `query_files` from it.
+
+        :index: <FileIndex> or path of its SQLite database
+        :returns: <FileIndex>
+
+        """
+        sync = self.sync(index)
+        sync.run()
+        self.index = sync.index
 
-        return [File.from_existing(each, self) for each in files]
+        return self.index
 
-    def watch_file(self, file_id,
-                   channel_id=None, callback=None, type='webhook'):
+    def query_files(self, **filters):
+        """Returns <File> objects from the local index matching filters,
+        see <FileIndex>.query, without any API request, e.g. spreadsheets
+        anywhere below a folder modified in the last week:
+
+            client.query_files(mime_type='spreadsheet', ancestor=folder_id,
+                               modified_after=datetime.now() - week)
+        """
+        if self.index is None:
+            raise ValueError('No index, call index_files first.')
+
+        return [File.from_existing(each, self)
+                for each in self.index.query(**filters)]
+
+    def watch_file(self, file_id, channel_id=None, callback=None,
+                   type='webhook', token=None, expiration=None):
         """Commences push notifications for a file resource,
         depends on callback url being set on instance.
 
         :file_id: Google Drive File Resource ID
-        :returns:
+        :token: string sent back with every notification
+        :expiration: channel expiry in milliseconds since the epoch
+        :returns: Dictionary detailing the channel, see push.Channel
 
         """
         if not (callback or self.callback):
@@ -116,24 +319,291 @@ class DriveClient(GoogleClient):
             'type': type,
             'address': callback or self.callback
         }
-        resp = self.resource.files().watch(
+        if token is not None:
+            req_body['token'] = token
+        if expiration is not None:
+            req_body['expiration'] = expiration
+
+        resp = self._execute(self.resource.files().watch(
             fileId=file_id, body=req_body
-        ).execute()
+        ))
 
         return resp
 
+    def stop_channel(self, channel_id, resource_id):
+        """Stops notifications on a channel opened by watch_file."""
+
+        self._execute(self.resource.channels().stop(
+            body={'id': channel_id, 'resourceId': resource_id}
+        ))
+
+    def upload_file(self, source, name=None, parents=None,
+                    mime_type='application/octet-stream', chunk_size=None,
+                    verify=True, progress=None):
+        """Uploads content to a new Drive file in resumable chunks,
+        reading one chunk at a time, so any size of file or pipe can be
+        sent with bounded memory.
+
+        :source: path or binary file object, need not be seekable
+        :name: file name, defaults to the name of source
+        :parents: list of parent folder IDs
+        :mime_type: MIME type of the content
+        :chunk_size: bytes per request, a multiple of 256KiB
+        :verify: compare the content's MD5 with Drive's md5Checksum
+        :progress: callable receiving the number of bytes sent so far
+        :returns: <File>
+
+        """
+        from google_objects import media
+
+        if not name:
+            path = source if isinstance(source, str) else \
+                getattr(source, 'name', 'Untitled')
+            name = os.path.basename(str(path))
+
+        body = {'name': name}
+        if parents:
+            body['parents'] = parents
+
+        with _opened(source, 'rb') as fd:
+            upload = media.StreamUpload(
+                fd, mime_type, chunk_size or media.CHUNK_SIZE
+            )
+            request = self.resource.files().create(
+                body=body, media_body=upload, fields=_MEDIA_FIELDS
+            )
+
+            data = None
+            while data is None:
+                status, data = self._bounded(request.next_chunk)
+                if progress:
+                    progress(upload.bytes_read)
+
+        if verify:
+            media.verify(upload.md5, data.get('md5Checksum'), data['id'])
+
+        return File.from_existing(data, self)
+
+    def download_file(self, file_id, destination, chunk_size=None,
+                      workers=1, verify=True, progress=None):
+        """Downloads a binary file's content in chunks, written to
+        destination as they arrive. With several workers, consecutive
+        byte ranges are fetched concurrently and written in order, at
+        most two chunks per worker being held in memory.
+
+        :file_id: Google Drive File ID
+        :destination: path or writable binary file object
+        :chunk_size: bytes per request
+        :workers: number of concurrent range requests
+        :verify: compare the content's MD5 with Drive's md5Checksum
+        :progress: callable receiving the number of bytes written so far
+        :returns: <File> metadata of the downloaded file
+
+        """
+        from googleapiclient.http import MediaIoBaseDownload
+        from google_objects import media
+
+        chunk_size = chunk_size or media.CHUNK_SIZE
+        data = self._execute(self.resource.files().get(
+            fileId=file_id, fields=_MEDIA_FIELDS
+        ))
+
+        if data['mimeType'].startswith(File._type_prefix):
+            raise ValueError('Google Apps files must be exported.')
+
+        size = int(data.get('size', 0))
+
+        def fetch(start):
+            request = self.resource.files().get_media(fileId=file_id)
+            request.headers['range'] = 'bytes={}-{}'.format(
+                start, min(start + chunk_size, size) - 1
+            )
+            return self._execute(request)
+
+        with _opened(destination, 'wb') as fd:
+            writer = media.HashingWriter(fd)
+
+            if workers > 1 and size > chunk_size:
+                offsets = range(0, size, chunk_size)
+                for chunk in self.imap(fetch, offsets, workers):
+                    writer.write(chunk)
+                    if progress:
+                        progress(writer.bytes_written)
+            else:
+                request = self.resource.files().get_media(fileId=file_id)
+                download = MediaIoBaseDownload(writer, request, chunk_size)
+                done = False
+                while not done:
+                    status, done = self._bounded(download.next_chunk)
+                    if progress:
+                        progress(writer.bytes_written)
+
+        if verify:
+            media.verify(writer.md5, data.get('md5Checksum'), file_id)
+
+        return File.from_existing(data, self)
+
+    def export_file(self, file_id, destination, mime_type='pdf',
+                    chunk_size=None):
+        """Exports a Google Apps file, e.g. a spreadsheet to CSV or XLSX
+        or a presentation to PDF, streaming it to destination.
+
+        :file_id: Google Drive File ID
+        :destination: path or writable binary file object
+        :mime_type: MIME type or one of csv, tsv, pdf, txt, html, xlsx,
+                    docx and pptx
+        :returns: number of bytes written
+
+        """
+        from googleapiclient.http import MediaIoBaseDownload
+        from google_objects import media
+
+        request = self.resource.files().export_media(
+            fileId=file_id,
+            mimeType=media.EXPORT_TYPES.get(mime_type, mime_type)
+        )
+
+        with _opened(destination, 'wb') as fd:
+            writer = media.HashingWriter(fd)
+            download = MediaIoBaseDownload(
+                writer, request, chunk_size or media.CHUNK_SIZE
+            )
+            done = False
+            while not done:
+                status, done = self._bounded(download.next_chunk)
+
+        return writer.bytes_written
+
     def create_permission(self, file_id,
                           permission, message=None, notification=True):
         # makes api call
-        data = self.resource.permissions().create(
+        data = self._execute(self.resource.permissions().create(
             fileId=file_id,
             body=permission,
             emailMessage=message,
             sendNotificationEmail=notification,
-        ).execute()
+        ))
 
         return Permission(**data)
 
+    def list_permissions(self, file_id, page_size=100):
+        """Returns all of a file's <Permission>s, fetched page by page."""
+
+        permissions = []
+        page_token = None
+        while True:
+            result = self._execute(self.resource.permissions().list(
+                fileId=file_id, pageSize=page_size, pageToken=page_token,
+                fields='nextPageToken, permissions({})'.format(
+                    _PERMISSION_FIELDS
+                )
+            ))
+
+            permissions.extend(
+                Permission(**each) for each in result.get('permissions', [])
+            )
+
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return permissions
+
+    def set_permissions(self, file_id, desired, current=None, remove=True,
+                        notification=False, message=None):
+        """Makes a file's permissions match desired, sending only the
+        creates, role updates and deletes needed as batch requests, so
+        repeating a call only costs the listing of current permissions.
+        Permissions are matched by type and email address or domain.
+
+        :file_id: Google Drive File ID
+        :desired: iterable of <Permission>s or permission dicts, or a
+                  {email address: role} dict of user permissions
+        :current: the file's <Permission>s, listed if omitted
+        :remove: delete permissions missing from desired, the owner's
+                 permission is never changed
+        :notification: send notification emails to new users and groups
+        :message: text included in notification emails
+        :returns: <PermissionChanges> of created, updated and deleted
+                  <Permission> lists
+
+        """
+        if isinstance(desired, dict):
+            desired = [{'type': 'user', 'role': role, 'emailAddress': email}
+                       for email, role in desired.items()]
+
+        desired = [Permission.from_existing(each.data) if
+                   isinstance(each, Permission) else Permission(**each)
+                   for each in desired]
+        if current is None:
+            current = self.list_permissions(file_id)
+
+        existing = {each.key: each for each in current}
+        wanted = {each.key for each in desired}
+        permissions = self.resource.permissions()
+        changes = PermissionChanges([], [], [])
+        requests, results = [], []
+
+        for permission in desired:
+            match = existing.get(permission.key)
+            if match is None:
+                body = {key: value for key, value in permission.data.items()
+                        if key in Permission._properties}
+                body.update(role=permission.role, type=permission.type)
+                options = {}
+                if permission.type in ('user', 'group'):
+                    options['sendNotificationEmail'] = notification
+                    if notification and message:
+                        options['emailMessage'] = message
+
+                requests.append(permissions.create(
+                    fileId=file_id, body=body, fields=_PERMISSION_FIELDS,
+                    **options
+                ))
+                results.append((changes.created, None))
+
+            elif match.role != permission.role and match.role != 'owner':
+                requests.append(permissions.update(
+                    fileId=file_id, permissionId=match.id,
+                    body={'role': permission.role}, fields=_PERMISSION_FIELDS
+                ))
+                results.append((changes.updated, None))
+
+        if remove:
+            for key, match in existing.items():
+                if key not in wanted and match.role != 'owner':
+                    requests.append(permissions.delete(
+                        fileId=file_id, permissionId=match.id
+                    ))
+                    results.append((changes.deleted, match))
+
+        responses = self.execute_batch(requests)
+        for (result, deleted), response in zip(results, responses):
+            result.append(deleted or Permission(**response))
+
+        log.debug('permissions of %s: %d created, %d updated, %d deleted',
+                  file_id, *map(len, changes))
+        return changes
+
+    def share_files(self, file_ids, desired, workers=None, **kwargs):
+        """Makes the permissions of many files match desired
+        concurrently, see `set_permissions`. Generates (file_id,
+        <PermissionChanges>) tuples in the order given.
+
+        :file_ids: iterable of Google Drive File IDs
+        :desired: as for set_permissions
+        :workers: number of files shared at once, adapted to the quota
+                  by default
+
+        """
+        if isinstance(desired, dict):
+            desired = [{'type': 'user', 'role': role, 'emailAddress': email}
+                       for email, role in desired.items()]
+        desired = list(desired)
+
+        def share(file_id):
+            return file_id, self.set_permissions(file_id, desired, **kwargs)
+
+        return self.imap(share, file_ids, workers)
+
 
 class About(GoogleObject):
 
@@ -258,8 +728,20 @@ class File(GoogleObject):
         return self.client.copy_file(self.id, new)
 
     def permissions(self):
+        if 'permissions' not in self.data:
+            self.data['permissions'] = [
+                each.data for each in self.client.list_permissions(self.id)
+            ]
         return [Permission(self, **each) for each in self.data['permissions']]
 
+    def set_permissions(self, desired, **kwargs):
+        """Makes this file's permissions match desired, see
+        DriveClient.set_permissions."""
+
+        changes = self.client.set_permissions(self.id, desired, **kwargs)
+        self.data.pop('permissions', None)
+        return changes
+
     def add_permission(self, email, **kwargs):
         """initializes new permission objects and
         pushes it, returns
@@ -281,6 +763,16 @@ class File(GoogleObject):
 
         return created
 
+    def download(self, destination, **kwargs):
+        """Downloads this file's content, see DriveClient.download_file."""
+        return self.client.download_file(self.id, destination, **kwargs)
+
+    def export(self, destination, mime_type='pdf', **kwargs):
+        """Exports this file, see DriveClient.export_file."""
+        return self.client.export_file(
+            self.id, destination, mime_type, **kwargs
+        )
+
     def watch(self, **kwargs):
         """Attempts to start receiving push notifications for this file.
 
@@ -291,6 +783,118 @@ class File(GoogleObject):
         return self.client.watch_file(self.id, **kwargs)
 
 
+class Change(GoogleObject):
+
+    """Represents a Drive Change Resource, READ ONLY"""
+
+    def __init__(self, client=None, **kwargs):
+        self.client = client
+        super().__init__(**kwargs)
+
+    @property
+    def file_id(self):
+        return self.data['fileId']
+
+    @property
+    def time(self):
+        return self.data.get('time')
+
+    @property
+    def removed(self):
+        """True if the file was deleted, trashed or is no longer shared."""
+        return self.data.get('removed') or bool(
+            self.data.get('file', {}).get('trashed')
+        )
+
+    @property
+    def file(self):
+        if not self.removed:
+            return File.from_existing(self.data['file'], self.client)
+
+
+class DriveSync(object):
+
+    """Mirrors Drive file metadata into a <FileIndex> incrementally.
+
+    The first run records the changes feed position and seeds the index
+    from a full listing, later runs read only the changes made since,
+    the feed position being persisted in the index after every page.
+    """
+
+    _token_key = 'changes.pageToken'
+
+    file_fields = ('id, name, mimeType, parents, modifiedTime, trashed, '
+                   'md5Checksum, size, webViewLink, '
+                   'permissions(id, type, role, emailAddress, domain)')
+
+    def __init__(self, client, index):
+        self.client = client
+        self.index = index
+
+    @property
+    def page_token(self):
+        return self.index.get_state(self._token_key)
+
+    def seed(self):
+        """Indexes every file, returns the number indexed."""
+
+        # take the token first, changes made while listing are replayed
+        token = self.client.get_start_page_token()
+        count = 0
+
+        with self.index:
+            files = self.client.yield_files(
+                fields='files({})'.format(self.file_fields)
+            )
+            for each in files:
+                if not each.data.get('trashed'):
+                    self.index.upsert(each.data)
+                    count += 1
+            self.index.set_state(self._token_key, token)
+
+        return count
+
+    def changes(self):
+        """Generates <Change> objects since the last run, applying each to
+        the index. A page of changes is applied and committed before its
+        changes are generated, so the index isn't held while the caller
+        handles them, and the following page token is saved once they
+        all have been, so a page left unfinished is generated again by
+        the next run.
+        """
+        token = self.page_token
+        if token is None:
+            self.seed()
+            return
+
+        fields = ('nextPageToken, newStartPageToken, changes(fileId, time, '
+                  'removed, file({}))'.format(self.file_fields))
+
+        while token:
+            page = self.client.list_changes(token, fields=fields)
+            changes = [Change.from_existing(data, self.client)
+                       for data in page.get('changes', [])]
+
+            with self.index:
+                for change in changes:
+                    if change.removed:
+                        self.index.remove(change.file_id)
+                    else:
+                        self.index.upsert(change.data['file'])
+
+            yield from changes
+
+            token = page.get('nextPageToken')
+            with self.index:
+                self.index.set_state(
+                    self._token_key, token or page['newStartPageToken']
+                )
+
+    def run(self):
+        """Applies pending changes, returns the number applied."""
+        return sum(1 for _ in self.changes())
+
+
 class Permission(GoogleObject):
 
     """Google Drive File Permission"""
@@ -321,6 +925,13 @@ class Permission(GoogleObject):
     def id(self):
         return self.data['id']
 
+    @property
+    def key(self):
+        """(type, grantee) identifying the permission's grantee,
+        its lowercase email address or domain."""
+        grantee = self.data.get('emailAddress') or self.data.get('domain')
+        return self.type, (grantee or '').lower()
+
     @property
     def role(self):
         return self.data.get('role', self._default_role)
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Sheet Formatting
+    builds compact repeatCell batches from cell and range styles
+
+"""
+
+import json
+import logging
+
+from google_objects import a1
+from google_objects import codec
+
+log = logging.getLogger(__name__)
+
+# serialized requests per batchUpdate, well under the API's body limit
+MAX_BYTES = 1024 * 1024
+
+# CellFormat objects set field by field, others are set whole
+_NESTED = {'textFormat', 'padding'}
+
+
+def color(red, green, blue, alpha=1):
+    """Returns an API Color dict from 0-1 components."""
+    return {'red': red, 'green': green, 'blue': blue, 'alpha': alpha}
+
+
+def batches(requests, max_bytes=MAX_BYTES):
+    """Splits requests into lists whose JSON stays under max_bytes."""
+    batch, size = [], 0
+    for request in requests:
+        length = len(codec.dumps(request)) + 2
+        if batch and size + length > max_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append(request)
+        size += length
+    if batch:
+        yield batch
+
+
+def _cell_format(style, fields):
+    """Returns a CellFormat dict from style and keyword fields, colors
+    may be given as (red, green, blue[, alpha]) tuples."""
+    cell_format = dict(style or {}, **fields)
+    for key, value in cell_format.items():
+        if key.lower().endswith('color') and isinstance(value, (tuple, list)):
+            cell_format[key] = color(*value)
+    return cell_format
+
+
+def _paths(cell_format):
+    """Yields the field mask paths set by a CellFormat dict."""
+    for key, value in cell_format.items():
+        if key in _NESTED and isinstance(value, dict):
+            for inner in value:
+                yield '{}.{}'.format(key, inner)
+        else:
+            yield key
+
+
+def _merge(formats):
+    """Merges CellFormat dicts, later ones taking precedence."""
+    merged = {}
+    for cell_format in formats:
+        for key, value in cell_format.items():
+            if key in _NESTED and isinstance(value, dict):
+                merged[key] = dict(merged.get(key, {}), **value)
+            else:
+                merged[key] = value
+    return merged
+
+
+class Formatter(object):
+
+    """Collects formats of cells and ranges in a sheet and sends them
+    as few repeatCell requests as possible: cells sharing a format
+    are merged into rectangles, across columns then down rows, and
+    requests are chunked into batchUpdates under max_bytes.
+
+    Formats are CellFormat fields, later formats overriding earlier
+    ones field by field:
+
+        with sheet.formatter() as fmt:
+            fmt.format('A1:F1', textFormat={'bold': True})
+            for row in failures:
+                fmt.cell(row, 3, backgroundColor=(1, 0.8, 0.8))
+
+    :client: <SheetsClient>
+    :spreadsheet_id: Google Spreadsheet ID
+    :sheet_id: ID of the formatted sheet
+    :row_count: rows of the sheet, bounding open-ended ranges
+    :column_count: columns of the sheet, bounding open-ended ranges
+    :max_bytes: serialized size of a batchUpdate's requests
+    """
+
+    def __init__(self, client, spreadsheet_id, sheet_id, row_count=None,
+                 column_count=None, max_bytes=MAX_BYTES):
+        self.client = client
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_id = sheet_id
+        self.row_count = row_count
+        self.column_count = column_count
+        self.max_bytes = max_bytes
+        self.__specs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        if ex_type is None:
+            self.push()
+
+    def __len__(self):
+        return len(self.__specs)
+
+    def format(self, rng, style=None, **fields):
+        """Applies a format to a range.
+
+        :rng: A1 string, e.g. 'A2:C' or 'B:B', or <a1.GridRange>
+        :style: CellFormat dict
+        :**fields: CellFormat fields, e.g. backgroundColor=(1, 1, 0)
+
+        """
+        if isinstance(rng, str):
+            rng = a1.parse(rng)
+
+        end_row = rng.end_row if rng.end_row is not None else self.row_count
+        end_col = rng.end_col if rng.end_col is not None \
+            else self.column_count
+        if end_row is None or end_col is None:
+            raise ValueError('Sheet size required to format {}.'.format(rng))
+
+        cell_format = _cell_format(style, fields)
+        if cell_format:
+            self.__specs.append((
+                rng.start_row or 0, end_row, rng.start_col or 0, end_col,
+                cell_format
+            ))
+        return self
+
+    def cell(self, row, column, style=None, **fields):
+        """Applies a format to the cell at 0-based row and column."""
+        return self.format(
+            a1.GridRange(None, row, row + 1, column, column + 1),
+            style, **fields
+        )
+
+    def rectangles(self):
+        """Returns (<a1.GridRange>, CellFormat) pairs covering every
+        formatted cell once, adjacent cells of equal formats merged."""
+
+        if not self.__specs:
+            return []
+
+        # compress coordinates to the edges of formatted ranges
+        rows = sorted({r for spec in self.__specs for r in spec[:2]})
+        cols = sorted({c for spec in self.__specs for c in spec[2:4]})
+        row_index = {row: i for i, row in enumerate(rows)}
+        col_index = {col: i for i, col in enumerate(cols)}
+
+        grid = [[()] * (len(cols) - 1) for _ in range(len(rows) - 1)]
+        for index, (r0, r1, c0, c1, _) in enumerate(self.__specs):
+            col_start, col_end = col_index[c0], col_index[c1]
+            for band in grid[row_index[r0]:row_index[r1]]:
+                for c in range(col_start, col_end):
+                    band[c] += (index,)
+
+        styles = {}
+
+        def style_key(indexes):
+            if indexes not in styles:
+                merged = _merge(self.__specs[i][4] for i in indexes)
+                styles[indexes] = json.dumps(merged, sort_keys=True)
+            return styles[indexes]
+
+        rectangles = []
+        open_runs = {}
+        for r, band in enumerate(grid + [[()] * (len(cols) - 1)]):
+            # runs of equal formats across the band's columns
+            runs = {}
+            c = 0
+            while c < len(band):
+                if not band[c]:
+                    c += 1
+                    continue
+                key = style_key(band[c])
+                start = c
+                while c < len(band) and band[c] and \
+                        style_key(band[c]) == key:
+                    c += 1
+                runs[(cols[start], cols[c], key)] = rows[r]
+
+            # extend runs continuing from the band above, close the rest
+            for run, start_row in open_runs.items():
+                if run in runs:
+                    runs[run] = start_row
+                else:
+                    c0, c1, key = run
+                    rectangles.append((
+                        a1.GridRange(None, start_row, rows[r], c0, c1),
+                        json.loads(key)
+                    ))
+            open_runs = runs
+
+        return rectangles
+
+    def requests(self):
+        """Returns the repeatCell requests applying all formats."""
+        requests = []
+        for rng, cell_format in self.rectangles():
+            mask = ','.join(
+                'userEnteredFormat.' + path for path in _paths(cell_format)
+            )
+            requests.append({'repeatCell': {
+                'range': rng.to_grid(self.sheet_id),
+                'cell': {'userEnteredFormat': cell_format},
+                'fields': mask,
+            }})
+        return requests
+
+    def push(self):
+        """Sends the formats in batchUpdates of at most max_bytes,
+        clearing them, returns the number of requests sent."""
+
+        requests = self.requests()
+        for batch in batches(requests, self.max_bytes):
+            self.client.push_updates(self.spreadsheet_id, batch)
+
+        log.debug('formatted %d ranges with %d requests',
+                  len(self.__specs), len(requests))
+        del self.__specs[:]
+        return len(requests)
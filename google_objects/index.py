@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Local Drive Metadata Index
+    SQLite store of Drive File resources
+
+"""
+
+import json
+import sqlite3
+import logging
+import datetime
+import threading
+
+log = logging.getLogger(__name__)
+
+_TYPE_PREFIX = 'application/vnd.google-apps.'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    mime_type TEXT,
+    modified_time TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parents (
+    file_id TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    PRIMARY KEY (file_id, parent_id)
+);
+CREATE INDEX IF NOT EXISTS parents_parent ON parents (parent_id);
+CREATE INDEX IF NOT EXISTS files_name ON files (name);
+CREATE INDEX IF NOT EXISTS files_type ON files (mime_type, modified_time);
+CREATE TABLE IF NOT EXISTS permissions (
+    file_id TEXT NOT NULL,
+    id TEXT,
+    type TEXT,
+    role TEXT,
+    email TEXT,
+    domain TEXT
+);
+CREATE INDEX IF NOT EXISTS permissions_file ON permissions (file_id);
+CREATE INDEX IF NOT EXISTS permissions_email ON permissions (email);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _timestamp(value):
+    """Returns value as an RFC 3339 UTC string, comparable with the
+    modifiedTime strings stored in the index, naive datetimes taken as
+    local time, as datetime.now() returns."""
+    if not isinstance(value, datetime.datetime):
+        return value
+
+    value = value.astimezone(datetime.timezone.utc)
+
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + \
+        '{:03d}Z'.format(value.microsecond // 1000)
+
+
+def _mime_type(value):
+    """Expands a google-apps type such as 'spreadsheet'."""
+    return value if '/' in value else _TYPE_PREFIX + value.lower()
+
+
+class FileIndex(object):
+
+    """Persists Drive File metadata in SQLite, keyed by file ID
+    with a parent to child index. Safe to share between threads.
+
+    Use as a context manager to group writes in one transaction:
+
+        with index:
+            index.upsert(data)
+            index.set_state('key', 'value')
+
+    :path: database file, in memory if omitted
+    """
+
+    def __init__(self, path=':memory:'):
+        self.filename = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(_SCHEMA)
+        self.__depth = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.__depth += 1
+        return self
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        try:
+            self.__depth -= 1
+            if self.__depth == 0:
+                if ex_type is None:
+                    self.connection.commit()
+                else:
+                    self.connection.rollback()
+        finally:
+            self.lock.release()
+
+    def __len__(self):
+        with self:
+            count, = self.connection.execute(
+                'SELECT COUNT(*) FROM files'
+            ).fetchone()
+        return count
+
+    def __contains__(self, file_id):
+        return self.get(file_id) is not None
+
+    def close(self):
+        self.connection.close()
+
+    def upsert(self, data):
+        """Inserts or replaces a File resource dict."""
+        with self:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)',
+                (data['id'], data.get('name'), data.get('mimeType'),
+                 data.get('modifiedTime'), json.dumps(data))
+            )
+            self.connection.execute(
+                'DELETE FROM parents WHERE file_id = ?', (data['id'],)
+            )
+            self.connection.executemany(
+                'INSERT INTO parents VALUES (?, ?)',
+                [(data['id'], parent) for parent in data.get('parents', [])]
+            )
+
+            if 'permissions' in data:
+                self.connection.execute(
+                    'DELETE FROM permissions WHERE file_id = ?', (data['id'],)
+                )
+                self.connection.executemany(
+                    'INSERT INTO permissions VALUES (?, ?, ?, ?, ?, ?)',
+                    [(data['id'], p.get('id'), p.get('type'), p.get('role'),
+                      p.get('emailAddress'), p.get('domain'))
+                     for p in data['permissions']]
+                )
+
+    def remove(self, file_id):
+        with self:
+            self.connection.execute(
+                'DELETE FROM files WHERE id = ?', (file_id,)
+            )
+            self.connection.execute(
+                'DELETE FROM parents WHERE file_id = ?', (file_id,)
+            )
+            self.connection.execute(
+                'DELETE FROM permissions WHERE file_id = ?', (file_id,)
+            )
+
+    def get(self, file_id):
+        """Returns the File resource dict or None."""
+        with self:
+            row = self.connection.execute(
+                'SELECT data FROM files WHERE id = ?', (file_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, mime_type=None, name=None, parent=None, ancestor=None,
+              modified_after=None, modified_before=None, shared_with=None,
+              limit=None):
+        """Returns File resource dicts matching every given filter,
+        most recently modified first.
+
+        :mime_type: MIME type, or google-apps type e.g. 'spreadsheet'
+        :name: exact file name
+        :parent: ID of the folder directly holding the files
+        :ancestor: ID of a folder holding the files at any depth
+        :modified_after: <datetime>, naive ones in local time, or RFC
+                         3339 string, exclusive
+        :modified_before: <datetime>, naive ones in local time, or RFC
+                          3339 string, exclusive
+        :shared_with: email address holding a permission on the files
+        :limit: maximum number of results
+
+        """
+        sql = ['SELECT f.data FROM files f']
+        clauses, params = [], []
+
+        if ancestor is not None:
+            sql.insert(0, """
+                WITH RECURSIVE tree(id) AS (
+                    SELECT file_id FROM parents WHERE parent_id = ?
+                    UNION
+                    SELECT p.file_id FROM parents p JOIN tree t
+                        ON p.parent_id = t.id
+                )""")
+            params.append(ancestor)
+            clauses.append('f.id IN tree')
+
+        if parent is not None:
+            clauses.append(
+                'f.id IN (SELECT file_id FROM parents WHERE parent_id = ?)'
+            )
+            params.append(parent)
+
+        if shared_with is not None:
+            clauses.append(
+                'f.id IN (SELECT file_id FROM permissions WHERE email = ?)'
+            )
+            params.append(shared_with)
+
+        for column, op, value in (
+                ('f.mime_type', '=', mime_type and _mime_type(mime_type)),
+                ('f.name', '=', name),
+                ('f.modified_time', '>', _timestamp(modified_after)),
+                ('f.modified_time', '<', _timestamp(modified_before))):
+            if value is not None:
+                clauses.append('{} {} ?'.format(column, op))
+                params.append(value)
+
+        if clauses:
+            sql.append('WHERE ' + ' AND '.join(clauses))
+        sql.append('ORDER BY f.modified_time DESC')
+        if limit is not None:
+            sql.append('LIMIT ?')
+            params.append(limit)
+
+        with self:
+            rows = self.connection.execute(' '.join(sql), params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def children(self, folder_id):
+        """Returns File resource dicts directly within folder_id."""
+        return self.query(parent=folder_id)
+
+    def ancestors(self, file_id):
+        """Returns the IDs of the folders holding file_id, nearest first,
+        following each file's first indexed parent."""
+        ancestors = []
+        with self:
+            while True:
+                row = self.connection.execute(
+                    'SELECT p.parent_id FROM parents p JOIN files f '
+                    'ON f.id = p.parent_id WHERE p.file_id = ? LIMIT 1',
+                    (file_id,)
+                ).fetchone()
+                if not row or row[0] in ancestors:
+                    return ancestors
+                file_id = row[0]
+                ancestors.append(file_id)
+
+    def path(self, file_id):
+        """Returns the '/'-separated path of file_id from its top-most
+        indexed folder, or None if file_id isn't indexed."""
+        data = self.get(file_id)
+        if data is None:
+            return None
+
+        folders = reversed(self.ancestors(file_id))
+        names = [self.get(each)['name'] for each in folders] + [data['name']]
+        return '/' + '/'.join(names)
+
+    def resolve(self, path):
+        """Returns the ID of the file at path, as returned by `path`, or
+        None. Where names are duplicated the first match is returned.
+        """
+        names = [name for name in path.split('/') if name]
+        if not names:
+            return None
+
+        with self:
+            # top-level files have no indexed parent
+            row = self.connection.execute(
+                'SELECT id FROM files WHERE name = ? AND id NOT IN ('
+                'SELECT p.file_id FROM parents p JOIN files f '
+                'ON f.id = p.parent_id) LIMIT 1', (names[0],)
+            ).fetchone()
+
+            for name in names[1:]:
+                if not row:
+                    break
+                row = self.connection.execute(
+                    'SELECT f.id FROM files f JOIN parents p '
+                    'ON p.file_id = f.id WHERE p.parent_id = ? AND f.name = ? '
+                    'LIMIT 1', (row[0], name)
+                ).fetchone()
+
+        return row[0] if row else None
+
+    def get_state(self, key, default=None):
+        with self:
+            row = self.connection.execute(
+                'SELECT value FROM state WHERE key = ?', (key,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value):
+        with self:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO state VALUES (?, ?)', (key, value)
+            )
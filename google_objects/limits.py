@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Rate Limits
+    client side throttling of API calls
+
+"""
+
+import time
+import logging
+import threading
+import functools
+import contextlib
+import collections
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket(object):
+
+    """Holds callers to a sustained rate of operations per second,
+    allowing bursts of up to capacity. Safe to share between threads,
+    callers are served in the order they arrive.
+
+    :rate: operations per second
+    :capacity: burst size, defaults to rate and at least 1
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Takes tokens, sleeping until they would have been refilled,
+        returns the seconds waited."""
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+            # reserve tokens now, so later callers wait behind this one
+            self.tokens -= tokens
+            delay = max(0.0, -self.tokens / self.rate)
+
+        if delay:
+            log.debug('rate limited for %.3fs', delay)
+            time.sleep(delay)
+        return delay
+
+
+def throttled(error):
+    """True if error is an HttpError answering a request with 429 or
+    503, or a 403 for exceeding a rate limit."""
+    response = getattr(error, 'resp', None)
+    status = getattr(response, 'status', None)
+    if status in (429, 503):
+        return True
+    if status == 403:
+        content = getattr(error, 'content', b'') or b''
+        return b'RateLimitExceeded' in content or \
+            b'rateLimitExceeded' in content
+    return False
+
+
+class AdaptiveLimit(object):
+
+    """Bounds concurrent calls by a limit adjusted AIMD style, as TCP
+    congestion control: the limit grows by one per limit calls whose
+    latency stays within tolerance times the recent minimum, and is
+    multiplied by backoff, at most once per cooldown seconds, when a
+    call is throttled or slow. Safe to share between threads and
+    clients, see `shared`.
+
+    Slots are re-entrant, a thread already holding one doesn't wait
+    for another, so calls made by a task holding a slot don't count
+    twice. Throttling is reported by whichever slot sees it first.
+
+    :initial: starting limit
+    :minimum: lowest limit
+    :maximum: highest limit
+    :backoff: factor applied to the limit on congestion
+    :tolerance: latency over the recent minimum taken as congestion
+    :cooldown: seconds between decreases
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=32, backoff=0.5,
+                 tolerance=3.0, cooldown=1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.throttled_count = 0
+        self.__limit = float(min(max(initial, minimum), maximum))
+        self.__decreased = 0
+        self.__latencies = collections.defaultdict(
+            functools.partial(collections.deque, maxlen=100)
+        )
+        self.__held = threading.local()
+        self.__cond = threading.Condition()
+
+    def __repr__(self):
+        return '<AdaptiveLimit limit={} in_flight={}>'.format(
+            self.limit, self.in_flight
+        )
+
+    @classmethod
+    def shared(cls, key, **options):
+        """Returns the limit shared by every caller passing key, e.g.
+        the credentials of a project, created with options once."""
+        with _SHARED_LOCK:
+            if key not in _SHARED:
+                _SHARED[key] = cls(**options)
+            return _SHARED[key]
+
+    @property
+    def limit(self):
+        return int(self.__limit)
+
+    @property
+    def held(self):
+        """True if the calling thread holds a slot."""
+        return bool(getattr(self.__held, 'depth', 0))
+
+    def acquire(self, timeout=None):
+        """Takes a slot, waiting while limit calls are in flight,
+        returns False if none was free within timeout seconds."""
+        if self.held:
+            self.__held.depth += 1
+            return True
+
+        if not self.reserve(timeout):
+            return False
+        self.__held.depth = 1
+        return True
+
+    def release(self, error=None):
+        """Gives back a slot, throttling the limit if the error ending
+        the call holding it shows the API throttled it, once per error
+        however many nested slots it ends."""
+        self.__held.depth -= 1
+        if error is not None and throttled(error) and \
+                getattr(self.__held, 'reported', None) is not error:
+            self.__held.reported = error
+            self.throttle()
+        if not self.__held.depth:
+            self.__held.reported = None
+            self.__free()
+
+    def reserve(self, timeout=None):
+        """Takes a slot for a task run by another thread, which must
+        pass reserved=True to `call`."""
+        with self.__cond:
+            if not self.__cond.wait_for(
+                    lambda: self.in_flight < self.limit, timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def cancel(self):
+        """Gives back a slot reserved for a task that won't run."""
+        self.__free()
+
+    def __free(self):
+        with self.__cond:
+            self.in_flight -= 1
+            self.__cond.notify()
+
+    @contextlib.contextmanager
+    def slot(self, timeout=None):
+        """Holds a slot within the context, see `release`."""
+        if not self.acquire(timeout):
+            raise TimeoutError('No free slot within {}s.'.format(timeout))
+        try:
+            yield
+        except Exception as e:
+            self.release(e)
+            raise
+        self.release()
+
+    def call(self, fn, *args, reserved=False, **kwargs):
+        """Calls fn holding a slot, the one reserved for it if
+        reserved."""
+        if not reserved:
+            with self.slot():
+                return fn(*args, **kwargs)
+
+        # the worker thread takes over the slot reserved for it
+        self.__held.depth = 1
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.release(e)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.release()
+        return result
+
+    def record(self, seconds, key=None):
+        """Adds the latency of a successful call, growing the limit
+        while latencies are healthy, shrinking it if seconds isn't.
+        Latencies are compared with the recent ones of the same key,
+        e.g. the API method, as methods differ in cost."""
+        with self.__cond:
+            latencies = self.__latencies[key]
+            latencies.append(seconds)
+            healthy = seconds <= self.tolerance * min(latencies)
+
+            if healthy:
+                grown = min(self.maximum, self.__limit + 1 / self.__limit)
+                if int(grown) > self.limit:
+                    self.__cond.notify_all()
+                self.__limit = grown
+                return
+
+        log.debug('latency of %.3fs over tolerance', seconds)
+        self.__decrease()
+
+    def throttle(self):
+        """Shrinks the limit after the API throttled a call."""
+        with self.__cond:
+            self.throttled_count += 1
+        self.__decrease()
+
+    def __decrease(self):
+        with self.__cond:
+            now = time.monotonic()
+            if now - self.__decreased < self.cooldown:
+                return
+            self.__decreased = now
+            self.__limit = max(self.minimum, self.__limit * self.backoff)
+            log.debug('concurrency limit lowered to %d', self.limit)
+
+
+class AdaptiveExecutor(ThreadPoolExecutor):
+
+    """Thread pool whose tasks each hold a slot of an <AdaptiveLimit>
+    while running, so at most its current limit run at once. Submitting
+    blocks until the limit allows another task, so threads are only
+    started as the limit grows.
+
+    :limit: <AdaptiveLimit>
+    :max_workers: threads, defaults to the limit's maximum
+    """
+
+    def __init__(self, limit, max_workers=None):
+        super().__init__(max_workers or limit.maximum)
+        self.limit = limit
+
+    def submit(self, fn, *args, **kwargs):
+        # a task holding a slot may not wait for another, which could
+        # never come while it waits on its subtasks, so they run inline
+        # within its slot
+        if self.limit.held:
+            future = Future()
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(self.limit.call(fn, *args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self.limit.reserve()
+        try:
+            future = super().submit(
+                self.limit.call, fn, *args, reserved=True, **kwargs
+            )
+        except BaseException:
+            self.limit.cancel()
+            raise
+
+        future.add_done_callback(self.__cancelled)
+        return future
+
+    def __cancelled(self, future):
+        if future.cancelled():
+            self.limit.cancel()
+
+
+# adaptive limits by key, see AdaptiveLimit.shared
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Media helpers for DriveClient uploads and downloads
+    imported on first use, as they depend on apiclient
+
+"""
+
+import hashlib
+import logging
+
+from googleapiclient.http import MediaUpload
+
+log = logging.getLogger(__name__)
+
+# chunks must be multiples of 256KiB for resumable uploads
+CHUNK_SIZE = 8 * 1024 * 1024
+
+EXPORT_TYPES = {
+    'csv': 'text/csv',
+    'tsv': 'text/tab-separated-values',
+    'pdf': 'application/pdf',
+    'txt': 'text/plain',
+    'html': 'text/html',
+    'xlsx': 'application/vnd.openxmlformats-officedocument'
+            '.spreadsheetml.sheet',
+    'docx': 'application/vnd.openxmlformats-officedocument'
+            '.wordprocessingml.document',
+    'pptx': 'application/vnd.openxmlformats-officedocument'
+            '.presentationml.presentation',
+}
+
+
+class ChecksumError(IOError):
+
+    """Raised when transferred content doesn't match Drive's md5Checksum"""
+
+
+class StreamUpload(MediaUpload):
+
+    """Resumable upload reading a binary file object one chunk at a time,
+    so neither a seekable nor a sized stream is required and at most one
+    chunk is held in memory. Computes the MD5 of the uploaded content.
+
+    Reads a byte ahead of each chunk, so the stream's end is known with
+    its last chunk even when that chunk is a full one.
+    """
+
+    def __init__(self, fd, mimetype='application/octet-stream',
+                 chunksize=CHUNK_SIZE):
+        super().__init__()
+        self._fd = fd
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._begin = 0
+        self._buffer = b''
+        self._size = None
+        self.md5 = hashlib.md5()
+        self.bytes_read = 0
+
+    def chunksize(self):
+        # the client ends the upload on a chunk shorter than this, a
+        # last full chunk has to read as one too
+        if self._size is not None:
+            return self._chunksize + 1
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._size
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def getbytes(self, begin, length):
+        """Returns bytes from offset begin, which may only move forward
+        or repeat bytes from the last chunk, as when a chunk is retried.
+        """
+        if begin < self._begin:
+            raise IOError('Cannot rewind a stream upload.')
+
+        # drop what the server acknowledged, read the remainder
+        self._buffer = self._buffer[begin - self._begin:]
+        self._begin = begin
+        while self._size is None and len(self._buffer) <= length:
+            data = self._fd.read(length + 1 - len(self._buffer))
+            if not data:
+                self._size = begin + len(self._buffer)
+                break
+            self.md5.update(data)
+            self.bytes_read += len(data)
+            self._buffer += data
+
+        return self._buffer[:length]
+
+    def to_json(self):
+        raise NotImplementedError('Stream uploads cannot be serialized.')
+
+
+class HashingWriter(object):
+
+    """Writes through to a binary file object, computing the MD5 of
+    everything written."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.md5 = hashlib.md5()
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.md5.update(data)
+        self.bytes_written += len(data)
+        return self.fd.write(data)
+
+
+def verify(md5, checksum, name):
+    """Raises ChecksumError if checksum is given and differs from md5."""
+    if checksum and md5.hexdigest() != checksum:
+        raise ChecksumError(
+            'Checksum mismatch for {}: expected {}, got {}'.format(
+                name, checksum, md5.hexdigest()
+            )
+        )
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Drive Push Notifications
+    WSGI receiver for files().watch channels
+
+"""
+
+import time
+import secrets
+import logging
+import threading
+import collections
+
+from google_objects.core import GoogleObject
+
+log = logging.getLogger(__name__)
+
+# notifications coalesced per file, see NotificationReceiver.poll
+Notification = collections.namedtuple(
+    'Notification', ['file_id', 'states', 'changed', 'count']
+)
+
+_STATUS = {
+    200: '200 OK',
+    403: '403 Forbidden',
+    404: '404 Not Found',
+    405: '405 Method Not Allowed',
+}
+
+
+class Channel(GoogleObject):
+
+    """Drive notification channel watching a single file"""
+
+    def __init__(self, file_id=None, **kwargs):
+        self.file_id = file_id
+        super().__init__(**kwargs)
+
+    @property
+    def id(self):
+        return self.data['id']
+
+    @property
+    def resource_id(self):
+        return self.data['resourceId']
+
+    @property
+    def token(self):
+        return self.data.get('token')
+
+    @property
+    def expiration(self):
+        """Expiry as seconds since the epoch, None if unknown."""
+        if not self.data.get('expiration'):
+            return None
+        return int(self.data['expiration']) / 1000
+
+
+class NotificationReceiver(object):
+
+    """WSGI application receiving Drive push notifications for files
+    it watches. Notifications are checked against their channel's
+    token, then coalesced per file until the file has been quiet for
+    :delay: seconds (or :max_delay: seconds have passed), so a burst
+    of edits reaches handlers as a single <Notification>.
+
+    Call `poll` periodically, or `start` a thread doing so, to
+    dispatch due notifications and renew channels before they expire:
+
+        receiver = NotificationReceiver(client, 'https://example.com/')
+        receiver.add_handler(print)
+        receiver.watch(file_id)
+        receiver.start()
+        wsgiref.simple_server.make_server('', 8080, receiver).serve_forever()
+
+    :client: <DriveClient>
+    :address: HTTPS URL notifications are delivered to
+    :delay: seconds without notifications before a file is dispatched
+    :max_delay: longest a notification is held, defaults to 10 delays
+    :renew_before: seconds before expiry at which channels are renewed
+    :ttl: requested channel lifetime in seconds, Drive's default if None
+    """
+
+    def __init__(self, client, address, delay=1.0, max_delay=None,
+                 renew_before=600, ttl=None):
+        self.client = client
+        self.address = address
+        self.delay = delay
+        self.max_delay = max_delay or delay * 10
+        self.renew_before = renew_before
+        self.ttl = ttl
+
+        self.handlers = []
+        self.channels = {}
+        self.lock = threading.Lock()
+        self.__pending = collections.OrderedDict()
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    # channels
+
+    def watch(self, file_id):
+        """Opens a channel watching file_id, returns the <Channel>."""
+
+        token = secrets.token_urlsafe(16)
+        expiration = None
+        if self.ttl:
+            expiration = int((time.time() + self.ttl) * 1000)
+
+        data = self.client.watch_file(
+            file_id, callback=self.address, token=token,
+            expiration=expiration
+        )
+        channel = Channel(file_id, **dict(data, token=token))
+        with self.lock:
+            self.channels[channel.id] = channel
+
+        log.debug('watching %s on channel %s', file_id, channel.id)
+        return channel
+
+    def unwatch(self, channel):
+        """Stops a <Channel> or channel ID."""
+
+        channel_id = getattr(channel, 'id', channel)
+        with self.lock:
+            channel = self.channels.pop(channel_id, None)
+        if channel is not None:
+            self.client.stop_channel(channel.id, channel.resource_id)
+
+    def renew(self, now=None):
+        """Replaces channels expiring within renew_before seconds,
+        returns the new <Channel>s. The old channel is stopped once the
+        new one is open, so no notification is missed."""
+
+        now = now or time.time()
+        with self.lock:
+            expiring = [
+                c for c in self.channels.values()
+                if c.expiration and c.expiration - now < self.renew_before
+            ]
+
+        renewed = []
+        for channel in expiring:
+            try:
+                renewed.append(self.watch(channel.file_id))
+                self.unwatch(channel)
+            except Exception:
+                log.exception('failed to renew channel %s', channel.id)
+        return renewed
+
+    # notifications
+
+    def add_handler(self, handler):
+        """Registers handler, called with each <Notification>, returns
+        it, so it can be used as a decorator."""
+        self.handlers.append(handler)
+        return handler
+
+    def notify(self, file_id, state, changed=(), now=None):
+        """Records a notification, held until dispatched by `poll`."""
+
+        now = now or time.time()
+        with self.lock:
+            pending = self.__pending.get(file_id)
+            if pending is None:
+                pending = self.__pending[file_id] = {
+                    'first': now, 'states': set(), 'changed': set(),
+                    'count': 0
+                }
+            pending['last'] = now
+            pending['states'].add(state)
+            pending['changed'].update(changed)
+            pending['count'] += 1
+
+    def poll(self, now=None):
+        """Dispatches notifications that are due, renews expiring
+        channels, returns the number of notifications dispatched."""
+
+        now = now or time.time()
+        dispatched = self.dispatch(now)
+        self.renew(now)
+        return dispatched
+
+    def dispatch(self, now=None):
+        """Calls handlers with notifications that are due, all of them
+        if now is infinite, returns the number dispatched."""
+
+        now = now or time.time()
+        with self.lock:
+            due = [
+                (file_id, self.__pending.pop(file_id))
+                for file_id, p in list(self.__pending.items())
+                if now - p['last'] >= self.delay or
+                now - p['first'] >= self.max_delay
+            ]
+
+        for file_id, pending in due:
+            notification = Notification(
+                file_id, frozenset(pending['states']),
+                frozenset(pending['changed']), pending['count']
+            )
+            for handler in self.handlers:
+                try:
+                    handler(notification)
+                except Exception:
+                    log.exception('handler failed for %s', file_id)
+
+        return len(due)
+
+    def start(self, interval=None):
+        """Polls from a daemon thread every interval seconds, half the
+        delay by default, until `stop` is called."""
+
+        interval = interval or self.delay / 2
+
+        def run():
+            while not self.__stopped.wait(interval):
+                try:
+                    self.poll()
+                except Exception:
+                    log.exception('notification poll failed')
+
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=run, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self, unwatch=True):
+        """Stops polling, dispatching held notifications, and stops
+        every channel unless unwatch is False."""
+
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+        self.dispatch(float('inf'))
+        if unwatch:
+            for channel in list(self.channels.values()):
+                self.unwatch(channel)
+
+    # wsgi
+
+    def __call__(self, environ, start_response):
+        status = self.receive(environ)
+        start_response(_STATUS[status], [('Content-Length', '0')])
+        return [b'']
+
+    def receive(self, environ):
+        """Validates a notification request, returns the HTTP status."""
+
+        if environ.get('REQUEST_METHOD') != 'POST':
+            return 405
+
+        channel_id = environ.get('HTTP_X_GOOG_CHANNEL_ID')
+        with self.lock:
+            channel = self.channels.get(channel_id)
+
+        # not 5xx, which Drive retries
+        if channel is None:
+            return 404
+        if not secrets.compare_digest(
+                environ.get('HTTP_X_GOOG_CHANNEL_TOKEN', ''),
+                channel.token or ''):
+            log.warning('invalid token on channel %s', channel_id)
+            return 403
+
+        state = environ.get('HTTP_X_GOOG_RESOURCE_STATE', '')
+        if state != 'sync':
+            changed = environ.get('HTTP_X_GOOG_CHANGED', '')
+            self.notify(
+                channel.file_id, state,
+                [c.strip() for c in changed.split(',') if c.strip()]
+            )
+
+        return 200
@@ -8,19 +8,47 @@ Google Sheets API
 """
 
 import os
+import re
+import csv
+import io
+import numbers
 import logging
+import itertools
+import threading
+import collections
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas
-
+from google_objects import a1
+from google_objects import codec
 from google_objects.core import GoogleClient
 from google_objects.core import GoogleObject
+from google_objects.formatting import MAX_BYTES
+from google_objects.formatting import Formatter
 
 log = logging.getLogger(__name__)
 
 ENV_VARIABLE_NAME = 'GOOGLE_API_KEY'
 ENV_SERVICE_ACCOUNT = 'GOOGLE_SERVICE_ACCOUNT'
 
+# Visualization API query endpoint, served from docs.google.com rather
+# than the Sheets API root, unless that is overridden
+GVIZ_URL = 'https://docs.google.com/'
+GVIZ_PATH = 'spreadsheets/d/{}/gviz/tq'
+_SHEETS_ROOT = 'https://sheets.googleapis.com/'
+
+# `column label` in query clauses
+_LABEL = re.compile(r'`([^`]+)`')
+
+# column letters, as opposed to header labels
+_LETTERS = re.compile(r'[A-Z]{1,3}$')
+
+
+# row counts of Sheet.sync_dataframe
+RowChanges = collections.namedtuple(
+    'RowChanges', ['inserted', 'updated', 'deleted']
+)
+
 
 def _value_to_cell(val):
     if str(val).isdigit():
@@ -32,6 +60,25 @@ def _value_to_cell(val):
     return {'userEnteredValue': {'stringValue': str(val)}}
 
 
+def _typed_cell(val):
+    """Returns CellData holding val as a number, boolean or string by
+    its type, so digit strings stay strings, an empty cell for None and
+    NaN."""
+
+    # numpy scalars to their python equivalent
+    if hasattr(val, 'item') and not isinstance(val, (str, bytes)):
+        val = val.item()
+
+    if val is None or val != val:
+        return {}
+    if isinstance(val, bool):
+        return {'userEnteredValue': {'boolValue': val}}
+    if isinstance(val, numbers.Number):
+        return {'userEnteredValue': {'numberValue': val}}
+
+    return {'userEnteredValue': {'stringValue': str(val)}}
+
+
 def _cells_to_row(cells):
     return [_value_to_cell(cell) for cell in cells]
 
@@ -49,19 +96,47 @@ def _format_sheet(sheet):
     }
 
 
-def _grid_to_a1(sheet_name, start, end):
-    start_row, start_col = start
-    end_row, end_col = end
+def _runs(indexes):
+    """Yields (first, last) of each run of consecutive integers."""
+    runs = itertools.groupby(enumerate(indexes), lambda e: e[1] - e[0])
+    for _, run in runs:
+        run = list(run)
+        yield run[0][1], run[-1][1]
+
 
-    start_row_a1 = start_row + 1
-    start_col_a1 = chr(start_col % 26 + 65)
-    end_row_a1 = end_row
-    end_col_a1 = chr(end_col % 26 + 64)
+def _dimension(kind, sheet_id, start, end, **params):
+    return {kind: dict(params, range={
+        'sheetId': sheet_id,
+        'dimension': 'ROWS',
+        'startIndex': start,
+        'endIndex': end,
+    })}
 
-    return '\'{}\'!{}{}:{}{}'.format(
-        sheet_name, start_col_a1, start_row_a1,
-        end_col_a1, end_row_a1
-    )
+
+def _update_cells(sheet_id, row, column, rows):
+    """updateCells request writing rows of values from (row, column),
+    clearing cells of None."""
+    return {'updateCells': {
+        'start': {'sheetId': sheet_id, 'rowIndex': row, 'columnIndex': column},
+        'rows': [{'values': [_typed_cell(value) for value in values]}
+                 for values in rows],
+        'fields': 'userEnteredValue',
+    }}
+
+
+def _csv_rows(response, content):
+    """Postprocessor of a Visualization API query answered as CSV."""
+    return list(csv.reader(io.StringIO(content.decode('utf-8'))))
+
+
+def _chunks(iterable, size):
+    """Yields lists of at most :size: items, consuming :iterable: lazily."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class SheetsClient(GoogleClient):
@@ -79,9 +154,9 @@ class SheetsClient(GoogleClient):
         :returns: <Spreadsheet> Model
 
         """
-        data = self.resource.spreadsheets().get(
+        data = self._execute(self.resource.spreadsheets().get(
             spreadsheetId=id
-        ).execute()
+        ))
 
         return Spreadsheet.from_existing(data, self)
 
@@ -123,72 +198,208 @@ class SheetsClient(GoogleClient):
 
         return self.create_spreadsheet(sheets, title=title, **options)
 
+    def create_spreadsheet_from_rows(self, rows, chunk_size=1000, **options):
+        """Creates a new Google Spreadsheet from an iterable of rows, the
+        first of which is used as the header. Remaining rows are consumed
+        lazily and appended in chunks, the next chunk being read while the
+        previous one is uploaded, so arbitrarily long iterables are sent
+        with bounded memory. An error raised once the spreadsheet exists
+        carries it, partly written, as its `spreadsheet` attribute.
+
+        :rows: iterable of row lists, header first
+        :chunk_size: number of rows sent per append request
+        :**options: Google Spreadsheet initialization options
+        :returns: Spreadsheet
+
+        """
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError('No rows provided.')
+
+        time = datetime.now().strftime("%I:%M%p on %B %d, %Y")
+        title = options.pop('title', None) or 'Generated at {}'.format(time)
+        sheet = _format_sheet({'title': title, 'values': [header]})
+        spreadsheet = self.create_spreadsheet([sheet], title=title, **options)
+
+        # a single worker keeps appends ordered, waiting on the pending
+        # append before submitting the next keeps one chunk in flight
+        rng = a1.quote(title)
+        try:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                pending = None
+                for chunk in _chunks(rows, chunk_size):
+                    if pending:
+                        pending.result()
+                    pending = executor.submit(
+                        self.append_values, spreadsheet.id, rng, chunk
+                    )
+                if pending:
+                    pending.result()
+        except Exception as e:
+            e.spreadsheet = spreadsheet
+            raise
+
+        return spreadsheet
+
     def create_spreadsheet(self, sheets=[], **kwargs):
-        data = self.resource.spreadsheets().create(
+        data = self._execute(self.resource.spreadsheets().create(
             body={
                 'properties': kwargs,
                 'sheets': sheets
             }
-        ).execute()
+        ))
 
         return Spreadsheet(self, **data)
 
-    def get_values(self, spreadsheet_id, range_name):
-        """Initialize a new block and return it"""
+    def get_values(self, spreadsheet_id, range_name, **options):
+        """Initialize a new block and return it
 
-        data = self.resource.spreadsheets().values().get(
+        :**options: values.get parameters, e.g. valueRenderOption
+                    'UNFORMATTED_VALUE' for typed numbers and booleans
+        """
+
+        data = self._execute(self.resource.spreadsheets().values().get(
             spreadsheetId=spreadsheet_id,
-            range=range_name
-        ).execute()
+            range=range_name,
+            **options
+        ))
 
         return Block.from_existing(data, self)
 
+    def get_array(self, spreadsheet_id, range_name, header=False, **options):
+        """Returns an <ArrayBlock> of a range's unformatted values.
+
+        :header: holds the first row as column labels
+        :**options: values.get parameters
+        """
+        from google_objects.arrays import ArrayBlock
+
+        options.setdefault('valueRenderOption', 'UNFORMATTED_VALUE')
+        block = self.get_values(spreadsheet_id, range_name, **options)
+        # unloaded, only its id is needed to update the block
+        block.spreadsheet = Spreadsheet(self, spreadsheetId=spreadsheet_id)
+        return ArrayBlock.from_block(block, header)
+
+    def batch_get_values(self, spreadsheet_id, ranges, **options):
+        """Returns a <Block> per range, read in one values.batchGet.
+
+        :ranges: list of ranges in A1 notation
+        :**options: values.batchGet parameters, e.g. majorDimension
+
+        """
+        data = self._execute(self.resource.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=list(ranges),
+            **options
+        ))
+
+        return [Block.from_existing(each, self)
+                for each in data.get('valueRanges', [])]
+
+    def query_values(self, spreadsheet_id, query, sheet=None, headers=1):
+        """Runs a Visualization API query server side, e.g.
+        "select A, C where B > 10", returns the matching rows as lists
+        of formatted strings, header rows first.
+
+        :query: Google Visualization API Query Language statement
+        :sheet: title of the queried sheet, the first if omitted
+        :headers: number of header rows
+
+        """
+        from urllib.parse import parse_qs
+        from urllib.parse import urlencode
+        from googleapiclient.http import HttpRequest
+
+        # an unsent spreadsheets.get carries the root, http and key
+        template = self.resource.spreadsheets().get(
+            spreadsheetId=spreadsheet_id
+        )
+        root, _, params = template.uri.partition('v4/spreadsheets/')
+        url = (GVIZ_URL if root == _SHEETS_ROOT else root) + \
+            GVIZ_PATH.format(spreadsheet_id)
+
+        params = {'key': parse_qs(params.partition('?')[2]).get('key')}
+        params.update(tqx='out:csv', tq=query, headers=headers)
+        if sheet is not None:
+            params['sheet'] = sheet
+        params = {k: v for k, v in params.items() if v is not None}
+
+        request = HttpRequest(
+            template.http, _csv_rows, url + '?' + urlencode(params, True),
+            method='GET', methodId='sheets.gviz.query'
+        )
+        return self._execute(request)
+
     def update_values(self, spreadsheet_id, range_name, values, format='RAW'):
-        data = self.resource.spreadsheets().values().update(
+        data = self._execute(self.resource.spreadsheets().values().update(
             spreadsheetId=spreadsheet_id,
             range=range_name,
             valueInputOption=format,
             body={'values': values}
-        ).execute()
+        ))
 
         return data
 
-    def append_values(self, spreadsheet_id, rng, values):
+    def append_values(self, spreadsheet_id, rng, values,
+                      format='USER_ENTERED'):
         """Append Values to Range.
 
         :spreadsheet: Google Spreadsheet ID
         :range: Range in A1 Notation
+        :format: valueInputOption, 'RAW' or 'USER_ENTERED'
         :returns: None
 
         """
 
-        data = self.resource.spreadsheets().values().append(
+        data = self._execute(self.resource.spreadsheets().values().append(
             spreadsheetId=spreadsheet_id,
             range=rng,
-            valueInputOption='USER_ENTERED',
+            valueInputOption=format,
             insertDataOption='INSERT_ROWS',
             body={'values': values}
-        ).execute()
+        ))
 
         return Block.from_existing(data, self)
 
     def push_updates(self, spreadsheet_id, updates):
+        """Sends update requests in one batchUpdate, returns the
+        response holding a reply per request."""
+
         spreadsheets = self.resource.spreadsheets()
-        spreadsheets.batchUpdate(
+        return self._execute(spreadsheets.batchUpdate(
             spreadsheetId=spreadsheet_id,
             body={'requests': updates}
-        ).execute()
+        ))
 
 
 class Spreadsheet(GoogleObject):
 
-    """Represents a Google API Spreadsheet object"""
+    """Represents a Google API Spreadsheet object, queues batchUpdate
+    requests added by `add_update` until `update` is called or the
+    queue reaches max_updates requests or max_bytes of JSON. With
+    background set, those automatic flushes are sent from a worker
+    thread, in order, while more requests are queued.
+    """
+
+    # thresholds of queued requests flushed by add_update
+    max_updates = 500
+    max_bytes = MAX_BYTES
+
+    # send automatic flushes from a worker thread
+    background = False
 
     def __init__(self, client, **kwargs):
         """Creates a new Spreadsheet Object"""
 
         self.client = client
         self.__updates = []
+        self.__callbacks = []
+        self.__size = 0
+        self.__titles = None
+        self.__lock = threading.Lock()
+        self.__executor = None
+        self.__pending = None
 
         # initalize the other properties
         super().__init__(**kwargs)
@@ -212,6 +423,22 @@ class Spreadsheet(GoogleObject):
     def sheets(self):
         return [sheet for sheet in self.yield_sheets()]
 
+    def sheet_title(self, sheet_id):
+        """Returns the title of the sheet with sheet_id from a map
+        built once, raises ValueError if there is no such sheet."""
+
+        if self.__titles is None:
+            self.__titles = {
+                sheet['properties'].get('sheetId', 0):
+                    sheet['properties'].get('title')
+                for sheet in self.data.get('sheets', [])
+            }
+
+        try:
+            return self.__titles[sheet_id]
+        except KeyError:
+            raise ValueError('Sheet with provided ID not found.')
+
     def get_sheet_by_id(self, sheet_id):
         """Returns sheet within presentation identified
         by the given argument, raises TypeError
@@ -268,22 +495,126 @@ class Spreadsheet(GoogleObject):
 
             return rng
 
-        _named_ranges = map(set_sheet_id, self.datanamed_ranges)
+        _named_ranges = map(set_sheet_id, self.data.get('namedRanges', []))
         return [NamedRange(self, each) for each in _named_ranges]
 
+    def add_update(self, update, callback=None):
+        """Adds update of type <Dict>
+        to updates list, flushing the list once full
+
+        :update: <Dict> of update request
+        :callback: called with the request's reply once sent
+        :returns: <Bool> of if request was added
+
+        """
+        if type(update) is not dict:
+            return False
+
+        size = len(codec.dumps(update))
+        if self.__updates and self.__size + size > self.max_bytes:
+            self.__flush()
+
+        with self.__lock:
+            self.__updates.append(update)
+            self.__callbacks.append(callback)
+            self.__size += size
+            full = len(self.__updates) >= self.max_updates
+
+        if full:
+            self.__flush()
+        return True
+
     def update(self):
-        if self.__updates:
-            self.client.push_updates(self.dataid, self._updates)
-            # TODO: add success handlers
-            del self._updates[:]
+        """Sends queued requests after any background flush, returns
+        their replies."""
+
+        self.__wait()
+        return self.__send(*self.__take())
+
+    def __take(self):
+        with self.__lock:
+            queued = self.__updates, self.__callbacks
+            self.__updates, self.__callbacks, self.__size = [], [], 0
+        return queued
+
+    def __flush(self):
+        if not self.background:
+            self.__send(*self.__take())
+            return
+
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=1)
+
+        # one batch in flight, raising errors of the previous one
+        queued = self.__take()
+        if self.__pending is not None:
+            self.__pending.result()
+        self.__pending = self.__executor.submit(self.__send, *queued)
+
+    def __wait(self):
+        pending, self.__pending = self.__pending, None
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+        if pending is not None:
+            pending.result()
+
+    def __send(self, updates, callbacks):
+        if not updates:
+            return []
+
+        response = self.client.push_updates(self.id, updates) or {}
+        replies = response.get('replies', [])
+        for update, reply, callback in zip(updates, replies, callbacks):
+            self._apply_reply(update, reply)
+            if callback is not None:
+                callback(reply)
+
+        log.debug('sent %d updates to %s', len(updates), self.id)
+        return replies
+
+    def _apply_reply(self, update, reply):
+        """Reflects a sent request in this spreadsheet's data."""
+
+        (kind, params), = update.items()
+        sheets = self.data.setdefault('sheets', [])
+        named_ranges = self.data.setdefault('namedRanges', [])
+
+        if kind in ('addSheet', 'duplicateSheet'):
+            sheets.append({'properties': reply[kind]['properties']})
+        elif kind == 'deleteSheet':
+            sheet_id = params['sheetId']
+            sheets[:] = [sheet for sheet in sheets
+                         if sheet['properties'].get('sheetId') != sheet_id]
+        elif kind == 'updateSheetProperties':
+            properties = params['properties']
+            fields = [f.strip() for f in params.get('fields', '').split(',')]
+            for sheet in sheets:
+                if sheet['properties'].get('sheetId') == \
+                        properties.get('sheetId', 0):
+                    sheet['properties'].update(
+                        (f, properties[f]) for f in fields if f in properties
+                    )
+        elif kind == 'addNamedRange':
+            named_ranges.append(reply[kind]['namedRange'])
+        elif kind == 'deleteNamedRange':
+            named_ranges[:] = [r for r in named_ranges
+                               if r['namedRangeId'] != params['namedRangeId']]
+        else:
+            return
+
+        # sheets may have changed
+        self.__titles = None
 
     def __iter__(self):
         return self.yield_sheets()
 
     def __getitem__(self, key):
         try:
-            if key.isdigit():
+            if isinstance(key, int):
                 return self.get_sheet_by_id(key)
+            elif key.isdigit():
+                return self.get_sheet_by_id(int(key))
             else:
                 return self.get_sheet_by_name(key)
         except ValueError:
@@ -304,7 +635,7 @@ class NamedRange(object):
 
     def __init__(self, spreadsheet, named_range):
         self.spreadsheet = spreadsheet
-        self.id = named_range.get('named_range_id')
+        self.id = named_range.get('namedRangeId')
         self.name = named_range.get('name')
         self.range = named_range.get('range')
 
@@ -315,39 +646,30 @@ class NamedRange(object):
 
     @property
     def sheet_name(self):
-        sheet = self.spreadsheet[self.sheet_id]
-        return sheet.title
+        return self.spreadsheet.sheet_title(self.sheet_id)
 
     @property
     def start_row(self):
-        if 'start_row_index' in self.range:
-            return self.range['start_row_index']
+        return self.range.get('startRowIndex')
 
     @property
     def end_row(self):
-        if 'end_row_index' in self.range:
-            return self.range['end_row_index']
+        return self.range.get('endRowIndex')
 
     @property
     def start_column(self):
-        if 'start_column_index' in self.range:
-            return self.range['start_column_index']
+        return self.range.get('startColumnIndex')
 
     @property
     def end_column(self):
-        if 'end_column_index' in self.range:
-            return self.range['end_column_index']
+        return self.range.get('endColumnIndex')
 
-    def as_a1(self):
-        sheet_name = None
-        for sheet in self.spreadsheet.sheets():
-            if self.sheet_id == sheet.id:
-                sheet_name = sheet.title
-                break
+    def grid_range(self):
+        """Returns the range as an <a1.GridRange>."""
+        return a1.GridRange.from_grid(self.range, self.sheet_name)
 
-        start = (self.start_row, self.start_column)
-        end = (self.end_row, self.end_column)
-        return _grid_to_a1(sheet_name, start, end)
+    def as_a1(self):
+        return self.grid_range().a1
 
     def get_block(self):
         return self.spreadsheet.get_range(self.as_a1())
@@ -404,7 +726,17 @@ class Sheet(GoogleObject):
 
         return block
     
+    def array(self, header=False, **options):
+        """Returns an <ArrayBlock> of the sheet's unformatted values."""
+        block = self.spreadsheet.client.get_array(
+            self.spreadsheet.id, a1.quote(self.title), header, **options
+        )
+        block.spreadsheet = self.spreadsheet
+        return block
+
     def dataframe(self, join_column_labels=False, header_row=0):
+        import pandas
+
         values = self.values().rows()
         header, data = values[header_row], values[header_row +1:]
 
@@ -417,6 +749,441 @@ class Sheet(GoogleObject):
 
         return df
 
+    def iter_rows(self, window=10000, prefetch=2, start=0, **options):
+        """Generates the sheet's rows, reading windows of rows sized
+        from the sheet's gridProperties, with the next windows fetched
+        concurrently while rows are consumed, so at most prefetch + 1
+        windows are held in memory. Empty rows are yielded as [],
+        trailing ones are dropped.
+
+        :window: rows per values.get request
+        :prefetch: windows fetched ahead, concurrently
+        :start: 0-based index of the first row read
+        :**options: values.get parameters, e.g. valueRenderOption
+
+        """
+        row_count = self.properties.get('gridProperties', {}).get('rowCount')
+        if row_count is None:
+            raise ValueError('Sheet has no gridProperties.rowCount.')
+
+        client = self.spreadsheet.client
+        windows = a1.split(
+            a1.GridRange(self.title, start_row=start), window, row_count
+        )
+
+        def fetch(rng):
+            block = client.get_values(self.spreadsheet.id, rng.a1, **options)
+            return rng.rows, block.data.get('values', [])
+
+        # trailing empty rows of a window are only known to be inner
+        # rows once a later window holds values
+        blank = 0
+        for size, rows in client.imap(fetch, windows, prefetch, prefetch):
+            if rows:
+                for _ in range(blank):
+                    yield []
+                for row in rows:
+                    yield row
+                blank = 0
+            blank += size - len(rows)
+
+    def iter_dataframes(self, chunksize=10000, header_row=0, prefetch=2,
+                        **options):
+        """Generates <pandas.DataFrame>s of at most chunksize rows,
+        labelled by the header row, reading the sheet with iter_rows.
+        """
+        import pandas
+
+        rows = self.iter_rows(chunksize, prefetch, header_row, **options)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        width = len(header)
+        for chunk in _chunks(rows, chunksize):
+            yield pandas.DataFrame(
+                [row[:width] + [''] * (width - len(row)) for row in chunk],
+                columns=header
+            )
+
+    def iter_arrow(self, window=10000, header_row=0, schema=None,
+                   prefetch=2, **options):
+        """Generates <pyarrow.RecordBatch>es of at most window rows,
+        labelled by the header row, reading unformatted values with
+        iter_rows. Without a schema, types are inferred from the first
+        window: numbers as float64, booleans as bool, others as string.
+        """
+        from google_objects import arrow
+
+        options.setdefault('valueRenderOption', 'UNFORMATTED_VALUE')
+        rows = self.iter_rows(window, prefetch, header_row, **options)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        names = [str(name) for name in header]
+        for chunk in _chunks(rows, window):
+            batch = arrow.record_batch(chunk, names, schema)
+            schema = batch.schema
+            yield batch
+
+    def to_arrow(self, window=10000, header_row=0, schema=None, **options):
+        """Returns a <pyarrow.Table> of the sheet, see iter_arrow."""
+        import pyarrow
+
+        batches = list(self.iter_arrow(
+            window, header_row, schema, **options
+        ))
+        if not batches:
+            return pyarrow.Table.from_batches([], schema or pyarrow.schema([]))
+        return pyarrow.Table.from_batches(batches)
+
+    def write_arrow(self, data, start_row=0, header=True):
+        """Writes a <pyarrow.Table>, RecordBatch or iterable of record
+        batches from start_row as typed cells, so strings are never
+        parsed into numbers, dates or formulas, in updateCells requests
+        of at most the spreadsheet's max_bytes, growing the sheet as
+        needed. Requests are sent directly, apart from the spreadsheet's
+        queued updates. Returns the number of rows written.
+
+        :header: writes the column names as the first row
+        """
+        from google_objects import arrow
+
+        client = self.spreadsheet.client
+        grid = self.properties.setdefault('gridProperties', {})
+
+        row = start_row
+        chunks = arrow.row_chunks(data, self.spreadsheet.max_bytes, header)
+        for count, rows in chunks:
+            requests = []
+            width = max(len(each['values']) for each in rows)
+            for dimension, size, key in (('ROWS', row + count, 'rowCount'),
+                                         ('COLUMNS', width, 'columnCount')):
+                missing = size - grid.get(key, size)
+                if missing > 0:
+                    requests.append({'appendDimension': {
+                        'sheetId': self.id, 'dimension': dimension,
+                        'length': missing
+                    }})
+                    grid[key] += missing
+
+            requests.append({'updateCells': {
+                'start': {
+                    'sheetId': self.id, 'rowIndex': row, 'columnIndex': 0
+                },
+                'rows': rows,
+                'fields': 'userEnteredValue',
+            }})
+            client.push_updates(self.spreadsheet.id, requests)
+            row += count
+
+        return row - start_row
+
+    def select(self, columns, header_row=0, **options):
+        """Returns a <Block> of only the given columns, from the header
+        row down, read in one values.batchGet of column ranges.
+
+        :columns: header labels, column letters or 0-based indexes
+        :header_row: 0-based index of the header row
+        :**options: values.batchGet parameters, e.g. valueRenderOption
+
+        """
+        indexes = self._column_indexes(columns, header_row)
+        client = self.spreadsheet.client
+
+        spans = list(_runs(sorted(set(indexes))))
+        blocks = client.batch_get_values(self.spreadsheet.id, [
+            a1.GridRange(self.title, header_row, None, first, last + 1).a1
+            for first, last in spans
+        ], majorDimension='COLUMNS', **options)
+
+        by_index = {}
+        for (first, last), block in zip(spans, blocks):
+            values = block.data.get('values', [])
+            for offset in range(last - first + 1):
+                by_index[first + offset] = \
+                    values[offset] if offset < len(values) else []
+
+        height = max([len(column) for column in by_index.values()] or [0])
+        selected = [by_index[index] for index in indexes]
+        rows = [[column[r] if r < len(column) else '' for column in selected]
+                for r in range(height)]
+
+        return Block(client, self.spreadsheet, range=a1.quote(self.title),
+                     values=rows)
+
+    def query(self, where=None, columns=None, header_row=0, order_by=None,
+              descending=False, limit=None):
+        """Returns a <Block> of the rows matching where, header first,
+        filtered server side by the Visualization API, so only matching
+        rows and selected columns are transferred. Values are formatted
+        strings.
+
+            sheet.query("`total` > 100 and C = 'open'", ['name', 'total'])
+
+        :where: Query Language condition on column letters, or on
+                header labels in backticks
+        :columns: header labels, column letters or 0-based indexes
+        :header_row: 0-based index of the header row
+        :order_by: header label, column letter or 0-based index to sort by
+        :descending: sorts in descending order
+        :limit: maximum number of rows
+
+        """
+        clauses = []
+        if columns is not None:
+            clauses.append('select ' + ', '.join(
+                a1.column_letters(index)
+                for index in self._column_indexes(columns, header_row)
+            ))
+        if where:
+            clauses.append('where ' + self._letters(where, header_row))
+        if order_by is not None:
+            index, = self._column_indexes([order_by], header_row)
+            clauses.append('order by {} {}'.format(
+                a1.column_letters(index), 'desc' if descending else 'asc'
+            ))
+        if limit is not None:
+            clauses.append('limit {:d}'.format(limit))
+
+        rows = self.spreadsheet.client.query_values(
+            self.spreadsheet.id, ' '.join(clauses), self.title, header_row + 1
+        )
+        return Block(self.spreadsheet.client, self.spreadsheet,
+                     range=a1.quote(self.title), values=rows)
+
+    def _header(self, header_row):
+        rng = a1.GridRange(self.title, header_row, header_row + 1)
+        block = self.spreadsheet.client.get_values(
+            self.spreadsheet.id, rng.a1
+        )
+        values = block.data.get('values', [[]])
+        return [str(label) for label in values[0]]
+
+    def _column_indexes(self, columns, header_row):
+        """Resolves labels and letters of columns to 0-based indexes,
+        reading the header row if labels are given, raises KeyError
+        for labels neither in the header nor column letters."""
+
+        header = None
+        indexes = []
+        for column in columns:
+            if isinstance(column, int):
+                indexes.append(column)
+                continue
+
+            if header is None:
+                header = self._header(header_row)
+            if column in header:
+                indexes.append(header.index(column))
+            elif _LETTERS.match(column):
+                indexes.append(a1.column_index(column))
+            else:
+                raise KeyError(column)
+
+        return indexes
+
+    def _letters(self, clause, header_row):
+        """Replaces `label`s in a query clause with column letters."""
+        if not _LABEL.search(clause):
+            return clause
+
+        header = self._header(header_row)
+
+        def letter(match):
+            if match.group(1) not in header:
+                raise ValueError('Unknown column: ' + match.group(1))
+            return a1.column_letters(header.index(match.group(1)))
+
+        return _LABEL.sub(letter, clause)
+
+    def append_sink(self, **options):
+        """Returns an <AppendSink> appending rows to this sheet in
+        batches, see <AppendSink> for options."""
+        from google_objects.sink import AppendSink
+
+        return AppendSink(self.spreadsheet.client, self.spreadsheet.id,
+                          a1.quote(self.title), **options)
+
+    def formatter(self, **options):
+        """Returns a <Formatter> collecting cell formats for this sheet,
+        sent in merged, batched requests on push or on leaving a with
+        block, see formatting.Formatter."""
+
+        grid = self.properties.get('gridProperties', {})
+        return Formatter(
+            self.spreadsheet.client, self.spreadsheet.id, self.id,
+            grid.get('rowCount'), grid.get('columnCount'), **options
+        )
+
+    def sync_dataframe(self, frame, key):
+        """Makes this sheet hold frame below a header row, reading the
+        sheet once and sending a single batchUpdate of only the rows to
+        delete, insert and update, so resyncing a mostly unchanged frame
+        sends little data. Rows are matched on the key columns; a
+        changed header or row order rewrites the whole sheet.
+
+        :frame: <pandas.DataFrame>
+        :key: column label or list of labels identifying rows
+        :returns: <RowChanges> counts of rows inserted, updated, deleted
+
+        """
+        keys = [key] if isinstance(key, str) else list(key)
+        if frame.duplicated(keys).any():
+            raise ValueError('Duplicate keys in frame.')
+
+        columns = [str(label) for label in frame.columns]
+        keys = [str(label) for label in keys]
+        width = len(columns)
+
+        block = self.spreadsheet.client.get_values(
+            self.spreadsheet.id, a1.quote(self.title),
+            valueRenderOption='UNFORMATTED_VALUE'
+        )
+        current = block.data.get('values', [])
+        rows = [row[:width] + [''] * (width - len(row)) for row in current[1:]]
+
+        # empty cells read back as '', compare None and NaN as such
+        new = frame.astype(object).where(frame.notna(), '')
+        new.columns = columns
+        values = new.values.tolist()
+        new_keys = list(new[keys].itertuples(index=False, name=None))
+
+        position = {}
+        key_columns = [columns.index(label) for label in keys]
+        old_keys = [tuple(row[c] for c in key_columns) for row in rows]
+        for index, row_key in enumerate(old_keys):
+            position.setdefault(row_key, index)
+
+        wanted = set(new_keys)
+        kept = [k for i, k in enumerate(old_keys)
+                if k in wanted and position[k] == i]
+        header = [str(value) for value in current[0]] if current else None
+
+        if header != columns or \
+                kept != [k for k in new_keys if k in position]:
+            requests = self._rewrite(columns, values, current)
+            changes = RowChanges(len(values), 0, len(rows))
+        else:
+            requests, changes = self._diff(
+                values, rows, new_keys, old_keys, position, wanted
+            )
+
+        if requests:
+            self.spreadsheet.client.push_updates(
+                self.spreadsheet.id, requests
+            )
+            self._resize(requests)
+
+        log.debug('synced %s: %d inserted, %d updated, %d deleted',
+                  self.title, *changes)
+        return changes
+
+    def _rewrite(self, header, values, current):
+        """Requests replacing all of the sheet's values."""
+
+        # pad rows to clear values beyond the new columns
+        width = max([len(header)] + [len(row) for row in current])
+        rows = [list(header)] + values
+        rows = [row + [None] * (width - len(row)) for row in rows]
+        height = len(current)
+        grid = self.properties.get('gridProperties', {})
+
+        requests = []
+        for dimension, size, count in (('ROWS', len(rows), 'rowCount'),
+                                       ('COLUMNS', width, 'columnCount')):
+            missing = size - grid.get(count, size)
+            if missing > 0:
+                requests.append({'appendDimension': {
+                    'sheetId': self.id, 'dimension': dimension,
+                    'length': missing
+                }})
+
+        requests.append(_update_cells(self.id, 0, 0, rows))
+        if height > len(rows):
+            requests.append(
+                _dimension('deleteDimension', self.id, len(rows), height)
+            )
+        return requests
+
+    def _resize(self, requests):
+        """Keeps the cached gridProperties counts in step with the
+        dimension requests sent for this sheet."""
+
+        grid = self.properties.setdefault('gridProperties', {})
+        counts = {'ROWS': 'rowCount', 'COLUMNS': 'columnCount'}
+        for request in requests:
+            kind, params = next(iter(request.items()))
+            if kind == 'appendDimension':
+                key, change = counts[params['dimension']], params['length']
+            elif kind in ('insertDimension', 'deleteDimension'):
+                span = params['range']
+                key = counts[span['dimension']]
+                change = span['endIndex'] - span['startIndex']
+                if kind == 'deleteDimension':
+                    change = -change
+            else:
+                continue
+            if key in grid:
+                grid[key] += change
+
+    def _diff(self, values, rows, new_keys, old_keys, position, wanted):
+        """Requests deleting, inserting and updating rows, in an order
+        keeping each request's row indexes valid."""
+        import numpy
+
+        requests = []
+
+        # deletes bottom up, leaving kept rows in frame order
+        deleted = [i for i, k in enumerate(old_keys)
+                   if k not in wanted or position[k] != i]
+        for first, last in reversed(list(_runs(deleted))):
+            requests.append(_dimension(
+                'deleteDimension', self.id, first + 1, last + 2
+            ))
+
+        # compare matched rows at once
+        matched = [(p, position[k]) for p, k in enumerate(new_keys)
+                   if k in position]
+        changed = {}
+        if matched:
+            new_index, old_index = zip(*matched)
+            new_values = numpy.empty((len(matched), len(values[0])), object)
+            new_values[:] = [values[p] for p in new_index]
+            old_values = numpy.empty_like(new_values)
+            old_values[:] = [rows[i] for i in old_index]
+            differs = new_values != old_values
+            for row in differs.any(axis=1).nonzero()[0]:
+                changed[new_index[row]] = differs[row].nonzero()[0]
+
+        # inserts and updates top down, in final row indexes
+        inserted = [p for p, k in enumerate(new_keys) if k not in position]
+        runs = [(first, last, True) for first, last in _runs(inserted)]
+        runs += [(first, last, False)
+                 for first, last in _runs(sorted(changed))]
+
+        for first, last, insert in sorted(runs):
+            if insert:
+                requests.append(_dimension(
+                    'insertDimension', self.id, first + 1, last + 2,
+                    inheritFromBefore=True
+                ))
+                requests.append(_update_cells(
+                    self.id, first + 1, 0, values[first:last + 1]
+                ))
+            else:
+                cols = numpy.concatenate(
+                    [changed[p] for p in range(first, last + 1)]
+                )
+                start, end = int(cols.min()), int(cols.max()) + 1
+                requests.append(_update_cells(
+                    self.id, first + 1, start,
+                    [row[start:end] for row in values[first:last + 1]]
+                ))
+
+        return requests, RowChanges(len(inserted), len(changed), len(deleted))
+
 
 class Block(GoogleObject):
 
@@ -462,9 +1229,28 @@ class Block(GoogleObject):
     def rows(self):
         return [row for row in self.yield_rows()]
 
+    def array(self, header=False):
+        """Returns an <ArrayBlock> of this block's values."""
+        from google_objects.arrays import ArrayBlock
+
+        return ArrayBlock.from_block(self, header)
+
+    def dataframe(self, header_row=0):
+        """Returns a <pandas.DataFrame> labelled by the header row."""
+        import pandas
+
+        values = self.values
+        header = values[header_row] if len(values) > header_row else []
+        width = len(header)
+        return pandas.DataFrame(
+            [row[:width] + [''] * (width - len(row))
+             for row in values[header_row + 1:]],
+            columns=header
+        )
+
     @property
     def values(self):
-        return self.data['values']
+        return self.data.get('values', [])
 
     @property
     def range(self):
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Append Sink
+    buffers rows streamed into a sheet, appending them in batches
+
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+
+from google_objects.limits import TokenBucket
+
+log = logging.getLogger(__name__)
+
+# loggers of the requests sending batches, whose records would feed
+# back into a sink attached to the root logger
+_SENDERS = ('google_objects', 'googleapiclient', 'httplib2')
+
+
+def _not_sending(record):
+    """Filters out records logged while sending batches."""
+    return not any(record.name == name or record.name.startswith(name + '.')
+                   for name in _SENDERS)
+
+
+class AppendSink(logging.Handler):
+
+    """Buffers rows and appends them to a range with a single
+    values.append per batch, sent from a worker thread once max_rows
+    are buffered or the oldest row has waited interval seconds.
+
+    Batches are sent one at a time, in the order rows were added, at
+    most write_rate per second. Adding rows blocks while max_pending
+    rows are unsent. Closing, or leaving the context, sends the rest:
+
+        with sheet.append_sink(max_rows=200) as sink:
+            for event in events:
+                sink.append([event.time, event.name, event.value])
+
+    As a <logging.Handler>, each record is appended as a row of its
+    timestamp, level, logger name and formatted message:
+
+        logging.getLogger('jobs').addHandler(sheet.append_sink())
+
+    Records of google_objects, googleapiclient and httplib2, logged
+    while sending batches, are dropped.
+
+    A failed batch is kept and retried after interval seconds, its
+    error raised by the next `flush` or `close`. Rows still buffered
+    at exit are lost unless the sink is closed, which `logging` does
+    for registered handlers.
+
+    :client: <SheetsClient>
+    :spreadsheet_id: Google Spreadsheet ID
+    :rng: range in A1 notation of the table appended to
+    :max_rows: rows per batch
+    :interval: seconds a row waits before its batch is sent
+    :max_pending: unsent rows at which adding rows blocks
+    :value_input: valueInputOption, 'RAW' or 'USER_ENTERED'
+    :limiter: <TokenBucket> shared between sinks, defaults to one
+              of write_rate
+    """
+
+    # appends per second, within the per user write quota
+    write_rate = 1
+
+    def __init__(self, client, spreadsheet_id, rng, max_rows=500,
+                 interval=5.0, max_pending=10000, value_input='RAW',
+                 limiter=None, level=logging.NOTSET):
+        super().__init__(level)
+        self.client = client
+        self.spreadsheet_id = spreadsheet_id
+        self.range = rng
+        self.max_rows = max_rows
+        self.interval = interval
+        self.max_pending = max(max_pending, max_rows)
+        self.value_input = value_input
+        self.limiter = limiter or TokenBucket(self.write_rate)
+        self.addFilter(_not_sending)
+
+        self.rows_sent = 0
+        self.batches_sent = 0
+        self.__rows = []
+        self.__oldest = None
+        self.__pending = 0
+        self.__flushes = 0
+        self.__closing = False
+        self.__error = None
+        self.__cond = threading.Condition()
+        self.__thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        self.close()
+
+    def __len__(self):
+        """Number of rows not yet sent."""
+        return self.__pending
+
+    def append(self, row):
+        """Buffers a row, a list of values."""
+        self.extend([row])
+
+    def extend(self, rows):
+        """Buffers rows, blocking while max_pending rows are unsent."""
+
+        rows = [list(row) for row in rows]
+        with self.__cond:
+            if self.__closing:
+                raise ValueError('Append to a closed sink.')
+            self.__start()
+
+            while rows:
+                while self.__pending >= self.max_pending:
+                    self.__cond.wait()
+                room = self.max_pending - self.__pending
+                added, rows = rows[:room], rows[room:]
+                if not self.__rows:
+                    self.__oldest = time.monotonic()
+                self.__rows.extend(added)
+                self.__pending += len(added)
+                self.__cond.notify_all()
+
+    def flush(self):
+        """Sends buffered rows, waiting until every row added before
+        the call is appended, raises the error of a failed batch."""
+
+        with self.__cond:
+            target = self.rows_sent + self.__pending
+            self.__flushes += 1
+            self.__cond.notify_all()
+            try:
+                while self.rows_sent < target and self.__error is None \
+                        and self.__running():
+                    self.__cond.wait()
+            finally:
+                self.__flushes -= 1
+            self.__raise()
+
+    def close(self):
+        """Sends buffered rows and stops the worker thread, raises the
+        error of a failed batch."""
+
+        with self.__cond:
+            self.__closing = True
+            self.__cond.notify_all()
+            thread = self.__thread
+
+        try:
+            if thread is not None:
+                thread.join()
+            with self.__cond:
+                self.__raise()
+        finally:
+            super().close()
+
+    def emit(self, record):
+        try:
+            self.append(self.record_row(record))
+        except Exception:
+            self.handleError(record)
+
+    def record_row(self, record):
+        """Returns the row appended for a log record."""
+        return [
+            datetime.fromtimestamp(record.created).isoformat(' '),
+            record.levelname,
+            record.name,
+            self.format(record),
+        ]
+
+    def __raise(self):
+        error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def __running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def __start(self):
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run)
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def __due(self):
+        """Seconds until the next batch is due, 0 if it is, None if
+        no rows are buffered."""
+        if not self.__rows:
+            return None
+        if self.__closing or self.__flushes or \
+                len(self.__rows) >= self.max_rows:
+            return 0
+        return max(0, self.__oldest + self.interval - time.monotonic())
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                due = self.__due()
+                while due != 0:
+                    if due is None and self.__closing:
+                        return
+                    self.__cond.wait(due)
+                    due = self.__due()
+
+                batch = self.__rows[:self.max_rows]
+                del self.__rows[:len(batch)]
+
+            try:
+                self.limiter.acquire()
+                self.client.append_values(
+                    self.spreadsheet_id, self.range, batch,
+                    format=self.value_input
+                )
+            except Exception as e:
+                log.warning('append of %d rows to %s failed: %s',
+                            len(batch), self.range, e)
+                with self.__cond:
+                    self.__rows[:0] = batch
+                    self.__oldest = time.monotonic()
+                    self.__error = e
+                    self.__cond.notify_all()
+                    if self.__closing:
+                        return
+                    # back off before retrying, unless closed meanwhile
+                    self.__cond.wait(self.interval)
+                continue
+
+            with self.__cond:
+                self.__pending -= len(batch)
+                self.rows_sent += len(batch)
+                self.batches_sent += 1
+                self.__cond.notify_all()
+
+            log.debug('appended %d rows to %s', len(batch), self.range)
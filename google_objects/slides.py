@@ -39,9 +39,9 @@ class SlidesClient(GoogleClient):
         :returns: <Presentation> Model
 
         """
-        data = self.resource.presentations().get(
+        data = self._execute(self.resource.presentations().get(
             presentationId=presentation_id
-        ).execute()
+        ))
 
         return Presentation.from_existing(data, self)
 
@@ -52,10 +52,10 @@ class SlidesClient(GoogleClient):
         :returns: <Page> Model
 
         """
-        data = self.resource.presentations().pages().get(
+        data = self._execute(self.resource.presentations().pages().get(
             presentationId=presentation_id,
             pageObjectId=page_id
-        ).execute()
+        ))
 
         return Page.from_existing(data)
 
@@ -63,10 +63,10 @@ class SlidesClient(GoogleClient):
         """Push Update Requests to Presentation API,
         throw errors if necessary.
         """
-        self.resource.presentations().batchUpdate(
+        self._execute(self.resource.presentations().batchUpdate(
             presentationId=presentation_id,
             body={'requests': updates}
-        ).execute()
+        ))
 
 
 class Presentation(GoogleObject):
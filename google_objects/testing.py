@@ -0,0 +1,1238 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Local stand-in for the Google APIs
+    used by DriveClient, SheetsClient and SlidesClient
+
+Serves the Drive v3, Sheets v4 and Slides v1 endpoints from an
+in-memory state model on localhost, with configurable latency, a
+request quota answered with 429s and batch request support:
+
+    with FakeGoogleAPI(latency=0.05, quota=100) as api:
+        sheet_id = api.add_spreadsheet('Report', {'Sheet1': [['a', 'b']]})
+        client = SheetsClient.from_api_key('fake', base_url=api.url)
+        client.get_spreadsheet(sheet_id)
+
+Setting GOOGLE_API_BASE_URL to `api.url` points every client built
+through `from_api_key`/`from_service_account` at the fake.
+
+"""
+
+import io
+import re
+import csv
+import gzip
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlsplit
+from urllib.parse import parse_qsl
+from urllib.parse import unquote
+
+from google_objects import a1
+
+log = logging.getLogger(__name__)
+
+_FOLDER_TYPE = 'application/vnd.google-apps.folder'
+
+_STATUS_TEXT = {
+    200: 'OK',
+    204: 'No Content',
+    206: 'Partial Content',
+    308: 'Resume Incomplete',
+    400: 'Bad Request',
+    404: 'Not Found',
+    429: 'Too Many Requests',
+}
+
+
+class _Media(object):
+
+    """Non-JSON response returned by media handlers"""
+
+    def __init__(self, payload=b'', status=200, headers=None):
+        self.payload = payload
+        self.status = status
+        self.headers = headers or {}
+
+
+class FakeError(Exception):
+
+    """Raised by handlers, answered with a Google style error body"""
+
+    def __init__(self, code, message, reason='invalid'):
+        self.code = code
+        self.message = message
+        self.reason = reason
+        super().__init__(message)
+
+    def body(self):
+        return {
+            'error': {
+                'code': self.code,
+                'message': self.message,
+                'errors': [{'message': self.message, 'reason': self.reason}]
+            }
+        }
+
+
+def _now():
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+
+
+def _new_id():
+    return uuid.uuid4().hex
+
+
+def _parse_query(query):
+    """Returns a dict of query parameters, repeated `ranges` kept as
+    a list."""
+    pairs = parse_qsl(query)
+    params = dict(pairs)
+    if 'ranges' in params:
+        params['ranges'] = [v for k, v in pairs if k == 'ranges']
+    return params
+
+
+# A1 notation
+
+def _parse_range(rng):
+    """Splits an A1 range into sheet title, None if absent, and 0-based,
+    half-open (start_row, end_row, start_col, end_col) bounds, None if
+    unbounded."""
+    grid_range = a1.parse(rng)
+    return grid_range.sheet, tuple(grid_range[1:])
+
+
+def _format_range(title, start_row, end_row, start_col, end_col):
+    return a1.GridRange(
+        title, start_row, max(end_row, start_row + 1),
+        start_col, max(end_col, start_col + 1)
+    ).a1
+
+
+# Visualization API queries
+
+_TQ = re.compile(
+    r'^\s*(?:select\s+(.+?))?\s*(?:where\s+(.+?))?'
+    r'\s*(?:order by\s+([A-Z]+)(?:\s+(?:asc|(desc)))?)?'
+    r'\s*(?:limit\s+(\d+))?\s*$', re.I
+)
+_CONDITION = re.compile(
+    r'^\s*([A-Z]+)\s*(=|!=|<>|<=|>=|<|>)\s*(\'[^\']*\'|"[^"]*"|[-\d.]+)\s*$'
+)
+_OPERATORS = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<>': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+def _comparable(value):
+    """Returns (0, number) for numeric values, (1, text) otherwise."""
+    try:
+        return 0, float(value)
+    except (TypeError, ValueError):
+        return 1, str(value)
+
+
+def _holds(condition, row, value):
+    match = _CONDITION.match(condition)
+    if not match:
+        raise FakeError(400, 'Unsupported condition: ' + condition)
+    column, operator, literal = match.groups()
+    if literal[0] in '\'"':
+        literal = (1, literal[1:-1])
+    else:
+        literal = (0, float(literal))
+    cell = _comparable(value(row, column))
+    return cell[0] == literal[0] and _OPERATORS[operator](cell, literal)
+
+
+# cell values
+
+def _parse_input(value, option):
+    """Interprets a written value as the Sheets API would."""
+    if option != 'USER_ENTERED' or not isinstance(value, str):
+        return value
+
+    if value.upper() in ('TRUE', 'FALSE'):
+        return value.upper() == 'TRUE'
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() and '.' not in value else number
+
+
+def _render(value, option):
+    if option == 'UNFORMATTED_VALUE':
+        return value
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _cell_value(cell):
+    """Returns the value held by a CellData dict."""
+    entered = cell.get('userEnteredValue', {})
+    for key in ('numberValue', 'boolValue', 'stringValue', 'formulaValue'):
+        if key in entered:
+            return entered[key]
+    return ''
+
+
+class _Grid(object):
+
+    """Values of a single sheet, a list of row lists"""
+
+    def __init__(self, rows=None):
+        self.rows = [list(row) for row in rows or []]
+
+    def write(self, start_row, start_col, rows):
+        for r, row in enumerate(rows):
+            index = start_row + r
+            while len(self.rows) <= index:
+                self.rows.append([])
+            target = self.rows[index]
+            for c, value in enumerate(row):
+                col = start_col + c
+                while len(target) <= col:
+                    target.append('')
+                if value is not None:
+                    target[col] = value
+
+    def read(self, start_row, end_row, start_col, end_col):
+        rows = [row[start_col:end_col] for row in self.rows[start_row:end_row]]
+        for row in rows:
+            while row and row[-1] == '':
+                row.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    @property
+    def height(self):
+        last = len(self.rows)
+        while last and not any(v != '' for v in self.rows[last - 1]):
+            last -= 1
+        return last
+
+    @property
+    def width(self):
+        return max([len(row) for row in self.rows] or [0])
+
+
+class FakeGoogleAPI(object):
+
+    """Serves an in-memory model of the Drive, Sheets and Slides APIs.
+
+    :latency: seconds slept before answering each request, or a callable
+              returning them, e.g. lambda: random.expovariate(20)
+    :quota: requests allowed per second per API key or credential, with
+            bursts of the same size, excess requests get a 429
+    """
+
+    def __init__(self, latency=0, quota=None, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.quota = quota
+        self.lock = threading.RLock()
+
+        # state
+        self.files = {}
+        self.contents = {}
+        self.permissions = {}
+        self.notifications = []
+        self.channels = {}
+        self.spreadsheets = {}
+        self.grids = {}
+        self.presentations = {}
+        self.changes = []
+        self.about = {
+            'user': {
+                'displayName': 'Fake User',
+                'emailAddress': 'fake@example.com',
+                'permissionId': 'fake-permission',
+                'photoLink': 'https://example.com/photo.png'
+            }
+        }
+
+        # instrumentation
+        self.request_count = 0
+        self.throttled_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.gzip_requests = 0
+        self.gzip_responses = 0
+        self.user_agents = set()
+        self.__buckets = {}
+
+        # smallest response body compressed
+        self.gzip_min_size = 1024
+
+        self.routes = [
+            # drive v3
+            ('GET', r'/drive/v3/about', self._get_about),
+            ('GET', r'/drive/v3/changes/startPageToken',
+             self._get_start_page_token),
+            ('GET', r'/drive/v3/changes', self._list_changes),
+            ('GET', r'/drive/v3/files', self._list_files),
+            ('POST', r'/drive/v3/files', self._create_file),
+            ('GET', r'/drive/v3/files/([^/]+)', self._get_file, True),
+            ('GET', r'/drive/v3/files/([^/]+)/export', self._export_file, True),
+            ('POST', r'/upload/drive/v3/files', self._start_upload, True),
+            ('PUT', r'/upload/drive/v3/files', self._upload_chunk, True),
+            ('PATCH', r'/drive/v3/files/([^/]+)', self._update_file),
+            ('DELETE', r'/drive/v3/files/([^/]+)', self._delete_file),
+            ('POST', r'/drive/v3/files/([^/]+)/copy', self._copy_file),
+            ('POST', r'/drive/v3/files/([^/]+)/watch', self._watch_file),
+            ('POST', r'/drive/v3/channels/stop', self._stop_channel),
+            ('GET', r'/drive/v3/files/([^/]+)/permissions',
+             self._list_permissions),
+            ('POST', r'/drive/v3/files/([^/]+)/permissions',
+             self._create_permission),
+            ('PATCH', r'/drive/v3/files/([^/]+)/permissions/([^/]+)',
+             self._update_permission),
+            ('DELETE', r'/drive/v3/files/([^/]+)/permissions/([^/]+)',
+             self._delete_permission),
+            # sheets v4
+            ('POST', r'/v4/spreadsheets', self._create_spreadsheet),
+            ('GET', r'/v4/spreadsheets/([^/:]+)', self._get_spreadsheet),
+            ('POST', r'/v4/spreadsheets/([^/:]+):batchUpdate',
+             self._batch_update_spreadsheet),
+            ('GET', r'/v4/spreadsheets/([^/:]+)/values:batchGet',
+             self._batch_get_values),
+            ('GET', r'/v4/spreadsheets/([^/:]+)/values/([^/]+)',
+             self._get_values),
+            ('PUT', r'/v4/spreadsheets/([^/:]+)/values/([^/]+)',
+             self._update_values),
+            ('POST', r'/v4/spreadsheets/([^/:]+)/values/([^/]+):append',
+             self._append_values),
+            ('GET', r'/spreadsheets/d/([^/]+)/gviz/tq', self._query, True),
+            # slides v1
+            ('GET', r'/v1/presentations/([^/:]+)', self._get_presentation),
+            ('POST', r'/v1/presentations/([^/:]+):batchUpdate',
+             self._batch_update_presentation),
+            ('GET', r'/v1/presentations/([^/:]+)/pages/([^/]+)',
+             self._get_page),
+        ]
+        # media routes, flagged True, receive raw bodies and headers
+        self.routes = [(r[0], re.compile(r[1] + '$'), r[2], r[3:] == (True,))
+                       for r in self.routes]
+        self.__uploads = {}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    # server lifecycle
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        self.stop()
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, fmt, *args):
+                log.debug(fmt, *args)
+
+            def _serve(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                    with api.lock:
+                        api.gzip_requests += 1
+
+                status, headers, payload = api.handle(
+                    self.command, self.path, self.headers, body
+                )
+
+                # as Google, only for user agents containing "gzip"
+                if 'gzip' in self.headers.get('Accept-Encoding', '') and \
+                        'gzip' in self.headers.get('User-Agent', '') and \
+                        len(payload) >= api.gzip_min_size and status != 206:
+                    payload = gzip.compress(payload)
+                    headers = dict(headers, **{'Content-Encoding': 'gzip'})
+                    with api.lock:
+                        api.gzip_responses += 1
+
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+        return Handler
+
+    # request handling
+
+    def handle(self, method, path, headers, body):
+        """Answers a single HTTP request, returns
+        (status, headers, payload bytes)."""
+
+        with self.lock:
+            self.request_count += 1
+            self.user_agents.add(headers.get('User-Agent', ''))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            latency = self.latency() if callable(self.latency) else self.latency
+            if latency:
+                time.sleep(latency)
+
+            url = urlsplit(path)
+            if url.path.startswith('/batch'):
+                return self._batch(headers, body)
+
+            query = _parse_query(url.query)
+            status, data = self.dispatch(method, url.path, query, headers, body)
+            if isinstance(data, _Media):
+                return data.status, data.headers, data.payload
+
+            payload = json.dumps(data).encode() if data is not None else b''
+            return status, {'Content-Type': 'application/json'}, payload
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def dispatch(self, method, path, query, headers, body):
+        """Routes a request, returns (status, data)."""
+
+        try:
+            self._check_quota(query, headers)
+            for route_method, pattern, handler, media in self.routes:
+                match = pattern.match(path)
+                if match and route_method == method:
+                    args = [unquote(arg) for arg in match.groups()]
+                    if media:
+                        args.insert(0, headers)
+                    else:
+                        body = json.loads(body.decode() or '{}')
+                    with self.lock:
+                        result = handler(query, body, *args)
+                    if isinstance(result, _Media):
+                        return result.status, result
+                    return (200, result) if result is not None else (204, None)
+
+            raise FakeError(404, 'Method not found.', 'notFound')
+        except FakeError as e:
+            return e.code, e.body()
+
+    def _check_quota(self, query, headers):
+        if not self.quota:
+            return
+
+        key = query.get('key') or headers.get('Authorization') or ''
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.__buckets.get(key, (self.quota, now))
+            tokens = min(self.quota, tokens + (now - last) * self.quota)
+            if tokens < 1:
+                self.throttled_count += 1
+                self.__buckets[key] = (tokens, now)
+                raise FakeError(
+                    429, 'Rate Limit Exceeded', 'rateLimitExceeded'
+                )
+            self.__buckets[key] = (tokens - 1, now)
+
+    def _batch(self, headers, body):
+        """Answers a multipart/mixed batch request part by part."""
+
+        content_type = headers.get('Content-Type', '')
+        message = BytesParser().parsebytes(
+            b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body
+        )
+
+        boundary = 'batch_' + _new_id()
+        parts = []
+        for part in message.get_payload():
+            content_id = part.get('Content-ID', '')
+            raw = part.get_payload(decode=True).replace(b'\r\n', b'\n')
+            head, _, inner_body = raw.partition(b'\n\n')
+            lines = head.decode().splitlines()
+            inner_method, inner_path = lines[0].split(' ')[:2]
+            inner_headers = dict(
+                line.split(': ', 1) for line in lines[1:] if ': ' in line
+            )
+
+            url = urlsplit(inner_path)
+            query = _parse_query(url.query)
+            status, data = self.dispatch(
+                inner_method, url.path, query, inner_headers, inner_body
+            )
+            payload = json.dumps(data) if data is not None else ''
+            parts.append(
+                '--{}\r\nContent-Type: application/http\r\n'
+                'Content-ID: <response-{}>\r\n\r\n'
+                'HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+                'Content-Length: {}\r\n\r\n{}\r\n'.format(
+                    boundary, content_id.strip('<>'), status,
+                    _STATUS_TEXT.get(status, ''), len(payload), payload
+                )
+            )
+
+        payload = (''.join(parts) + '--{}--\r\n'.format(boundary)).encode()
+        headers = {'Content-Type': 'multipart/mixed; boundary=' + boundary}
+        return 200, headers, payload
+
+    # state helpers
+
+    def add_file(self, name, mime_type=_FOLDER_TYPE, parents=None,
+                 content=None, **metadata):
+        """Adds a Drive file, returns its ID."""
+        with self.lock:
+            file_id = metadata.pop('id', None) or _new_id()
+            self.files[file_id] = dict(
+                metadata,
+                kind='drive#file',
+                id=file_id,
+                name=name,
+                mimeType=mime_type,
+                parents=list(parents or []),
+                trashed=False,
+                createdTime=_now(),
+                modifiedTime=_now(),
+                webViewLink='https://drive.google.com/file/d/' + file_id,
+            )
+            self.permissions[file_id] = {}
+            if content is not None:
+                self._set_content(file_id, content)
+            self.changes.append(file_id)
+            return file_id
+
+    def update_file(self, file_id, **metadata):
+        """Updates a Drive file's metadata, recording a change."""
+        with self.lock:
+            return self._update_file({}, metadata, file_id)
+
+    def delete_file(self, file_id):
+        """Deletes a Drive file, recording a change."""
+        with self.lock:
+            self._delete_file({}, {}, file_id)
+
+    def add_spreadsheet(self, title, sheets=None, spreadsheet_id=None):
+        """Adds a spreadsheet from a {sheet title: rows} mapping,
+        returns its ID."""
+        body = {'properties': {'title': title}, 'sheets': [
+            {'properties': {'title': name}, 'data': [{'rowData': [
+                {'values': [{'userEnteredValue': {'stringValue': str(v)}}
+                            for v in row]}
+                for row in rows
+            ]}]}
+            for name, rows in (sheets or {'Sheet1': []}).items()
+        ]}
+        if spreadsheet_id:
+            body['spreadsheetId'] = spreadsheet_id
+        with self.lock:
+            return self._create_spreadsheet({}, body)['spreadsheetId']
+
+    def add_presentation(self, data):
+        """Adds a presentation resource dict, returns its ID."""
+        with self.lock:
+            data = dict(data)
+            data.setdefault('presentationId', _new_id())
+            for key in ('slides', 'masters', 'layouts'):
+                data.setdefault(key, [])
+            self.presentations[data['presentationId']] = data
+            return data['presentationId']
+
+    def values(self, spreadsheet_id, title):
+        """Returns the rows held by a sheet."""
+        sheet = self._sheet(spreadsheet_id, title)
+        return self.grids[spreadsheet_id][sheet['properties']['sheetId']].rows
+
+    # drive
+
+    def _file(self, file_id):
+        if file_id not in self.files:
+            raise FakeError(404, 'File not found: ' + file_id, 'notFound')
+        return self.files[file_id]
+
+    def _get_about(self, query, body):
+        return self.about
+
+    def _matches(self, metadata, clauses):
+        for clause in clauses:
+            clause = clause.strip()
+            if not clause:
+                continue
+            match = re.match(r"^'([^']+)' in parents$", clause)
+            if match:
+                if match.group(1) not in metadata['parents']:
+                    return False
+                continue
+            match = re.match(r"^(\w+)\s*(=|!=)\s*'?([^']*)'?$", clause)
+            if not match:
+                raise FakeError(400, 'Invalid query: ' + clause)
+            key, op, value = match.groups()
+            actual = metadata.get(key)
+            if isinstance(actual, bool):
+                value = value == 'true'
+            if (actual == value) != (op == '='):
+                return False
+        return True
+
+    def _list_files(self, query, body):
+        clauses = query.get('q', '').split(' and ')
+        if not any('trashed' in c for c in clauses):
+            clauses.append('trashed = false')
+
+        matching = [
+            f for f in self.files.values() if self._matches(f, clauses)
+        ]
+        start = int(query.get('pageToken') or 0)
+        size = int(query.get('pageSize') or 100)
+
+        result = {
+            'kind': 'drive#fileList',
+            'incompleteSearch': False,
+            'files': matching[start:start + size]
+        }
+        if start + size < len(matching):
+            result['nextPageToken'] = str(start + size)
+        return result
+
+    def _create_file(self, query, body):
+        body = dict(body)
+        file_id = self.add_file(
+            body.pop('name', 'Untitled'),
+            body.pop('mimeType', 'application/octet-stream'),
+            body.pop('parents', None), **body
+        )
+        return self.files[file_id]
+
+    def _set_content(self, file_id, content):
+        self.contents[file_id] = content
+        self.files[file_id].update(
+            md5Checksum=hashlib.md5(content).hexdigest(),
+            size=str(len(content))
+        )
+
+    def _serve_content(self, headers, content):
+        """Answers with content or the byte range requested."""
+        match = re.match(r'bytes=(\d+)-(\d*)', headers.get('range') or '')
+        if not match or not content:
+            return _Media(content)
+
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(content) - 1), len(content) - 1)
+        return _Media(content[start:end + 1], 206, {
+            'Content-Range': 'bytes {}-{}/{}'.format(start, end, len(content))
+        })
+
+    def _get_file(self, query, body, headers, file_id):
+        metadata = self._file(file_id)
+        if query.get('alt') != 'media':
+            return metadata
+
+        if file_id not in self.contents:
+            raise FakeError(403, 'Only files with binary content can be '
+                                 'downloaded.', 'fileNotDownloadable')
+        return self._serve_content(headers, self.contents[file_id])
+
+    def _export_file(self, query, body, headers, file_id):
+        content = b''
+        if file_id not in self.spreadsheets:
+            content = self.contents.get(self._file(file_id)['id'], b'')
+        elif query['mimeType'] == 'text/csv':
+            rows = self.grids[file_id][
+                self.spreadsheets[file_id]['sheets'][0]['properties']['sheetId']
+            ].rows
+            content = ''.join(
+                ','.join(str(v) for v in row) + '\r\n' for row in rows
+            ).encode()
+        return _Media(content, headers={'Content-Type': query['mimeType']})
+
+    def _start_upload(self, query, body, headers):
+        """Starts a resumable upload session."""
+        if query.get('uploadType') != 'resumable':
+            raise FakeError(400, 'Only resumable uploads are supported.')
+
+        upload_id = _new_id()
+        self.__uploads[upload_id] = (json.loads(body.decode() or '{}'), [])
+        location = '{}upload/drive/v3/files?uploadType=resumable&' \
+                   'upload_id={}'.format(self.url, upload_id)
+        return _Media(headers={'Location': location})
+
+    def _upload_chunk(self, query, body, headers):
+        upload_id = query.get('upload_id')
+        if upload_id not in self.__uploads:
+            raise FakeError(404, 'Upload session not found.', 'notFound')
+        metadata, chunks = self.__uploads[upload_id]
+
+        received = sum(len(chunk) for chunk in chunks)
+        match = re.match(r'bytes (\*|(\d+)-(\d+))/(\*|\d+)',
+                         headers.get('Content-Range', ''))
+        if not match:
+            raise FakeError(400, 'Invalid Content-Range.')
+
+        if match.group(2) is not None:
+            start = int(match.group(2))
+            if int(match.group(3)) < start:
+                raise FakeError(400, 'Invalid Content-Range.')
+            # bytes already received may be resent, skip them
+            chunks.append(body[received - start:])
+            received = sum(len(chunk) for chunk in chunks)
+
+        total = match.group(4)
+        if total == '*' or received < int(total):
+            range_headers = {'Range': 'bytes=0-{}'.format(received - 1)} \
+                if received else {}
+            return _Media(status=308, headers=range_headers)
+
+        del self.__uploads[upload_id]
+        metadata = dict(metadata)
+        file_id = self.add_file(
+            metadata.pop('name', 'Untitled'),
+            headers.get('X-Upload-Content-Type', 'application/octet-stream'),
+            metadata.pop('parents', None), **metadata
+        )
+        self._set_content(file_id, b''.join(chunks))
+        return self.files[file_id]
+
+    def _update_file(self, query, body, file_id):
+        metadata = self._file(file_id)
+        metadata.update(body)
+        for key in ('addParents', 'removeParents'):
+            for parent in filter(None, query.get(key, '').split(',')):
+                if key == 'addParents':
+                    metadata['parents'].append(parent)
+                elif parent in metadata['parents']:
+                    metadata['parents'].remove(parent)
+        metadata['modifiedTime'] = _now()
+        self.changes.append(file_id)
+        return metadata
+
+    def _delete_file(self, query, body, file_id):
+        self._file(file_id)
+        del self.files[file_id]
+        self.contents.pop(file_id, None)
+        self.permissions.pop(file_id, None)
+        self.changes.append(file_id)
+
+    def _get_start_page_token(self, query, body):
+        return {'kind': 'drive#startPageToken',
+                'startPageToken': str(len(self.changes))}
+
+    def _list_changes(self, query, body):
+        start = int(query['pageToken'])
+        size = int(query.get('pageSize') or 100)
+        end = min(start + size, len(self.changes))
+
+        # like Drive, a file changed several times is reported once
+        changes = []
+        for file_id in dict.fromkeys(reversed(self.changes[start:end])):
+            change = {'kind': 'drive#change', 'changeType': 'file',
+                      'fileId': file_id, 'time': _now(),
+                      'removed': file_id not in self.files}
+            if not change['removed']:
+                change['file'] = self.files[file_id]
+            changes.insert(0, change)
+
+        result = {'kind': 'drive#changeList', 'changes': changes}
+        if end < len(self.changes):
+            result['nextPageToken'] = str(end)
+        else:
+            result['newStartPageToken'] = str(end)
+        return result
+
+    def _copy_file(self, query, body, file_id):
+        source = self._file(file_id)
+        new_id = self.add_file(
+            body.get('name', 'Copy of ' + source['name']),
+            body.get('mimeType', source['mimeType']),
+            body.get('parents', source['parents']),
+            **{k: v for k, v in source.items() if k in ('md5Checksum', 'size')}
+        )
+        if file_id in self.contents:
+            self.contents[new_id] = self.contents[file_id]
+        return self.files[new_id]
+
+    def _watch_file(self, query, body, file_id):
+        self._file(file_id)
+        expiration = body.get('expiration') or \
+            int((time.time() + 3600) * 1000)
+        channel = dict(body, kind='api#channel', resourceId=file_id,
+                       resourceUri=self.url + 'drive/v3/files/' + file_id,
+                       expiration=str(expiration))
+        self.channels[channel['id']] = channel
+        return channel
+
+    def _stop_channel(self, query, body):
+        channel = self.channels.get(body.get('id'))
+        if channel is None or channel['resourceId'] != body.get('resourceId'):
+            raise FakeError(404, 'Channel not found.', 'notFound')
+        del self.channels[body['id']]
+
+    def _permissions(self, file_id):
+        self._file(file_id)
+        return self.permissions[file_id]
+
+    def _list_permissions(self, query, body, file_id):
+        permissions = list(self._permissions(file_id).values())
+        start = int(query.get('pageToken') or 0)
+        size = int(query.get('pageSize') or 100)
+        result = {'kind': 'drive#permissionList',
+                  'permissions': permissions[start:start + size]}
+        if start + size < len(permissions):
+            result['nextPageToken'] = str(start + size)
+        return result
+
+    def _create_permission(self, query, body, file_id):
+        permission = dict(body, kind='drive#permission', id=_new_id())
+        self._permissions(file_id)[permission['id']] = permission
+        if body.get('type') in ('user', 'group') and \
+                query.get('sendNotificationEmail') != 'false':
+            self.notifications.append(body.get('emailAddress'))
+        return permission
+
+    def _update_permission(self, query, body, file_id, permission_id):
+        permissions = self._permissions(file_id)
+        if permission_id not in permissions:
+            raise FakeError(404, 'Permission not found.', 'notFound')
+        permissions[permission_id].update(body)
+        return permissions[permission_id]
+
+    def _delete_permission(self, query, body, file_id, permission_id):
+        if self._permissions(file_id).pop(permission_id, None) is None:
+            raise FakeError(404, 'Permission not found.', 'notFound')
+
+    # sheets
+
+    def _spreadsheet(self, spreadsheet_id):
+        if spreadsheet_id not in self.spreadsheets:
+            raise FakeError(
+                404, 'Requested entity was not found.', 'notFound'
+            )
+        return self.spreadsheets[spreadsheet_id]
+
+    def _sheet(self, spreadsheet_id, title=None, sheet_id=None):
+        sheets = self._spreadsheet(spreadsheet_id)['sheets']
+        for sheet in sheets:
+            properties = sheet['properties']
+            if title is None and sheet_id is None:
+                return sheet
+            if title is not None and properties['title'] == title:
+                return sheet
+            if sheet_id is not None and properties['sheetId'] == sheet_id:
+                return sheet
+        raise FakeError(400, 'Unable to parse range: {}'.format(title))
+
+    def _add_sheet(self, spreadsheet_id, properties, rows=None):
+        spreadsheet = self.spreadsheets[spreadsheet_id]
+        properties = dict(properties)
+        used = {s['properties']['sheetId'] for s in spreadsheet['sheets']}
+        if properties.get('sheetId') is None:
+            properties['sheetId'] = max(used) + 1 if used else 0
+        properties.setdefault('title', 'Sheet{}'.format(len(used) + 1))
+        properties.setdefault('index', len(used))
+        properties.setdefault('sheetType', 'GRID')
+
+        grid = _Grid(rows)
+        grid_properties = properties.setdefault('gridProperties', {})
+        grid_properties.setdefault('rowCount', max(1000, len(grid.rows)))
+        grid_properties.setdefault('columnCount', max(26, grid.width))
+
+        spreadsheet['sheets'].append({'properties': properties})
+        self.grids[spreadsheet_id][properties['sheetId']] = grid
+        return properties
+
+    def _grow(self, spreadsheet_id, sheet):
+        """Extends gridProperties to cover written values."""
+        grid = self.grids[spreadsheet_id][sheet['properties']['sheetId']]
+        size = sheet['properties']['gridProperties']
+        size['rowCount'] = max(size['rowCount'], len(grid.rows))
+        size['columnCount'] = max(size['columnCount'], grid.width)
+
+    def _check_limits(self, sheet, end_row, end_col):
+        """Raises a 400 for cells past the sheet's grid."""
+        size = sheet['properties']['gridProperties']
+        if end_row > size['rowCount'] or end_col > size['columnCount']:
+            raise FakeError(400, 'Range ({}!R{}C{}) exceeds grid limits. '
+                            'Max rows: {}, max columns: {}'.format(
+                                sheet['properties']['title'], end_row,
+                                end_col, size['rowCount'],
+                                size['columnCount']))
+
+    def _create_spreadsheet(self, query, body):
+        spreadsheet_id = body.get('spreadsheetId') or _new_id()
+        properties = dict(body.get('properties', {}))
+        properties.setdefault('title', 'Untitled spreadsheet')
+        properties.setdefault('locale', 'en_US')
+
+        self.spreadsheets[spreadsheet_id] = {
+            'spreadsheetId': spreadsheet_id,
+            'properties': properties,
+            'sheets': [],
+            'namedRanges': [],
+            'spreadsheetUrl': 'https://docs.google.com/spreadsheets/d/'
+                              + spreadsheet_id,
+        }
+        self.grids[spreadsheet_id] = {}
+
+        for sheet in body.get('sheets') or [{'properties': {}}]:
+            data = sheet.get('data', [])
+            if isinstance(data, dict):
+                data = [data]
+            rows = [
+                [_cell_value(cell) for cell in row.get('values', [])]
+                for block in data for row in block.get('rowData', [])
+            ]
+            self._add_sheet(spreadsheet_id, sheet.get('properties', {}), rows)
+
+        return self.spreadsheets[spreadsheet_id]
+
+    def _get_spreadsheet(self, query, body, spreadsheet_id):
+        return self._spreadsheet(spreadsheet_id)
+
+    def _read(self, spreadsheet_id, rng, query):
+        # a range without sheet refers to the first sheet
+        title, bounds = _parse_range(rng)
+        sheet = self._sheet(spreadsheet_id, title)
+        title = sheet['properties']['title']
+
+        grid = self.grids[spreadsheet_id][sheet['properties']['sheetId']]
+        start_row, end_row, start_col, end_col = bounds
+        start_row = start_row or 0
+        start_col = start_col or 0
+        end_row = grid.height if end_row is None else end_row
+        end_col = grid.width if end_col is None else end_col
+
+        option = query.get('valueRenderOption', 'FORMATTED_VALUE')
+        rows = [[_render(v, option) for v in row]
+                for row in grid.read(start_row, end_row, start_col, end_col)]
+
+        dimension = query.get('majorDimension', 'ROWS')
+        if dimension == 'COLUMNS':
+            width = max([len(row) for row in rows] or [0])
+            rows = [[row[c] if c < len(row) else '' for row in rows]
+                    for c in range(width)]
+            for column in rows:
+                while column and column[-1] == '':
+                    column.pop()
+
+        result = {
+            'range': _format_range(
+                title, start_row, end_row, start_col, end_col
+            ),
+            'majorDimension': dimension,
+        }
+        if rows:
+            result['values'] = rows
+        return result
+
+    def _get_values(self, query, body, spreadsheet_id, rng):
+        return self._read(spreadsheet_id, rng, query)
+
+    def _batch_get_values(self, query, body, spreadsheet_id):
+        self._spreadsheet(spreadsheet_id)
+        ranges = query.get('ranges', [])
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'valueRanges': [self._read(spreadsheet_id, r, query) for r in ranges]
+        }
+
+    def _query(self, query, body, headers, spreadsheet_id):
+        """Answers a Visualization API query as CSV, supporting
+        `select`, `where` conditions joined by `and`, `order by` and
+        `limit`."""
+        self._spreadsheet(spreadsheet_id)
+        sheet = self._sheet(spreadsheet_id, query.get('sheet'))
+        rows = self.grids[spreadsheet_id][sheet['properties']['sheetId']].rows
+        count = int(query.get('headers', 1))
+
+        match = _TQ.match(query.get('tq', ''))
+        if not match:
+            raise FakeError(400, 'Invalid query: ' + query.get('tq', ''))
+        select, where, order, descending, limit = match.groups()
+
+        def value(row, letters):
+            index = a1.column_index(letters)
+            return row[index] if index < len(row) else ''
+
+        data = rows[count:]
+        for condition in re.split(r'\s+and\s+', where or '', flags=re.I):
+            if condition:
+                data = [row for row in data if _holds(condition, row, value)]
+        if order:
+            data.sort(key=lambda row: _comparable(value(row, order)),
+                      reverse=bool(descending))
+        if limit:
+            data = data[:int(limit)]
+
+        columns = [each.strip() for each in select.split(',')] if select \
+            else [a1.column_letters(i)
+                  for i in range(max([len(row) for row in rows] or [0]))]
+        header = [' '.join(str(value(row, c)) for row in rows[:count]).strip()
+                  for c in columns]
+
+        out = io.StringIO()
+        writer = csv.writer(out, quoting=csv.QUOTE_ALL)
+        writer.writerow(header)
+        for row in data:
+            writer.writerow([_render(value(row, c), 'FORMATTED_VALUE')
+                             for c in columns])
+        return _Media(out.getvalue().encode(),
+                      headers={'Content-Type': 'text/csv'})
+
+    def _write(self, spreadsheet_id, rng, rows, option):
+        title, bounds = _parse_range(rng)
+        sheet = self._sheet(spreadsheet_id, title)
+        title = sheet['properties']['title']
+        grid = self.grids[spreadsheet_id][sheet['properties']['sheetId']]
+        start_row, _, start_col, _ = bounds
+        rows = [[_parse_input(v, option) for v in row] for row in rows]
+        grid.write(start_row or 0, start_col or 0, rows)
+        self._grow(spreadsheet_id, sheet)
+
+        width = max([len(row) for row in rows] or [0])
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'updatedRange': _format_range(
+                title, start_row or 0, (start_row or 0) + len(rows),
+                start_col or 0, (start_col or 0) + width
+            ),
+            'updatedRows': len(rows),
+            'updatedColumns': width,
+            'updatedCells': sum(len(row) for row in rows),
+        }
+
+    def _update_values(self, query, body, spreadsheet_id, rng):
+        option = query.get('valueInputOption', 'RAW')
+        return self._write(spreadsheet_id, rng, body.get('values', []), option)
+
+    def _append_values(self, query, body, spreadsheet_id, rng):
+        title, _ = _parse_range(rng)
+        sheet = self._sheet(spreadsheet_id, title)
+        title = sheet['properties']['title']
+        grid = self.grids[spreadsheet_id][sheet['properties']['sheetId']]
+        table = '{}!A{}'.format(a1.quote(title), grid.height + 1)
+
+        option = query.get('valueInputOption', 'RAW')
+        updates = self._write(
+            spreadsheet_id, table, body.get('values', []), option
+        )
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'tableRange': a1.quote(title) + '!A1',
+            'updates': updates,
+        }
+
+    def _batch_update_spreadsheet(self, query, body, spreadsheet_id):
+        spreadsheet = self._spreadsheet(spreadsheet_id)
+        replies = [self._apply_sheet_request(spreadsheet_id, request)
+                   for request in body.get('requests', [])]
+        return {'spreadsheetId': spreadsheet['spreadsheetId'],
+                'replies': replies}
+
+    def _apply_sheet_request(self, spreadsheet_id, request):
+        (kind, params), = request.items()
+        spreadsheet = self.spreadsheets[spreadsheet_id]
+
+        if kind == 'addSheet':
+            properties = self._add_sheet(
+                spreadsheet_id, params.get('properties', {})
+            )
+            return {'addSheet': {'properties': properties}}
+
+        if kind == 'deleteSheet':
+            sheet = self._sheet(spreadsheet_id, sheet_id=params['sheetId'])
+            spreadsheet['sheets'].remove(sheet)
+            del self.grids[spreadsheet_id][params['sheetId']]
+            return {}
+
+        if kind == 'updateSheetProperties':
+            properties = params['properties']
+            sheet = self._sheet(
+                spreadsheet_id, sheet_id=properties.get('sheetId', 0)
+            )
+            for field in params.get('fields', '').split(','):
+                field = field.strip()
+                if field in properties:
+                    sheet['properties'][field] = properties[field]
+            return {}
+
+        if kind == 'appendDimension':
+            sheet = self._sheet(spreadsheet_id, sheet_id=params['sheetId'])
+            grid_properties = sheet['properties']['gridProperties']
+            count = 'rowCount' if params['dimension'] == 'ROWS' \
+                else 'columnCount'
+            grid_properties[count] += params['length']
+            return {}
+
+        if kind in ('insertDimension', 'deleteDimension'):
+            rng = params['range']
+            sheet = self._sheet(spreadsheet_id, sheet_id=rng.get('sheetId', 0))
+            grid = self.grids[spreadsheet_id][rng.get('sheetId', 0)]
+            start, end = rng['startIndex'], rng['endIndex']
+            grid_properties = sheet['properties']['gridProperties']
+            if rng['dimension'] == 'ROWS':
+                if kind == 'insertDimension':
+                    if start <= len(grid.rows):
+                        grid.rows[start:start] = [[] for _ in range(end - start)]
+                    grid_properties['rowCount'] += end - start
+                else:
+                    del grid.rows[start:end]
+                    grid_properties['rowCount'] -= end - start
+            else:
+                for row in grid.rows:
+                    if kind == 'insertDimension':
+                        if start <= len(row):
+                            row[start:start] = [''] * (end - start)
+                    else:
+                        del row[start:end]
+                grid_properties['columnCount'] += (
+                    end - start if kind == 'insertDimension' else start - end
+                )
+            return {}
+
+        if kind in ('updateCells', 'appendCells'):
+            location = params.get('start') or params.get('range') or {}
+            sheet_id = params.get('sheetId', location.get('sheetId', 0))
+            sheet = self._sheet(spreadsheet_id, sheet_id=sheet_id)
+            grid = self.grids[spreadsheet_id][sheet_id]
+            rows = [[_cell_value(cell) for cell in row.get('values', [])]
+                    for row in params.get('rows', [])]
+            if kind == 'appendCells':
+                start_row, start_col = grid.height, 0
+            elif 'start' in params:
+                start_row = params['start'].get('rowIndex', 0)
+                start_col = params['start'].get('columnIndex', 0)
+            else:
+                start_row = params['range'].get('startRowIndex', 0)
+                start_col = params['range'].get('startColumnIndex', 0)
+
+            # as the API, only appended cells grow the sheet
+            if kind == 'updateCells':
+                self._check_limits(sheet, start_row + len(rows),
+                                   start_col + max(map(len, rows), default=0))
+            grid.write(start_row, start_col, rows)
+            self._grow(spreadsheet_id, sheet)
+            return {}
+
+        if kind == 'pasteData':
+            start = params['coordinate']
+            sheet = self._sheet(spreadsheet_id, sheet_id=start.get('sheetId', 0))
+            grid = self.grids[spreadsheet_id][start.get('sheetId', 0)]
+            reader = csv.reader(io.StringIO(params.get('data', '')),
+                                delimiter=params.get('delimiter', ','))
+            rows = [[_parse_input(v, 'USER_ENTERED') for v in row]
+                    for row in reader]
+            grid.write(start.get('rowIndex', 0), start.get('columnIndex', 0),
+                       rows)
+            self._grow(spreadsheet_id, sheet)
+            return {}
+
+        if kind == 'addNamedRange':
+            named_range = dict(params['namedRange'])
+            named_range.setdefault('namedRangeId', _new_id())
+            spreadsheet['namedRanges'].append(named_range)
+            return {'addNamedRange': {'namedRange': named_range}}
+
+        if kind == 'deleteNamedRange':
+            spreadsheet['namedRanges'] = [
+                r for r in spreadsheet['namedRanges']
+                if r['namedRangeId'] != params['namedRangeId']
+            ]
+            return {}
+
+        # formatting and other requests leave values untouched
+        return {}
+
+    # slides
+
+    def _presentation(self, presentation_id):
+        if presentation_id not in self.presentations:
+            raise FakeError(
+                404, 'Requested entity was not found.', 'notFound'
+            )
+        return self.presentations[presentation_id]
+
+    def _get_presentation(self, query, body, presentation_id):
+        return self._presentation(presentation_id)
+
+    def _get_page(self, query, body, presentation_id, page_id):
+        presentation = self._presentation(presentation_id)
+        for key in ('slides', 'masters', 'layouts'):
+            for page in presentation[key]:
+                if page['objectId'] == page_id:
+                    return page
+        raise FakeError(404, 'Page not found.', 'notFound')
+
+    def _batch_update_presentation(self, query, body, presentation_id):
+        presentation = self._presentation(presentation_id)
+        replies = []
+        for request in body.get('requests', []):
+            (kind, params), = request.items()
+            reply = {}
+
+            if kind == 'deleteObject':
+                for page in presentation['slides']:
+                    page['pageElements'] = [
+                        e for e in page.get('pageElements', [])
+                        if e['objectId'] != params['objectId']
+                    ]
+                presentation['slides'] = [
+                    p for p in presentation['slides']
+                    if p['objectId'] != params['objectId']
+                ]
+
+            elif kind == 'replaceAllText':
+                find = params['containsText']['text']
+                replace = params['replaceText']
+                count = 0
+                for page in presentation['slides']:
+                    for element in page.get('pageElements', []):
+                        text = element.get('shape', {}).get('text', {})
+                        for run in text.get('textElements', []):
+                            content = run.get('textRun', {}).get('content')
+                            if content and find in content:
+                                count += content.count(find)
+                                run['textRun']['content'] = content.replace(
+                                    find, replace
+                                )
+                reply = {'replaceAllText': {'occurrencesChanged': count}}
+
+            replies.append(reply)
+
+        return {'presentationId': presentation_id, 'replies': replies}
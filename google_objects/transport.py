@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+Transport
+    gzip negotiation and compression accounting for httplib2 clients
+
+"""
+
+import gzip
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+# Google only compresses responses to user agents containing "gzip"
+USER_AGENT = 'google-objects (gzip)'
+
+_BODY_METHODS = {'POST', 'PUT', 'PATCH'}
+
+# counting connection classes by base class, bytes read per thread
+_COUNTING = {}
+_received = threading.local()
+
+
+class TransportStats(object):
+
+    """Counts requests and bytes sent and received, on the wire and
+    before compression, shared by the transports of a client's threads.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.compressed_requests = 0
+        self.bytes_sent = 0
+        self.raw_bytes_sent = 0
+        self.compressed_responses = 0
+        self.bytes_received = 0
+        self.raw_bytes_received = 0
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return '<TransportStats requests={} sent x{:.2f} ' \
+            'received x{:.2f}>'.format(
+                self.requests, self.sent_ratio, self.received_ratio
+            )
+
+    @property
+    def sent_ratio(self):
+        """Raw bytes sent per byte on the wire."""
+        return self.raw_bytes_sent / (self.bytes_sent or 1)
+
+    @property
+    def received_ratio(self):
+        """Raw bytes received per byte on the wire."""
+        return self.raw_bytes_received / (self.bytes_received or 1)
+
+    def record(self, sent, raw_sent, received, raw_received, compressed):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            self.raw_bytes_sent += raw_sent
+            self.compressed_requests += sent != raw_sent
+            self.bytes_received += received
+            self.raw_bytes_received += raw_received
+            self.compressed_responses += compressed
+
+
+class GzipHttp(object):
+
+    """Wraps an httplib2.Http, or an authorized one, asking for gzip
+    encoded responses and gzipping JSON request bodies of at least
+    min_size bytes. Bytes on the wire are counted by wrapping the
+    responses of the connections it opens.
+
+    Other attributes are those of the wrapped client, so it can be
+    passed as the `http` of a discovery Resource.
+
+    :http: httplib2.Http
+    :stats: <TransportStats>
+    :min_size: smallest body compressed, None to send bodies as is
+    :user_agent: appended to the request's user-agent
+    """
+
+    def __init__(self, http, stats=None, min_size=None,
+                 user_agent=USER_AGENT):
+        self.http = http
+        self.stats = stats if stats is not None else TransportStats()
+        self.min_size = min_size
+        self.user_agent = user_agent
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=5, connection_type=None):
+        import httplib2
+
+        headers = dict(headers or {})
+        lower = {key.lower(): key for key in headers}
+
+        # ranged media requests must be answered as is
+        if 'range' not in lower:
+            headers.pop(lower.get('accept-encoding'), None)
+            headers['accept-encoding'] = 'gzip'
+        agent = headers.pop(lower.get('user-agent'), None)
+        headers['user-agent'] = \
+            agent + ' ' + self.user_agent if agent else self.user_agent
+
+        raw = body.encode('utf-8') if isinstance(body, str) else body
+        raw_size = len(raw) if raw else 0
+        content_type = headers.get(lower.get('content-type'), '')
+        if self.min_size is not None and raw_size >= self.min_size and \
+                method in _BODY_METHODS and 'content-encoding' not in lower \
+                and content_type.startswith('application/json'):
+            body = gzip.compress(raw, compresslevel=6)
+            headers.pop(lower.get('content-length'), None)
+            headers['content-length'] = str(len(body))
+            headers['content-encoding'] = 'gzip'
+
+        if connection_type is None:
+            scheme = uri.split(':', 1)[0].lower()
+            connection_type = _counting(
+                httplib2.HTTPSConnectionWithTimeout if scheme == 'https'
+                else httplib2.HTTPConnectionWithTimeout
+            )
+
+        _received.count = 0
+        response, content = self.http.request(
+            uri, method, body=body, headers=headers,
+            redirections=redirections, connection_type=connection_type
+        )
+
+        compressed = '-content-encoding' in response
+        received = _received.count or len(content or b'')
+        self.stats.record(
+            len(body) if body else 0, raw_size,
+            received, len(content or b''), compressed
+        )
+        return response, content
+
+
+def _counting(base):
+    """Returns a subclass of an httplib2 connection class counting
+    the bytes read from its responses, per thread."""
+
+    if base not in _COUNTING:
+        class Counting(base):
+            def getresponse(self):
+                response = super().getresponse()
+                read = response.read
+
+                def counted(*args):
+                    data = read(*args)
+                    _received.count = getattr(_received, 'count', 0) + \
+                        len(data)
+                    return data
+
+                response.read = counted
+                return response
+
+        Counting.__name__ = 'Counting' + base.__name__
+        _COUNTING[base] = Counting
+    return _COUNTING[base]
@@ -22,7 +22,8 @@ if sys.argv[-1] == 'publish':
     sys.exit(0)
 
 VERSION = '0.0.7'
-REQUIRES = ['google-api-python-client>=1.5.3', 'pandas>=0.22.0', 'fire>=0.1.3']
+REQUIRES = ['google-api-python-client>=2.0.0', 'pandas>=0.22.0', 'fire>=0.1.3']
+EXTRAS = {'arrow': ['pyarrow>=12.0']}
 GITHUB_URL = 'https://github.com/condad/google-objects'
 
 setup(
@@ -35,6 +36,7 @@ setup(
     author='Connor Sullivan',
     author_email='sully4792@gmail.com',
     install_requires=REQUIRES,
+    extras_require=EXTRAS,
     url=GITHUB_URL,
     download_url='https://github.com/condad/google-objects/tarball/' + VERSION,
     keywords=['google api', 'google sheets', 'google drive', 'google slides'],
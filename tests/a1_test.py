@@ -0,0 +1,76 @@
+import unittest
+
+from google_objects import a1
+from google_objects.a1 import GridRange
+
+
+class TestA1(unittest.TestCase):
+    """Test A1 notation parsing, formatting and arithmetic"""
+
+    def test_columns(self):
+        for index, letters in ((0, 'A'), (25, 'Z'), (26, 'AA'),
+                               (701, 'ZZ'), (702, 'AAA')):
+            self.assertEqual(a1.column_letters(index), letters)
+            self.assertEqual(a1.column_index(letters), index)
+
+    def test_parse(self):
+        cases = {
+            'Sheet1': GridRange('Sheet1'),
+            'B2': GridRange(None, 1, 2, 1, 2),
+            'A1:AB10': GridRange(None, 0, 10, 0, 28),
+            'Data!B:D': GridRange('Data', None, None, 1, 4),
+            'Data!3:5': GridRange('Data', 2, 5),
+            "'It''s'!C2:D": GridRange("It's", 1, None, 2, 4),
+            'Data!R2C1:R5C3': GridRange('Data', 1, 5, 0, 3),
+        }
+        for rng, expected in cases.items():
+            self.assertEqual(a1.parse(rng), expected)
+
+    def test_format(self):
+        cases = {
+            GridRange('Data'): "'Data'",
+            GridRange(None, 1, 2, 1, 2): 'B2',
+            GridRange('Data', None, None, 1, 4): "'Data'!B:D",
+            GridRange('Data', 2, 5): "'Data'!3:5",
+            GridRange("It's", 1, None, 2, 4): "'It''s'!C2:D",
+            GridRange(None, 0, 10, 26, 28): 'AA1:AB10',
+        }
+        for rng, expected in cases.items():
+            self.assertEqual(rng.a1, expected)
+            self.assertEqual(a1.parse(expected), rng)
+
+        # whole rows round trip, open ended ones have no A1 form
+        for rng in ("'S'!3:3", "'S'!1:5", "'S'!4:10"):
+            self.assertEqual(a1.parse(rng).a1, rng)
+        with self.assertRaises(ValueError):
+            GridRange('S', 2, None).a1
+
+        self.assertEqual(GridRange('Data', 1, 5, 0, 3).r1c1,
+                         "'Data'!R2C1:R5C3")
+        with self.assertRaises(ValueError):
+            GridRange('Data', 1, None, 0, 3).r1c1
+
+    def test_grid(self):
+        grid = {'sheetId': 7, 'startRowIndex': 1, 'endRowIndex': 3,
+                'startColumnIndex': 0, 'endColumnIndex': 2}
+        rng = GridRange.from_grid(grid, 'Data')
+        self.assertEqual(rng.a1, "'Data'!A2:B3")
+        self.assertEqual(rng.to_grid(7), grid)
+
+    def test_arithmetic(self):
+        rng = a1.parse('Data!A1:C10')
+        self.assertEqual(rng & a1.parse('Data!B5:Z'), a1.parse('Data!B5:C10'))
+        self.assertIsNone(rng & a1.parse('Data!D1:E2'))
+        self.assertEqual(rng | a1.parse('Data!D20:E21'),
+                         a1.parse('Data!A1:E21'))
+        self.assertEqual(rng | a1.parse('Data!B:B'), a1.parse('Data!A:C'))
+        with self.assertRaises(ValueError):
+            rng & a1.parse('Other!A1')
+
+    def test_split(self):
+        chunks = a1.split('Data!A2:C', 4, height=11)
+        self.assertEqual([c.a1 for c in chunks], [
+            "'Data'!A2:C5", "'Data'!A6:C9", "'Data'!A10:C11"
+        ])
+        with self.assertRaises(ValueError):
+            a1.split('Data!A2:C', 4)
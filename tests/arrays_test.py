@@ -0,0 +1,88 @@
+import unittest
+
+import numpy
+
+from google_objects.sheets import SheetsClient
+from google_objects.arrays import ArrayBlock
+
+
+class TestArrayBlock(unittest.TestCase):
+    """Test NumPy backed blocks"""
+
+    def setUp(self):
+        self.block = ArrayBlock(
+            range="'Sales'!B2:E5", header=True, values=[
+                ['item', 'price', 'paid', 'qty'],
+                ['pen', 1.5, True, 3],
+                ['ink', '', False],
+                ['pad', 4, True, 1],
+            ]
+        )
+
+    def test_columns(self):
+        self.assertEqual(self.block.shape, (3, 4))
+        price = self.block.column('price')
+        self.assertEqual(price.dtype, numpy.float64)
+        self.assertEqual(price.mask.tolist(), [False, True, False])
+        self.assertEqual(self.block.column('paid').dtype, bool)
+        self.assertEqual(self.block.column(0).dtype, object)
+        self.assertEqual(self.block.column('qty').sum(), 4)
+
+    def test_mixed_column(self):
+        block = ArrayBlock(values=[[1.5], [2], ['n/a'], ['']])
+        column = block.column(0)
+        self.assertEqual(column.dtype, object)
+        self.assertEqual(column.mask.tolist(), [False, False, False, True])
+        self.assertEqual(block.values, [[1.5], [2], ['n/a'], ['']])
+
+    def test_values(self):
+        self.block.column('price')[:] *= 2
+        self.assertEqual(self.block.values, [
+            ['item', 'price', 'paid', 'qty'],
+            ['pen', 3.0, True, 3.0],
+            ['ink', '', False, ''],
+            ['pad', 8.0, True, 1.0],
+        ])
+
+    def test_views(self):
+        view = self.block[1:, 1:3]
+        self.assertEqual(view.range, "'Sales'!C4:D5")
+        self.assertEqual(view.values, [['', False], [4.0, True]])
+        self.assertEqual(view[1:].range, "'Sales'!C5:D5")
+
+        view.set_column('price', [7, None])
+        self.assertEqual(self.block.column('price').tolist(), [1.5, 7, None])
+        self.assertTrue(numpy.shares_memory(
+            view.column(0).data, self.block.column(1).data
+        ))
+
+        with self.assertRaises(ValueError):
+            self.block[::2]
+
+    def test_update(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        api = FakeGoogleAPI().start()
+        self.addCleanup(api.stop)
+        client = SheetsClient.from_api_key('fake', base_url=api.url)
+        spreadsheet_id = api.add_spreadsheet('Data', {'Data': []})
+        client.update_values(spreadsheet_id, 'Data!A1', [
+            ['n', 'square'], [1, 1], [2, 4], [3, 9],
+        ])
+
+        sheet = client.get_spreadsheet(spreadsheet_id).sheets()[0]
+        block = sheet.array(header=True)
+        self.assertEqual(block.range, "'Data'!A1:B4")
+        block.column('square')[1:] += 1
+        block[1:].update()
+
+        rows = client.get_values(spreadsheet_id, 'Data').rows()
+        self.assertEqual(rows[1:], [['1', '1'], ['2', '5'], ['3', '10']])
+
+        # a block read by id updates the same spreadsheet
+        block = client.get_array(spreadsheet_id, 'Data!A1:B4', header=True)
+        block.column('n')[:] *= 10
+        block[:2].update()
+
+        rows = client.get_values(spreadsheet_id, 'Data').rows()
+        self.assertEqual(rows[1:], [['10', '1'], ['20', '5'], ['3', '10']])
@@ -0,0 +1,59 @@
+import io
+import unittest
+from unittest import mock
+
+from google_objects.cli import SheetsCLI
+from google_objects.cli import _iter_rows
+from google_objects.sheets import SheetsClient
+
+
+class TestCLI(unittest.TestCase):
+    """Test parsing of streamed CLI input"""
+
+    def test_csv(self):
+        stream = io.StringIO('a,b\n1,2\n3,4\n')
+        rows = list(_iter_rows(stream))
+        self.assertEqual(rows, [['a', 'b'], ['1', '2'], ['3', '4']])
+
+    def test_ndjson(self):
+        stream = io.StringIO('\n{"a": 1, "b": null}\n{"b": 2, "a": 3}\n')
+        rows = list(_iter_rows(stream))
+        self.assertEqual(rows, [['a', 'b'], [1, ''], [3, 2]])
+
+    def test_ndjson_unknown_keys(self):
+        stream = io.StringIO('{"a": 1}\n{"a": 2, "b": 3}\n')
+        rows = _iter_rows(stream)
+        self.assertEqual(next(rows), ['a'])
+        self.assertEqual(next(rows), [1])
+        with self.assertRaisesRegex(ValueError, "record 2 .*\\['b'\\]"):
+            next(rows)
+
+    def test_json_records(self):
+        stream = io.StringIO('{\n "records": [{"a": 1}, {"b": 2}]\n}')
+        rows = list(_iter_rows(stream))
+        self.assertEqual(rows, [['a', 'b'], [1, ''], ['', 2]])
+
+        stream = io.StringIO('[{"a": 1}]')
+        self.assertEqual(list(_iter_rows(stream)), [['a'], [1]])
+
+    def test_partial_spreadsheet(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        api = FakeGoogleAPI().start()
+        self.addCleanup(api.stop)
+        client = SheetsClient.from_api_key('fake', base_url=api.url)
+        stdin = io.StringIO('{"a": 1}\n{"a": 2, "b": 3}\n')
+        stderr = io.StringIO()
+
+        with mock.patch.object(SheetsClient, 'from_service_account',
+                               return_value=client), \
+                mock.patch('sys.stdin', stdin), \
+                mock.patch('sys.stderr', stderr), \
+                self.assertRaises(SystemExit):
+            SheetsCLI().create_spreadsheet(chunk_size=1)
+
+        spreadsheet_id, = api.spreadsheets
+        self.assertIn("record 2 has keys missing", stderr.getvalue())
+        self.assertIn('Partially written spreadsheet: '
+                      'https://docs.google.com/spreadsheets/d/'
+                      + spreadsheet_id, stderr.getvalue())
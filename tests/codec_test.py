@@ -0,0 +1,39 @@
+import unittest
+
+from google_objects.codec import get_codec
+from google_objects.codec import model
+from google_objects.sheets import SheetsClient
+
+
+class JsonSheetsClient(SheetsClient):
+    codec = 'json'
+
+
+class TestCodec(unittest.TestCase):
+    """Test pluggable JSON codecs"""
+
+    def test_get_codec(self):
+        self.assertEqual(get_codec('json').name, 'json')
+        self.assertIn(get_codec().name, ('orjson', 'ujson', 'json'))
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    def test_model(self):
+        body = {'values': [[1, 'é', 2.5, None, True]], 'big': 2 ** 70}
+        for name in ('json', None):
+            json_model = model(name)
+            text = json_model.serialize(body)
+            self.assertIsInstance(text, str)
+            self.assertEqual(json_model.deserialize(text.encode()), body)
+            self.assertEqual(json_model.deserialize(b'not json'), 'not json')
+
+    def test_client(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        with FakeGoogleAPI() as api:
+            spreadsheet_id = api.add_spreadsheet('Data', {'Data': [['a']]})
+            for cls in (SheetsClient, JsonSheetsClient):
+                client = cls.from_api_key('fake', base_url=api.url)
+                self.assertIs(client.resource._model, model(cls.codec))
+                block = client.get_values(spreadsheet_id, 'Data')
+                self.assertEqual(block.values, [['a']])
@@ -0,0 +1,124 @@
+import threading
+import unittest
+from unittest import mock
+
+from google_objects.core import DeadlineExceeded
+from google_objects.core import GoogleClient
+from google_objects.core import _Flight
+from google_objects.core import _LeaderDeadline
+from google_objects.core import _latency_key
+from google_objects.sheets import SheetsClient
+from google_objects.testing import FakeGoogleAPI
+
+
+class CoalescingClient(SheetsClient):
+    coalesce = True
+
+
+class TestGoogleClient(unittest.TestCase):
+    """Test resource management shared by all clients"""
+
+    def test_shared_resource(self):
+        resource = mock.Mock()
+        client = GoogleClient(resource)
+        self.assertIs(client.resource, resource)
+
+    def test_resource_per_thread(self):
+        client = GoogleClient(factory=mock.Mock)
+        resources = client.map(lambda i: client.resource._wrapped,
+                               range(8), workers=4)
+
+        # at most one resource per worker thread, reused within a thread
+        self.assertLessEqual(len({id(r) for r in resources}), 4)
+        self.assertIs(client.resource, client.resource)
+        self.assertNotIn(client.resource._wrapped, resources)
+
+    def test_shared_resource_map(self):
+        client = GoogleClient(mock.Mock())
+        threads = client.map(lambda i: threading.get_ident(), range(8),
+                             workers=4)
+        self.assertEqual(set(threads), {threading.get_ident()})
+
+    def test_map_order(self):
+        client = GoogleClient(mock.Mock())
+        results = client.map(lambda i: i * 2, range(50), workers=8)
+        self.assertEqual(results, [i * 2 for i in range(50)])
+
+        lazy = client.imap(lambda i: i, iter(range(5)), workers=2)
+        self.assertEqual(next(lazy), 0)
+        lazy.close()
+
+    def test_latency_key(self):
+        request = mock.Mock(methodId='drive.files.get', headers={},
+                            uri='https://example.com/files/1')
+        self.assertEqual(_latency_key(request), 'drive.files.get')
+
+        request.uri += '?alt=media'
+        request.headers = {'Range': 'bytes=0-1023'}
+        self.assertEqual(_latency_key(request),
+                         'drive.files.get:media:range')
+
+    def test_concurrent_reads(self):
+        with FakeGoogleAPI(latency=0.01) as api:
+            rows = [[str(i), str(i * i)] for i in range(20)]
+            spreadsheet_id = api.add_spreadsheet('Squares', {'Data': rows})
+
+            client = SheetsClient.from_api_key('fake', base_url=api.url)
+            ranges = ['Data!A{0}:B{0}'.format(i + 1) for i in range(20)]
+            blocks = client.map(
+                lambda rng: client.get_values(spreadsheet_id, rng),
+                ranges, workers=5
+            )
+
+        self.assertEqual([block.values[0] for block in blocks], rows)
+        self.assertGreater(api.max_in_flight, 1)
+
+    def test_coalesce(self):
+        with FakeGoogleAPI(latency=0.2) as api:
+            spreadsheet_id = api.add_spreadsheet('Data', {'Data': [['a']]})
+            client = CoalescingClient.from_api_key('fake', base_url=api.url)
+
+            requests = api.request_count
+            spreadsheets = client.map(
+                lambda i: client.get_spreadsheet(spreadsheet_id),
+                range(6), workers=6
+            )
+            self.assertLess(api.request_count - requests, 6)
+            self.assertEqual(client.coalesced_count,
+                             6 - (api.request_count - requests))
+
+            # each caller gets its own copy of the response
+            data = [s.data for s in spreadsheets]
+            self.assertEqual(len({id(d) for d in data}), 6)
+            self.assertTrue(all(d == data[0] for d in data))
+
+            # writes are never shared
+            requests = api.request_count
+            client.map(lambda i: client.update_values(
+                spreadsheet_id, 'A1', [['b']]
+            ), range(3), workers=3)
+            self.assertEqual(api.request_count - requests, 3)
+
+    def test_coalesce_errors(self):
+        with FakeGoogleAPI(latency=0.2) as api:
+            client = CoalescingClient.from_api_key('fake', base_url=api.url)
+
+            def read(_):
+                try:
+                    client.get_spreadsheet('missing')
+                except Exception as e:
+                    return e
+
+            errors = client.map(read, range(3), workers=3)
+
+            self.assertGreater(client.coalesced_count, 0)
+            self.assertEqual({e.resp.status for e in errors}, {404})
+            # each caller raises its own exception
+            self.assertEqual(len({id(e) for e in errors}), 3)
+
+        # the leader's own deadline makes waiting callers send theirs
+        flight = _Flight()
+        flight.error = DeadlineExceeded()
+        flight.done.set()
+        with self.assertRaises(_LeaderDeadline):
+            flight.wait()
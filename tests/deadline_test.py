@@ -0,0 +1,167 @@
+import io
+import time
+import unittest
+from unittest import mock
+
+from google_objects.core import DeadlineExceeded
+from google_objects.drive import DriveClient
+from google_objects.sheets import SheetsClient
+from google_objects.testing import FakeGoogleAPI
+
+
+class HedgingClient(SheetsClient):
+    hedge = True
+    hedge_samples = 5
+
+
+class HedgingDriveClient(DriveClient):
+    hedge = True
+    hedge_samples = 5
+
+
+class TestDeadlines(unittest.TestCase):
+    """Test deadlines and hedged reads against the fake API"""
+
+    def setUp(self):
+        self.delays = []
+        self.api = FakeGoogleAPI(
+            latency=lambda: self.delays.pop(0) if self.delays else 0
+        ).start()
+        self.addCleanup(self.api.stop)
+        self.spreadsheet_id = self.api.add_spreadsheet(
+            'Data', {'Data': [['a', 'b']]}
+        )
+
+    def test_deadline(self):
+        client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        self.delays = [2]
+
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            with client.deadline(0.2):
+                client.get_spreadsheet(self.spreadsheet_id)
+        self.assertLess(time.monotonic() - start, 1)
+
+        # the thread's resource is usable again
+        spreadsheet = client.get_spreadsheet(self.spreadsheet_id)
+        self.assertEqual(spreadsheet.title, 'Data')
+
+    def test_propagation(self):
+        client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        self.delays = [0, 2]
+
+        def read(rng):
+            return client.get_values(self.spreadsheet_id, rng)
+
+        with self.assertRaises(DeadlineExceeded):
+            with client.deadline(0.3):
+                client.map(read, ['A1', 'B1'], workers=1)
+
+        with client.deadline(5):
+            with client.deadline(60) as expires:
+                self.assertLess(expires, time.monotonic() + 5)
+
+    def test_call_timeout(self):
+        client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        client.call_timeout = 0.2
+        self.delays = [2]
+        with self.assertRaises(DeadlineExceeded):
+            client.get_values(self.spreadsheet_id, 'A1')
+
+    def test_hedge(self):
+        client = HedgingClient.from_api_key('fake', base_url=self.api.url)
+        for _ in range(5):
+            client.get_values(self.spreadsheet_id, 'A1')
+        self.assertEqual(client.hedged_count, 0)
+
+        # a straggler is hedged after the p95 latency
+        self.delays = [2]
+        start = time.monotonic()
+        block = client.get_values(self.spreadsheet_id, 'A1')
+        self.assertEqual(block.values, [['a']])
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(client.hedged_count, 1)
+
+        # writes are never hedged
+        self.delays = [0.3]
+        client.update_values(self.spreadsheet_id, 'C1', [['c']])
+        self.assertEqual(client.hedged_count, 1)
+
+    def test_shared_resource(self):
+        # one http shared by every thread is never used concurrently
+        resource = HedgingClient._build_resource(self.api.url)
+        client = HedgingClient(resource)
+        client.call_timeout = 5
+        with mock.patch.object(client, '_executor') as executor:
+            for _ in range(6):
+                client.get_values(self.spreadsheet_id, 'A1')
+        executor.assert_not_called()
+
+    def test_close(self):
+        client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        with client.deadline(5):
+            client.get_values(self.spreadsheet_id, 'A1')
+        client.close()
+        with client.deadline(5):
+            block = client.get_values(self.spreadsheet_id, 'A1')
+        self.assertEqual(block.values, [['a']])
+        client.close()
+
+
+class TestMediaDeadlines(unittest.TestCase):
+    """Test deadlines of chunked transfers against the fake API"""
+
+    def test_download(self):
+        delays = []
+        api = FakeGoogleAPI(
+            latency=lambda: delays.pop(0) if delays else 0
+        ).start()
+        self.addCleanup(api.stop)
+        client = DriveClient.from_api_key('fake', base_url=api.url)
+        file_id = api.add_file('data.bin', 'application/octet-stream',
+                               content=b'x' * 1024)
+
+        client.get_file(file_id)
+        delays[:] = [0, 2]
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            with client.deadline(0.3):
+                client.download_file(file_id, io.BytesIO(), chunk_size=256,
+                                     verify=False)
+        self.assertLess(time.monotonic() - start, 1)
+
+        # a stalled chunk leaves the thread a new resource
+        destination = io.BytesIO()
+        client.download_file(file_id, destination, chunk_size=256)
+        self.assertEqual(destination.getvalue(), b'x' * 1024)
+
+    def test_media_latencies(self):
+        delays = []
+        api = FakeGoogleAPI(
+            latency=lambda: delays.pop(0) if delays else 0
+        ).start()
+        self.addCleanup(api.stop)
+        client = HedgingDriveClient.from_api_key('fake', base_url=api.url)
+        file_id = api.add_file('data.bin', 'application/octet-stream',
+                               content=b'x' * 1024)
+
+        # metadata reads' p95 well above the fake's jitter
+        delays[:] = [0.1] * 5
+        for _ in range(5):
+            client.get_file(file_id)
+        metadata = client.latencies.percentile('drive.files.get', 95)
+
+        # slow ranged reads, too few to hedge on their own, are
+        # neither hedged on nor added to the metadata reads' latencies
+        delays[:] = [0] + [0.2] * 4
+        destination = io.BytesIO()
+        client.download_file(file_id, destination, chunk_size=256,
+                             workers=2)
+        self.assertEqual(destination.getvalue(), b'x' * 1024)
+        self.assertEqual(client.hedged_count, 0)
+        self.assertEqual(
+            client.latencies.percentile('drive.files.get', 95), metadata
+        )
+        self.assertGreaterEqual(client.latencies.percentile(
+            'drive.files.get:media:range', 95
+        ), 0.2)
@@ -1,3 +1,5 @@
+import io
+import threading
 import unittest
 from unittest import mock
 
@@ -6,6 +8,7 @@ from google_objects.drive import DriveClient
 from google_objects.drive import About
 from google_objects.drive import File
 from google_objects.drive import Permission
+from google_objects.limits import TokenBucket
 
 # load google sheets dummy data
 about = get_data('about')
@@ -65,3 +68,280 @@ class TestDrive(unittest.TestCase):
         self.assertEqual(permission.type, 'user')
         self.assertEqual(permission.email, 'test@gmail.com')
         self.assertEqual(permission.role, 'reader')
+
+
+class TestDriveSync(unittest.TestCase):
+    """Test incremental sync against the fake API"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = DriveClient.from_api_key('fake', base_url=self.api.url)
+
+    def test_sync(self):
+        folder = self.api.add_file('Folder')
+        for i in range(3):
+            self.api.add_file('File {}'.format(i), parents=[folder],
+                              id='file_{}'.format(i))
+
+        sync = self.client.sync(':memory:')
+        self.assertEqual(sync.run(), 0)
+        self.assertEqual(len(sync.index), 4)
+
+        # only changed files are read on the next run
+        self.api.update_file('file_0', name='Renamed')
+        self.api.delete_file('file_1')
+        self.api.update_file('file_2', trashed=True)
+        new = self.api.add_file('New', parents=[folder])
+
+        changes = list(sync.changes())
+        self.assertEqual(len(changes), 4)
+        self.assertEqual(
+            {c.file_id for c in changes if c.removed}, {'file_1', 'file_2'}
+        )
+        self.assertEqual(sync.index.get('file_0')['name'], 'Renamed')
+        self.assertIn(new, sync.index)
+        self.assertEqual(len(sync.index), 3)
+
+        self.assertEqual(sync.run(), 0)
+
+    def test_abandoned_changes(self):
+        sync = self.client.sync(':memory:')
+        sync.run()
+        self.api.add_file('A', id='a')
+        self.api.add_file('B', id='b')
+
+        changes = sync.changes()
+        next(changes)
+        # the index isn't held by the paused generator
+        acquired = []
+
+        def acquire():
+            acquired.append(sync.index.lock.acquire(False))
+            if acquired[0]:
+                sync.index.lock.release()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        thread.join()
+        self.assertEqual(acquired, [True])
+        changes.close()
+
+        # the unfinished page is generated again
+        self.assertIn('b', sync.index)
+        self.assertEqual(sorted(c.file_id for c in sync.changes()),
+                         ['a', 'b'])
+        self.assertEqual(sync.run(), 0)
+
+    def test_query_files(self):
+        folder = self.api.add_file('Folder', id='folder')
+        self.api.add_file('Report', 'application/vnd.google-apps.spreadsheet',
+                          parents=[folder], id='report')
+
+        self.client.index_files()
+        requests = self.api.request_count
+
+        files = self.client.query_files(mime_type='spreadsheet',
+                                        ancestor='folder')
+        self.assertEqual([f.id for f in files], ['report'])
+        self.assertEqual(self.client.index.path('report'), '/Folder/Report')
+        self.assertEqual(self.api.request_count, requests)
+
+
+class TestDriveMedia(unittest.TestCase):
+    """Test chunked uploads, downloads and exports against the fake API"""
+
+    chunk_size = 256 * 1024
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = DriveClient.from_api_key('fake', base_url=self.api.url)
+        self.content = bytes(range(256)) * 4096  # 1MiB
+        self.content += b'tail'
+
+    def test_upload(self):
+        sent = []
+        folder = self.api.add_file('Folder')
+        uploaded = self.client.upload_file(
+            io.BytesIO(self.content), 'data.bin', parents=[folder],
+            chunk_size=self.chunk_size, progress=sent.append
+        )
+        self.assertEqual(uploaded.name, 'data.bin')
+        self.assertEqual(self.api.contents[uploaded.id], self.content)
+        self.assertEqual(self.api.files[uploaded.id]['parents'], [folder])
+        self.assertEqual(sent[-1], len(self.content))
+        self.assertEqual(len(sent), 5)
+
+    def test_upload_exact_chunks(self):
+        for chunks in (1, 2):
+            content = self.content[:chunks * self.chunk_size]
+            requests = self.api.request_count
+            uploaded = self.client.upload_file(
+                io.BytesIO(content), 'data.bin', chunk_size=self.chunk_size
+            )
+            self.assertEqual(self.api.contents[uploaded.id], content)
+            # no empty request closes the upload
+            self.assertEqual(self.api.request_count - requests, chunks + 1)
+
+    def test_download(self):
+        file_id = self.api.add_file('data.bin', 'application/octet-stream',
+                                    content=self.content)
+        for workers in (1, 4):
+            destination = io.BytesIO()
+            self.client.download_file(file_id, destination,
+                                      chunk_size=self.chunk_size,
+                                      workers=workers)
+            self.assertEqual(destination.getvalue(), self.content)
+
+    def test_download_checksum(self):
+        from google_objects.media import ChecksumError
+
+        file_id = self.api.add_file('data.bin', 'application/octet-stream',
+                                    content=self.content)
+        self.api.files[file_id]['md5Checksum'] = '0' * 32
+        with self.assertRaises(ChecksumError):
+            self.client.download_file(file_id, io.BytesIO())
+
+    def test_export(self):
+        file_id = self.api.add_spreadsheet(
+            'Sheet', {'Sheet1': [['a', 'b'], [1, 2]]}
+        )
+        destination = io.BytesIO()
+        written = self.client.export_file(file_id, destination, 'csv')
+        self.assertEqual(destination.getvalue(), b'a,b\r\n1,2\r\n')
+        self.assertEqual(written, len(destination.getvalue()))
+
+        self.api.add_file('Sheet', 'application/vnd.google-apps.spreadsheet',
+                          id=file_id)
+        with self.assertRaises(ValueError):
+            self.client.download_file(file_id, io.BytesIO())
+
+
+class TestPermissions(unittest.TestCase):
+    """Test permission diffing against the fake API"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = DriveClient.from_api_key('fake', base_url=self.api.url)
+        self.file_id = self.api.add_file('Report', 'text/plain')
+        self.client.set_permissions(self.file_id, [
+            {'type': 'user', 'role': 'owner', 'emailAddress': 'me@a.com'},
+            {'type': 'user', 'role': 'reader', 'emailAddress': 'old@a.com'},
+            {'type': 'user', 'role': 'reader', 'emailAddress': 'b@a.com'},
+        ])
+
+    def test_set_permissions(self):
+        requests = self.api.request_count
+        changes = self.client.set_permissions(self.file_id, {
+            'B@a.com': 'writer',
+            'new@a.com': 'reader',
+        })
+
+        self.assertEqual([p.email for p in changes.created], ['new@a.com'])
+        self.assertEqual([p.role for p in changes.updated], ['writer'])
+        self.assertEqual([p.email for p in changes.deleted], ['old@a.com'])
+        # one listing and one batch
+        self.assertEqual(self.api.request_count - requests, 2)
+        self.assertEqual(self.api.notifications, [])
+
+        roles = {p['emailAddress']: p['role']
+                 for p in self.api.permissions[self.file_id].values()}
+        self.assertEqual(roles, {'me@a.com': 'owner', 'b@a.com': 'writer',
+                                 'new@a.com': 'reader'})
+
+        # already in the desired state
+        changes = self.client.set_permissions(self.file_id, {
+            'b@a.com': 'writer', 'new@a.com': 'reader'
+        })
+        self.assertEqual(changes, ([], [], []))
+
+    def test_file_set_permissions(self):
+        report = File(self.client, id=self.file_id)
+        changes = report.set_permissions(
+            [Permission(type='anyone', role='reader')], remove=False,
+            notification=True
+        )
+        self.assertEqual(len(changes.created), 1)
+        self.assertEqual(len(report.permissions()), 4)
+        self.assertEqual(self.api.notifications, [])
+
+        report.set_permissions({'c@a.com': 'reader'}, notification=True)
+        self.assertEqual(self.api.notifications, ['c@a.com'])
+        self.assertEqual(len(report.permissions()), 2)
+
+
+    def test_share_files(self):
+        files = [self.file_id] + [
+            self.api.add_file(str(i), 'text/plain') for i in range(3)
+        ]
+        shared = list(self.client.share_files(
+            files, {'new@a.com': 'reader'}, remove=False
+        ))
+
+        self.assertEqual([file_id for file_id, _ in shared], files)
+        for file_id, changes in shared:
+            self.assertEqual([p.email for p in changes.created],
+                             ['new@a.com'])
+            emails = {p['emailAddress']
+                      for p in self.api.permissions[file_id].values()}
+            self.assertIn('new@a.com', emails)
+
+
+class TestCopy(unittest.TestCase):
+    """Test bulk copies against the fake API"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = DriveClient.from_api_key('fake', base_url=self.api.url)
+        self.client.write_limiter = TokenBucket(1000)
+
+    def test_copy_files(self):
+        folder = self.api.add_file('Folder')
+        sources = [self.api.add_file(str(i), 'text/plain') for i in range(5)]
+        copies = [(file_id, 'Copy ' + file_id, [folder])
+                  for file_id in sources]
+
+        requests = self.api.request_count
+        events = list(self.client.copy_files(copies, workers=3))
+        self.assertEqual(self.api.request_count - requests, 5)
+        self.assertEqual([e.source_id for e in events], sources)
+        self.assertEqual([e.completed for e in events], [1, 2, 3, 4, 5])
+        for event in events:
+            self.assertEqual(event.file.name, 'Copy ' + event.source_id)
+            self.assertEqual(event.file.parents, [folder])
+
+    def test_copy_tree(self):
+        root = self.api.add_file('Root', id='root')
+        sub = self.api.add_file('Sub', parents=[root], id='sub')
+        self.api.add_file('a', 'text/plain', parents=[root])
+        self.api.add_file('b', 'text/plain', parents=[sub])
+        self.api.add_file('c', 'text/plain', parents=[sub])
+        self.api.update_file(
+            self.api.add_file('trashed', 'text/plain', parents=[sub]),
+            trashed=True
+        )
+        target = self.api.add_file('Target', id='target')
+
+        events = list(self.client.copy_tree(root, 'Backup', [target]))
+        self.assertEqual(len(events), 5)
+        self.assertEqual(events[-1].completed, 5)
+
+        self.client.index_files()
+        backup = events[0].file.id
+        self.assertEqual(self.client.index.path(backup), '/Target/Backup')
+        paths = {self.client.index.path(e.file.id) for e in events}
+        self.assertEqual(paths, {
+            '/Target/Backup', '/Target/Backup/a', '/Target/Backup/Sub',
+            '/Target/Backup/Sub/b', '/Target/Backup/Sub/c'
+        })
@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+
+from google_objects.a1 import GridRange
+from google_objects.formatting import Formatter
+from google_objects.formatting import color
+
+
+class TestFormatter(unittest.TestCase):
+    """Test merging of cell formats into repeatCell requests"""
+
+    def setUp(self):
+        self.client = mock.Mock()
+        self.formatter = Formatter(self.client, 'abc123', 7, 100, 10)
+
+    def test_merge_cells(self):
+        # a 50 x 4 block formatted cell by cell is a single rectangle
+        for row in range(50):
+            for col in range(4):
+                self.formatter.cell(row, col, backgroundColor=(1, 0, 0))
+
+        (rng, cell_format), = self.formatter.rectangles()
+        self.assertEqual(rng, GridRange(None, 0, 50, 0, 4))
+        self.assertEqual(cell_format, {'backgroundColor': color(1, 0, 0)})
+
+    def test_stripes(self):
+        self.formatter.format('A:J', textFormat={'bold': False})
+        for row in range(0, 100, 2):
+            self.formatter.format(
+                GridRange(None, row, row + 1, 0, 10),
+                backgroundColor=(0.9, 0.9, 0.9)
+            )
+        self.formatter.format('A1:J1', textFormat={'bold': True})
+
+        rectangles = self.formatter.rectangles()
+        self.assertEqual(len(rectangles), 100)
+        rng, cell_format = rectangles[0]
+        self.assertEqual(rng, GridRange(None, 0, 1, 0, 10))
+        self.assertEqual(cell_format, {
+            'textFormat': {'bold': True},
+            'backgroundColor': color(0.9, 0.9, 0.9),
+        })
+
+        request = self.formatter.requests()[0]['repeatCell']
+        self.assertEqual(request['range']['sheetId'], 7)
+        self.assertEqual(request['fields'], 'userEnteredFormat.backgroundColor,'
+                         'userEnteredFormat.textFormat.bold')
+
+    def test_columns(self):
+        self.formatter.format('B2:B', numberFormat={'type': 'PERCENT'})
+        self.formatter.format('C2:C', numberFormat={'type': 'PERCENT'})
+        self.formatter.format('C50', horizontalAlignment='RIGHT')
+
+        rectangles = [rng.a1 for rng, _ in self.formatter.rectangles()]
+        self.assertEqual(rectangles, ['B2:C49', 'B50', 'C50', 'B51:C100'])
+
+    def test_push(self):
+        for row in range(0, 100, 2):
+            self.formatter.cell(row, 0, backgroundColor=(0, 0, 1))
+
+        self.formatter.max_bytes = 2000
+        self.assertEqual(self.formatter.push(), 50)
+        batches = [c[0][1] for c in self.client.push_updates.call_args_list]
+        self.assertGreater(len(batches), 1)
+        self.assertEqual(sum(len(b) for b in batches), 50)
+        self.assertEqual(len(self.formatter), 0)
+
+    def test_unbounded(self):
+        formatter = Formatter(self.client, 'abc123', 7)
+        with self.assertRaises(ValueError):
+            formatter.format('A:A', horizontalAlignment='LEFT')
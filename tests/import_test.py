@@ -0,0 +1,36 @@
+import sys
+import subprocess
+import unittest
+
+# modules which must only be imported when actually used
+HEAVY_MODULES = ('pandas', 'apiclient', 'googleapiclient', 'httplib2', 'fire')
+
+
+def _loaded_after(statement):
+    """Runs :statement: in a fresh interpreter and returns the heavy
+    modules it caused to be imported."""
+    script = '{}\nimport sys\nprint(" ".join(m for m in {!r} if m in sys.modules))'
+    output = subprocess.check_output(
+        [sys.executable, '-c', script.format(statement, HEAVY_MODULES)]
+    )
+    return output.decode().split()
+
+
+class TestImports(unittest.TestCase):
+    """Test that importing the package stays cheap"""
+
+    def test_package(self):
+        self.assertEqual(_loaded_after('import google_objects'), [])
+
+    def test_clients(self):
+        for name in ('DriveClient', 'SheetsClient', 'SlidesClient'):
+            loaded = _loaded_after('from google_objects import ' + name)
+            self.assertEqual(loaded, [])
+
+    def test_cli(self):
+        self.assertEqual(_loaded_after('import google_objects.cli'), [])
+
+    def test_unknown_attribute(self):
+        import google_objects
+        with self.assertRaises(AttributeError):
+            google_objects.NotAClient
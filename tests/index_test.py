@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from google_objects.index import FileIndex
+
+
+class TestFileIndex(unittest.TestCase):
+    """Test the local Drive metadata index"""
+
+    def test_files(self):
+        index = FileIndex()
+        index.upsert({'id': 'a', 'name': 'A', 'parents': ['root']})
+        self.assertIn('a', index)
+        self.assertEqual(index.get('a')['name'], 'A')
+
+        index.upsert({'id': 'a', 'name': 'B', 'parents': ['root']})
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.get('a')['name'], 'B')
+
+        index.remove('a')
+        self.assertIsNone(index.get('a'))
+
+    def test_persistence(self):
+        path = os.path.join(tempfile.mkdtemp(), 'index.db')
+        with FileIndex(path) as index:
+            index.set_state('token', '42')
+            index.upsert({'id': 'a', 'name': 'A'})
+        index.close()
+
+        index = FileIndex(path)
+        self.assertEqual(index.get_state('token'), '42')
+        self.assertEqual(len(index), 1)
+
+    def test_rollback(self):
+        index = FileIndex()
+        with self.assertRaises(KeyError):
+            with index:
+                index.upsert({'id': 'a'})
+                raise KeyError
+        self.assertEqual(len(index), 0)
+
+
+class TestFileIndexQueries(unittest.TestCase):
+    """Test indexed metadata queries"""
+
+    def setUp(self):
+        self.index = FileIndex()
+        sheet = 'application/vnd.google-apps.spreadsheet'
+        files = [
+            {'id': 'root', 'name': 'Root'},
+            {'id': 'reports', 'name': 'Reports', 'parents': ['root']},
+            {'id': 'old', 'name': 'Old', 'parents': ['reports'],
+             'mimeType': sheet, 'modifiedTime': '2016-01-01T00:00:00.000Z'},
+            {'id': 'new', 'name': 'New', 'parents': ['reports'],
+             'mimeType': sheet, 'modifiedTime': '2016-09-01T00:00:00.000Z',
+             'permissions': [{'id': 'p', 'type': 'user', 'role': 'reader',
+                              'emailAddress': 'friend@example.com'}]},
+            {'id': 'doc', 'name': 'Doc', 'parents': ['root'],
+             'mimeType': 'application/vnd.google-apps.document',
+             'modifiedTime': '2016-09-01T00:00:00.000Z'},
+        ]
+        for data in files:
+            self.index.upsert(data)
+
+    def _ids(self, **filters):
+        return [each['id'] for each in self.index.query(**filters)]
+
+    def test_query(self):
+        import datetime
+
+        self.assertEqual(
+            self._ids(mime_type='spreadsheet', ancestor='root'),
+            ['new', 'old']
+        )
+        self.assertEqual(
+            self._ids(mime_type='spreadsheet', ancestor='root',
+                      modified_after=datetime.datetime(2016, 6, 1)),
+            ['new']
+        )
+        self.assertEqual(self._ids(parent='root'), ['doc', 'reports'])
+        self.assertEqual(self._ids(shared_with='friend@example.com'), ['new'])
+
+    def test_timestamp(self):
+        import datetime
+        from google_objects.index import _timestamp
+
+        local = datetime.datetime(2016, 6, 1, 12, 30)
+        self.assertEqual(_timestamp(local),
+                         _timestamp(local.astimezone()))
+        utc = datetime.datetime(2016, 6, 1, 12, 30, 0, 5000,
+                                tzinfo=datetime.timezone.utc)
+        self.assertEqual(_timestamp(utc), '2016-06-01T12:30:00.005Z')
+
+    def test_paths(self):
+        self.assertEqual(self.index.path('old'), '/Root/Reports/Old')
+        self.assertEqual(self.index.resolve('/Root/Reports/Old'), 'old')
+        self.assertIsNone(self.index.resolve('/Root/Missing'))
+        self.assertEqual(self.index.ancestors('old'), ['reports', 'root'])
@@ -0,0 +1,252 @@
+import time
+import threading
+import unittest
+from unittest import mock
+
+from google_objects.limits import AdaptiveExecutor
+from google_objects.limits import AdaptiveLimit
+from google_objects.limits import TokenBucket
+from google_objects.limits import throttled
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test client side rate limiting"""
+
+    def test_burst(self):
+        bucket = TokenBucket(10, capacity=5)
+        waited = [bucket.acquire() for _ in range(5)]
+        self.assertEqual(waited, [0] * 5)
+
+    def test_rate(self):
+        bucket = TokenBucket(100, capacity=1)
+        start = time.monotonic()
+        for _ in range(11):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+def http_error(status, content=b''):
+    from googleapiclient.errors import HttpError
+    return HttpError(mock.Mock(status=status, reason=''), content)
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+    """Test AIMD concurrency limits"""
+
+    def test_increase(self):
+        limit = AdaptiveLimit(initial=2, maximum=4)
+        # by one per limit calls
+        for _ in range(3):
+            limit.record(0.1)
+        self.assertEqual(limit.limit, 3)
+        for _ in range(3):
+            limit.record(0.1)
+        self.assertEqual(limit.limit, 4)
+        limit.record(0.1)
+        self.assertEqual(limit.limit, 4)
+
+    def test_decrease(self):
+        limit = AdaptiveLimit(initial=16, minimum=2, cooldown=60)
+        limit.throttle()
+        self.assertEqual(limit.limit, 8)
+        # once per cooldown, for the throttles of one burst
+        limit.throttle()
+        self.assertEqual(limit.limit, 8)
+        self.assertEqual(limit.throttled_count, 2)
+
+        limit = AdaptiveLimit(initial=16, minimum=2, cooldown=0)
+        for _ in range(5):
+            limit.throttle()
+        self.assertEqual(limit.limit, 2)
+
+    def test_slow_latency(self):
+        limit = AdaptiveLimit(initial=8, cooldown=0)
+        limit.record(0.1, 'get')
+        limit.record(1.0, 'update')
+        self.assertEqual(limit.limit, 8)
+        limit.record(0.5, 'get')
+        self.assertEqual(limit.limit, 4)
+
+    def test_acquire(self):
+        limit = AdaptiveLimit(initial=1)
+        self.assertTrue(limit.acquire())
+        # re-entrant within a thread
+        with limit.slot():
+            self.assertEqual(limit.in_flight, 1)
+
+        acquired = []
+        thread = threading.Thread(
+            target=lambda: acquired.append(limit.acquire(0.05))
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(acquired, [False])
+
+        limit.release()
+        self.assertEqual(limit.in_flight, 0)
+        self.assertTrue(limit.acquire(0))
+
+    def test_slot_throttled(self):
+        limit = AdaptiveLimit(initial=8)
+        with self.assertRaises(Exception):
+            with limit.slot():
+                raise http_error(429)
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.in_flight, 0)
+
+    def test_throttled(self):
+        self.assertTrue(throttled(http_error(429)))
+        self.assertTrue(throttled(http_error(503)))
+        self.assertTrue(throttled(http_error(
+            403, b'{"reason": "userRateLimitExceeded"}'
+        )))
+        self.assertFalse(throttled(http_error(403)))
+        self.assertFalse(throttled(ValueError()))
+
+    def test_shared(self):
+        key = ('api_key', 'shared', None)
+        self.assertIs(AdaptiveLimit.shared(key), AdaptiveLimit.shared(key))
+        self.assertIsNot(AdaptiveLimit.shared(key),
+                         AdaptiveLimit.shared(key + ('other',)))
+
+    def test_executor(self):
+        limit = AdaptiveLimit(initial=2, maximum=4)
+        running = []
+        lock = threading.Lock()
+
+        def task(item):
+            with lock:
+                running.append(limit.in_flight)
+            time.sleep(0.01)
+            return item * 2
+
+        with AdaptiveExecutor(limit) as executor:
+            results = list(executor.map(task, range(8)))
+        self.assertEqual(results, list(range(0, 16, 2)))
+        self.assertLessEqual(max(running), 2)
+        self.assertEqual(limit.in_flight, 0)
+
+    def test_nested_executor(self):
+        from google_objects.core import GoogleClient
+
+        client = GoogleClient(
+            factory=mock.Mock, concurrency=AdaptiveLimit(initial=1)
+        )
+
+        def outer(item):
+            return sum(client.map(lambda x: x * item, [1, 2], workers=None))
+
+        done = []
+        thread = threading.Thread(target=lambda: done.append(
+            client.map(outer, [1, 2], workers=None)
+        ))
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+        self.assertEqual(done, [[3, 6]])
+        self.assertEqual(client.concurrency.in_flight, 0)
+
+    def test_executor_throttled(self):
+        limit = AdaptiveLimit(initial=8, cooldown=60)
+
+        def task(item):
+            # a call within the task, whose error the task handles
+            try:
+                with limit.slot():
+                    raise http_error(429)
+            except Exception:
+                return item
+
+        with AdaptiveExecutor(limit) as executor:
+            self.assertEqual(list(executor.map(task, range(4))),
+                             list(range(4)))
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.throttled_count, 4)
+
+        # reported once when it ends the task too
+        def fail():
+            raise http_error(503)
+
+        with self.assertRaises(Exception):
+            limit.call(limit.call, fail)
+        self.assertEqual(limit.throttled_count, 5)
+
+
+class TestQuotaFeedback(unittest.TestCase):
+    """Test adaptive limits against the fake API's quota"""
+
+    def test_backoff(self):
+        from google_objects.sheets import SheetsClient
+        from google_objects.testing import FakeGoogleAPI
+
+        # a quota below one request answers every request with a 429
+        with FakeGoogleAPI(latency=0.01, quota=0.5) as api:
+            spreadsheet_id = api.add_spreadsheet('Data', {'Data': [['a']]})
+            client = SheetsClient.from_api_key('fake', base_url=api.url)
+            other = SheetsClient.from_api_key('fake', base_url=api.url)
+            self.assertIs(client.concurrency, other.concurrency)
+
+            def read(row):
+                try:
+                    client.get_values(spreadsheet_id, 'Data!A{}'.format(row))
+                except Exception as e:
+                    return throttled(e)
+
+            initial = client.concurrency.limit
+            results = client.map(read, range(1, 61), workers=None)
+
+        self.assertTrue(all(results))
+        self.assertEqual(api.throttled_count, 60)
+        self.assertLess(client.concurrency.limit, initial)
+        self.assertLessEqual(api.max_in_flight, initial)
+
+    def test_batch_throttled(self):
+        from google_objects.sheets import SheetsClient
+        from google_objects.testing import FakeError
+        from google_objects.testing import FakeGoogleAPI
+
+        with FakeGoogleAPI() as api:
+            spreadsheet_id = api.add_spreadsheet('Data', {'Data': [['a']]})
+            client = SheetsClient.from_api_key('batches', base_url=api.url)
+            client.adaptive = True
+            client.batch_size = 2
+            values = client.resource.spreadsheets().values()
+            requests = [values.get(spreadsheetId=spreadsheet_id,
+                                   range='Data!A{}'.format(row))
+                        for row in range(1, 7)]
+
+            # only the first request of the first batch is throttled
+            checks = []
+
+            def check_quota(query, headers):
+                checks.append(query)
+                if len(checks) == 1:
+                    raise FakeError(429, 'Rate Limit Exceeded')
+
+            api._check_quota = check_quota
+            with mock.patch.object(client.concurrency, 'throttle') as \
+                    throttle, self.assertRaises(Exception) as caught:
+                client.execute_batch(requests)
+
+        self.assertEqual(len(checks), 6)
+        self.assertTrue(throttled(caught.exception))
+        throttle.assert_called_once_with()
+
+    def test_explicit_workers(self):
+        from google_objects.sheets import SheetsClient
+        from google_objects.testing import FakeGoogleAPI
+
+        with FakeGoogleAPI(latency=0.05) as api:
+            spreadsheet_id = api.add_spreadsheet('Data', {'Data': [['a']]})
+            client = SheetsClient.from_api_key(
+                'explicit', base_url=api.url
+            )
+            client.concurrency = AdaptiveLimit(initial=1)
+            client.map(
+                lambda row: client.get_values(
+                    spreadsheet_id, 'Data!A{}'.format(row)
+                ), range(1, 9), workers=4
+            )
+
+        # not bound by the limit unless adaptive
+        self.assertGreater(api.max_in_flight, 1)
@@ -0,0 +1,77 @@
+import time
+import unittest
+from wsgiref.util import setup_testing_defaults
+
+from google_objects.drive import DriveClient
+from google_objects.push import NotificationReceiver
+from google_objects.testing import FakeGoogleAPI
+
+
+class TestNotificationReceiver(unittest.TestCase):
+    """Test push notification coalescing and channel renewal"""
+
+    def setUp(self):
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        client = DriveClient.from_api_key('fake', base_url=self.api.url)
+        self.receiver = NotificationReceiver(
+            client, 'https://example.com/hook', delay=1
+        )
+        self.received = []
+        self.receiver.add_handler(self.received.append)
+        self.file_id = self.api.add_file('Report', 'text/plain')
+        self.channel = self.receiver.watch(self.file_id)
+
+    def post(self, state='update', token=None, **headers):
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'HTTP_X_GOOG_CHANNEL_ID': self.channel.id,
+            'HTTP_X_GOOG_CHANNEL_TOKEN': token or self.channel.token,
+            'HTTP_X_GOOG_RESOURCE_STATE': state,
+        }
+        environ.update(headers)
+        setup_testing_defaults(environ)
+
+        statuses = []
+        self.receiver(environ, lambda status, headers: statuses.append(status))
+        return statuses[0]
+
+    def test_coalesce(self):
+        self.assertEqual(self.post('sync'), '200 OK')
+        self.assertEqual(self.post(HTTP_X_GOOG_CHANGED='content'), '200 OK')
+        self.assertEqual(self.post(HTTP_X_GOOG_CHANGED='properties'),
+                         '200 OK')
+
+        self.assertEqual(self.receiver.poll(), 0)
+        self.assertEqual(self.receiver.poll(time.time() + 1), 1)
+        notification, = self.received
+        self.assertEqual(notification.file_id, self.file_id)
+        self.assertEqual(notification.count, 2)
+        self.assertEqual(notification.states, {'update'})
+        self.assertEqual(notification.changed, {'content', 'properties'})
+
+    def test_max_delay(self):
+        start = time.time()
+        for i in range(20):
+            self.receiver.notify(self.file_id, 'update', now=start + i)
+            self.receiver.poll(start + i)
+        self.assertEqual([n.count for n in self.received], [11])
+
+    def test_invalid(self):
+        self.assertEqual(self.post(token='forged'), '403 Forbidden')
+        self.assertEqual(
+            self.post(HTTP_X_GOOG_CHANNEL_ID='unknown'), '404 Not Found'
+        )
+        self.receiver.poll(float('inf'))
+        self.assertEqual(self.received, [])
+
+    def test_renew(self):
+        self.assertEqual(self.receiver.renew(), [])
+
+        renewed, = self.receiver.renew(self.channel.expiration)
+        self.assertNotEqual(renewed.id, self.channel.id)
+        self.assertEqual(list(self.receiver.channels), [renewed.id])
+        self.assertEqual(list(self.api.channels), [renewed.id])
+
+        self.receiver.stop()
+        self.assertEqual(self.api.channels, {})
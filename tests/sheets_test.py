@@ -17,6 +17,8 @@ values = get_data('range')
 mock_resource = mock.Mock()
 mock_resource.spreadsheets().get().execute.return_value = spreadsheet
 mock_resource.spreadsheets().values().get().execute.return_value = values
+mock_resource.spreadsheets().create().execute.return_value = spreadsheet
+mock_resource.spreadsheets().values().append().execute.return_value = {}
 
 
 class TestSheets(unittest.TestCase):
@@ -60,3 +62,369 @@ class TestSheets(unittest.TestCase):
         sheets = spreadsheet.sheets()
         values = sheets[0].dataframe()
         self.assertIsInstance(values, pandas.DataFrame)
+
+    def test_create_from_rows(self):
+        append = mock_resource.spreadsheets().values().append
+        append.reset_mock()
+
+        rows = ([i, i * 2] for i in range(25))
+        spreadsheet = self.client.create_spreadsheet_from_rows(
+            rows, chunk_size=10, title='Streamed'
+        )
+        self.assertIsInstance(spreadsheet, Spreadsheet)
+
+        # header is sent on creation, remaining 24 rows in 3 chunks
+        calls = [c for c in append.call_args_list if c[1]]
+        self.assertEqual(len(calls), 3)
+        sent = [row for c in calls for row in c[1]['body']['values']]
+        self.assertEqual(sent, [[i, i * 2] for i in range(1, 25)])
+
+
+class TestSyncDataFrame(unittest.TestCase):
+    """Test differential dataframe syncs against the fake API"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        self.spreadsheet_id = self.api.add_spreadsheet('Data')
+        self.frame = pandas.DataFrame({
+            'id': range(10),
+            'name': ['row {}'.format(i) for i in range(10)],
+            'score': [i * 1.5 for i in range(10)],
+            'active': [i % 2 == 0 for i in range(10)],
+        })
+
+    def sync(self, frame):
+        sheet = self.client.get_spreadsheet(self.spreadsheet_id).sheets()[0]
+        with mock.patch.object(self.client, 'push_updates',
+                               wraps=self.client.push_updates) as push:
+            changes = sheet.sync_dataframe(frame, key='id')
+
+        rows = self.api.values(self.spreadsheet_id, 'Sheet1')
+        self.assertEqual(rows[0], list(frame.columns))
+        self.assertEqual(rows[1:], frame.values.tolist())
+        requests = push.call_args[0][1] if push.called else []
+        return changes, requests
+
+    def test_sync(self):
+        changes, _ = self.sync(self.frame)
+        self.assertEqual(changes, (10, 0, 0))
+
+        frame = self.frame.drop([2, 3, 7])
+        frame.loc[5, 'score'] = 100.0
+        frame.loc[11] = [11, 'new', 0.5, True]
+        frame = pandas.concat([frame.iloc[:1], pandas.DataFrame(
+            [[20, 'first', 1.0, False]], columns=frame.columns
+        ), frame.iloc[1:]])
+
+        changes, requests = self.sync(frame)
+        self.assertEqual(changes, (2, 1, 3))
+        kinds = [next(iter(request)) for request in requests]
+        self.assertEqual(kinds, [
+            'deleteDimension', 'deleteDimension',
+            'insertDimension', 'updateCells',
+            'updateCells',
+            'insertDimension', 'updateCells',
+        ])
+        # only the changed score is written for the updated row
+        update = requests[4]['updateCells']
+        self.assertEqual(update['start']['columnIndex'], 2)
+        self.assertEqual(len(update['rows'][0]['values']), 1)
+
+        changes, requests = self.sync(frame)
+        self.assertEqual(changes, (0, 0, 0))
+        self.assertEqual(requests, [])
+
+    def test_reorder(self):
+        self.sync(self.frame)
+        changes, _ = self.sync(self.frame.iloc[::-1])
+        self.assertEqual(changes, (10, 0, 10))
+
+    def test_wide_frame(self):
+        frame = pandas.DataFrame({'c{}'.format(i): [str(i)] * 2
+                                  for i in range(30)})
+        frame['id'] = [1, 2]
+        changes, requests = self.sync(frame)
+        self.assertEqual(changes, (2, 0, 0))
+        self.assertEqual(requests[0], {'appendDimension': {
+            'sheetId': 0, 'dimension': 'COLUMNS', 'length': 5
+        }})
+        # digit strings stay strings
+        self.assertEqual(self.api.values(self.spreadsheet_id, 'Sheet1')[1][0],
+                         '0')
+
+    def test_resized_grid(self):
+        sheet = self.client.get_spreadsheet(self.spreadsheet_id).sheets()[0]
+        grid = self.api.spreadsheets[self.spreadsheet_id]['sheets'][0][
+            'properties']['gridProperties']
+
+        # grown, grown again on a changed header, shrunk, then regrown
+        for size, label in ((1500, 'id'), (3000, 'key'), (10, 'id'),
+                            (1500, 'key')):
+            frame = pandas.DataFrame({label: range(size)})
+            sheet.sync_dataframe(frame, key=label)
+            self.assertEqual(grid['rowCount'], size + 1)
+            self.assertEqual(
+                sheet.properties['gridProperties']['rowCount'], size + 1
+            )
+
+    def test_duplicate_keys(self):
+        frame = pandas.concat([self.frame, self.frame])
+        sheet = self.client.get_spreadsheet(self.spreadsheet_id).sheets()[0]
+        with self.assertRaises(ValueError):
+            sheet.sync_dataframe(frame, key='id')
+
+
+class TestNamedRanges(unittest.TestCase):
+    """Test named ranges against the fake API"""
+
+    def test_named_range(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        api = FakeGoogleAPI().start()
+        self.addCleanup(api.stop)
+        client = SheetsClient.from_api_key('fake', base_url=api.url)
+        rows = [[i] * 30 for i in range(5)]
+        spreadsheet_id = api.add_spreadsheet('Data', {"Q1 '21": rows})
+
+        client.push_updates(spreadsheet_id, [{'addNamedRange': {
+            'namedRange': {'name': 'wide', 'range': {
+                'sheetId': 0, 'startRowIndex': 1, 'endRowIndex': 3,
+                'startColumnIndex': 26, 'endColumnIndex': 28,
+            }}
+        }}])
+
+        spreadsheet = client.get_spreadsheet(spreadsheet_id)
+        named_range = spreadsheet.get_named_range_by_name('wide')
+        self.assertIsNotNone(named_range.id)
+        self.assertEqual(named_range.as_a1(), "'Q1 ''21'!AA2:AB3")
+        self.assertEqual(named_range.get_block().values,
+                         [['1', '1'], ['2', '2']])
+
+
+class TestSpreadsheetUpdates(unittest.TestCase):
+    """Test queued spreadsheet updates against the fake API"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        spreadsheet_id = self.api.add_spreadsheet('Data')
+        self.spreadsheet = self.client.get_spreadsheet(spreadsheet_id)
+
+    def test_update(self):
+        added = []
+        with self.spreadsheet as spreadsheet:
+            self.assertTrue(spreadsheet.add_update(
+                {'addSheet': {'properties': {'title': 'New'}}}, added.append
+            ))
+            self.assertFalse(spreadsheet.add_update('not a request'))
+
+        sheet_id = added[0]['addSheet']['properties']['sheetId']
+        self.assertEqual(self.spreadsheet['New'].id, sheet_id)
+        self.assertEqual(self.spreadsheet.sheet_title(sheet_id), 'New')
+
+        self.spreadsheet.add_update({'addNamedRange': {'namedRange': {
+            'name': 'header', 'range': {'sheetId': sheet_id, 'endRowIndex': 1}
+        }}})
+        self.spreadsheet.add_update({'updateSheetProperties': {
+            'properties': {'sheetId': sheet_id, 'title': 'Renamed'},
+            'fields': 'title',
+        }})
+        replies = self.spreadsheet.update()
+        self.assertEqual(len(replies), 2)
+        self.assertEqual(self.spreadsheet.update(), [])
+
+        named_range = self.spreadsheet.get_named_range_by_name('header')
+        self.assertEqual(named_range.as_a1(), "'Renamed'!1:1")
+
+    def test_auto_flush(self):
+        self.spreadsheet.max_updates = 3
+        requests = self.api.request_count
+        for i in range(7):
+            self.spreadsheet.add_update(
+                {'addSheet': {'properties': {'title': str(i)}}}
+            )
+        self.assertEqual(self.api.request_count - requests, 2)
+        self.spreadsheet.update()
+        self.assertEqual(self.api.request_count - requests, 3)
+        self.assertEqual(len(self.spreadsheet.sheets()), 8)
+
+    def test_background(self):
+        self.spreadsheet.background = True
+        self.spreadsheet.max_bytes = 200
+        for i in range(20):
+            self.spreadsheet.add_update(
+                {'addSheet': {'properties': {'title': str(i)}}}
+            )
+        self.spreadsheet.update()
+
+        titles = [sheet.title for sheet in self.spreadsheet.sheets()]
+        self.assertEqual(titles, ['Sheet1'] + [str(i) for i in range(20)])
+        self.assertGreater(self.api.request_count, 3)
+
+
+class TestIterRows(unittest.TestCase):
+    """Test windowed reads against the fake API"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        self.rows = [['id', 'square']] + [[i, i * i] for i in range(95)]
+        # inner empty rows spanning a window boundary
+        self.rows[48:53] = [[]] * 5
+        spreadsheet_id = self.api.add_spreadsheet('Data', {'Data': self.rows})
+        spreadsheet = self.client.get_spreadsheet(spreadsheet_id)
+        self.sheet = spreadsheet.sheets()[0]
+
+    def test_iter_rows(self):
+        requests = self.api.request_count
+        rows = list(self.sheet.iter_rows(window=10, prefetch=3))
+        self.assertEqual(rows, [[str(v) for v in r] for r in self.rows])
+
+        row_count = self.sheet.properties['gridProperties']['rowCount']
+        windows = -(-row_count // 10)
+        self.assertEqual(self.api.request_count - requests, windows)
+
+    def test_iter_dataframes(self):
+        frames = list(self.sheet.iter_dataframes(
+            chunksize=40, valueRenderOption='UNFORMATTED_VALUE'
+        ))
+        self.assertEqual([len(f) for f in frames], [40, 40, 15])
+        frame = pandas.concat(frames, ignore_index=True)
+        self.assertEqual(list(frame.columns), ['id', 'square'])
+        self.assertEqual(frame['square'].iloc[-1], str(94 * 94))
+
+
+class TestPushdown(unittest.TestCase):
+    """Test column selection and server side queries against the fake"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        rows = [['name', 'status', 'total', 'note', 'owner']] + [
+            ['row{}'.format(i), 'open' if i % 3 else 'closed', i * 10,
+             'n', 'o{}'.format(i % 2)]
+            for i in range(12)
+        ]
+        spreadsheet_id = self.api.add_spreadsheet('Data', {'Data': rows})
+        spreadsheet = self.client.get_spreadsheet(spreadsheet_id)
+        self.sheet = spreadsheet.sheets()[0]
+
+    def test_select(self):
+        requests = self.api.request_count
+        block = self.sheet.select(['total', 'name', 'E'])
+        # the header row, then one batchGet
+        self.assertEqual(self.api.request_count - requests, 2)
+
+        rows = block.rows()
+        self.assertEqual(rows[0], ['total', 'name', 'owner'])
+        self.assertEqual(rows[3], ['20', 'row2', 'o0'])
+        self.assertEqual(len(rows), 13)
+
+    def test_query(self):
+        block = self.sheet.query(
+            "`total` >= 50 and B = 'open'", columns=['name', 'total'],
+            order_by='total', descending=True, limit=3
+        )
+        self.assertEqual(block.rows(), [
+            ['name', 'total'],
+            ['row11', '110'],
+            ['row10', '100'],
+            ['row8', '80'],
+        ])
+
+        frame = block.dataframe()
+        self.assertEqual(list(frame['name']), ['row11', 'row10', 'row8'])
+
+    def test_unknown_label(self):
+        with self.assertRaises(ValueError):
+            self.sheet.query('`missing` > 1')
+        with self.assertRaises(KeyError):
+            self.sheet.select(['name', 'missing'])
+
+    def test_query_values(self):
+        with mock.patch.object(self.client, '_execute',
+                               wraps=self.client._execute) as execute:
+            rows = self.client.query_values(
+                self.sheet.spreadsheet.id, 'select A where C > 100'
+            )
+        self.assertEqual(rows, [['name'], ['row11']])
+
+        request = execute.call_args[0][0]
+        self.assertEqual(request.methodId, 'sheets.gviz.query')
+        self.assertIn('key=fake', request.uri)
+
+
+class TestArrow(unittest.TestCase):
+    """Test Arrow reads and writes against the fake API"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        spreadsheet_id = self.api.add_spreadsheet('Lake', {'Lake': []})
+        self.spreadsheet = self.client.get_spreadsheet(spreadsheet_id)
+        self.sheet = self.spreadsheet.sheets()[0]
+
+    def test_round_trip(self):
+        import pyarrow
+
+        table = pyarrow.table({
+            'name': ['a', 'b, c', None, 'd'],
+            'total': [1.5, 2.0, None, 4.25],
+            'done': [True, False, True, None],
+        })
+        self.spreadsheet.max_bytes = 40
+        self.assertEqual(self.sheet.write_arrow(table), 5)
+
+        result = self.sheet.to_arrow(window=2)
+        self.assertEqual(result.schema, pyarrow.schema([
+            ('name', pyarrow.string()),
+            ('total', pyarrow.float64()),
+            ('done', pyarrow.bool_()),
+        ]))
+        self.assertEqual(result.to_pydict(), table.to_pydict())
+
+    def test_schema(self):
+        import pyarrow
+
+        self.sheet.write_arrow(pyarrow.table({'code': [7, 8]}))
+        self.sheet.write_arrow(pyarrow.table({'code': ['x']}), 3, False)
+        with self.assertRaises(ValueError):
+            self.sheet.to_arrow(window=1)
+
+        schema = pyarrow.schema([('code', pyarrow.string())])
+        table = self.sheet.to_arrow(window=1, schema=schema)
+        self.assertEqual(table.column('code').to_pylist(), ['7', '8', 'x'])
+
+    def test_literal_strings(self):
+        import pyarrow
+
+        codes = ['7', '=1+1', '1/2', 'x']
+        self.spreadsheet.add_update({'updateSheetProperties': {
+            'properties': {'sheetId': self.sheet.id, 'title': 'Queued'},
+            'fields': 'title',
+        }})
+        self.sheet.write_arrow(pyarrow.table({'code': codes}))
+
+        # written as typed strings, never parsed as user input
+        rows = self.api.values(self.spreadsheet.id, 'Lake')
+        self.assertEqual(rows, [['code']] + [[code] for code in codes])
+        self.assertEqual(self.sheet.to_arrow().column('code').to_pylist(),
+                         codes)
+        # queued updates are left for the caller to send
+        self.assertEqual(len(self.spreadsheet.update()), 1)
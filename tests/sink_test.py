@@ -0,0 +1,95 @@
+import time
+import logging
+import unittest
+from unittest import mock
+
+from google_objects.limits import TokenBucket
+from google_objects.sheets import SheetsClient
+from google_objects.sink import AppendSink
+
+
+class TestAppendSink(unittest.TestCase):
+    """Test buffered appends against the fake API"""
+
+    def setUp(self):
+        from google_objects.testing import FakeGoogleAPI
+
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        self.spreadsheet_id = self.api.add_spreadsheet(
+            'Events', {'Events': [['n', 'square']]}
+        )
+        spreadsheet = self.client.get_spreadsheet(self.spreadsheet_id)
+        self.sheet = spreadsheet.sheets()[0]
+
+    def rows(self):
+        return self.client.get_values(self.spreadsheet_id, 'Events').rows()
+
+    def test_batches(self):
+        requests = self.api.request_count
+        with self.sheet.append_sink(max_rows=40, interval=60,
+                                    limiter=TokenBucket(1000)) as sink:
+            for i in range(100):
+                sink.append([i, i * i])
+
+        self.assertEqual(sink.batches_sent, 3)
+        self.assertEqual(self.api.request_count - requests, 3)
+        self.assertEqual(self.rows()[1:],
+                         [[str(i), str(i * i)] for i in range(100)])
+
+    def test_interval(self):
+        sink = self.sheet.append_sink(interval=0.05)
+        self.addCleanup(sink.close)
+        sink.append([1, 1])
+        deadline = time.monotonic() + 5
+        while sink.rows_sent < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sink.rows_sent, 1)
+        self.assertEqual(len(sink), 0)
+
+    def test_backpressure(self):
+        sink = self.sheet.append_sink(max_rows=2, max_pending=4, interval=60,
+                                      limiter=TokenBucket(20, capacity=1))
+        start = time.monotonic()
+        sink.extend([[i, i] for i in range(12)])
+        # rows beyond max_pending wait for batches sent at 20 per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertLessEqual(len(sink), 4)
+        sink.close()
+        self.assertEqual(len(self.rows()), 13)
+
+    def test_error(self):
+        client = mock.Mock()
+        client.append_values.side_effect = [IOError('quota'), None]
+        sink = AppendSink(client, 'abc123', 'Events', interval=0.01,
+                          limiter=TokenBucket(1000))
+        sink.append([1])
+        with self.assertRaises(IOError):
+            sink.flush()
+        # the failed batch is retried
+        sink.close()
+        self.assertEqual(client.append_values.call_count, 2)
+
+    def test_handler(self):
+        logger = logging.getLogger('tests.sink')
+        logger.propagate = False
+        handler = self.sheet.append_sink(limiter=TokenBucket(1000))
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        logger.warning('disk at %d%%', 91)
+        handler.close()
+
+        row = self.rows()[1]
+        self.assertEqual(row[1:], ['WARNING', 'tests.sink', 'disk at 91%'])
+
+    def test_own_records(self):
+        sink = AppendSink(mock.Mock(), 'id', 'A1', interval=60)
+        for name in ('google_objects.sink', 'googleapiclient.http',
+                     'httplib2', 'google_objectsx'):
+            sink.handle(logging.makeLogRecord({'name': name, 'msg': 'x'}))
+        # only the unrelated logger's record is kept
+        self.assertEqual(len(sink), 1)
+        sink.close()
@@ -0,0 +1,126 @@
+import unittest
+
+from google_objects.drive import DriveClient
+from google_objects.sheets import SheetsClient
+from google_objects.slides import SlidesClient
+from google_objects.testing import FakeGoogleAPI
+
+from tests.utils import get_data
+
+
+class TestFakeGoogleAPI(unittest.TestCase):
+    """Test the clients against the local fake API"""
+
+    def setUp(self):
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+
+    def test_drive(self):
+        folder = self.api.add_file('Folder')
+        for i in range(5):
+            self.api.add_file('Sheet {}'.format(i),
+                              'application/vnd.google-apps.spreadsheet',
+                              parents=[folder])
+
+        client = DriveClient.from_api_key('fake', base_url=self.api.url)
+        files = client.list_files('spreadsheet', [folder], page_size=2)
+        self.assertEqual(len(files), 5)
+
+        copy = files[0].copy('Copied', [folder])
+        self.assertEqual(client.get_file(copy.id).name, 'Copied')
+
+        permission = copy.add_permission('friend@example.com', role='reader')
+        self.assertEqual(permission.email, 'friend@example.com')
+
+    def test_sheets(self):
+        spreadsheet_id = self.api.add_spreadsheet(
+            'Report', {'Data': [['a', 'b'], ['1', '2']]}
+        )
+
+        client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        spreadsheet = client.get_spreadsheet(spreadsheet_id)
+        self.assertEqual(spreadsheet.title, 'Report')
+
+        sheet = spreadsheet['Data']
+        self.assertEqual(sheet.values().rows(), [['a', 'b'], ['1', '2']])
+
+        client.append_values(spreadsheet_id, 'Data', [[3, 4]])
+        self.assertEqual(sheet.values().rows()[-1], ['3', '4'])
+
+        created = client.create_spreadsheet_from_rows(
+            iter([['x'], [1], [2]]), chunk_size=1, title='Streamed'
+        )
+        self.assertEqual(self.api.values(created.id, 'Streamed'),
+                         [['x'], [1], [2]])
+
+    def test_slides(self):
+        presentation_id = self.api.add_presentation(get_data('presentation'))
+
+        client = SlidesClient.from_api_key('fake', base_url=self.api.url)
+        presentation = client.get_presentation(presentation_id)
+        self.assertEqual(presentation.id, presentation_id)
+
+        with presentation:
+            presentation.replace_text('foo', 'bar')
+
+    def test_batch(self):
+        file_ids = [self.api.add_file('File {}'.format(i)) for i in range(3)]
+        client = DriveClient.from_api_key('fake', base_url=self.api.url)
+
+        names = {}
+        batch = client.resource.new_batch_http_request(
+            callback=lambda request_id, response, error:
+                names.update({response['id']: response['name']})
+        )
+        for file_id in file_ids:
+            batch.add(client.resource.files().get(fileId=file_id))
+        batch.execute()
+
+        self.assertEqual(
+            names, {i: self.api.files[i]['name'] for i in file_ids}
+        )
+
+    def test_quota(self):
+        from googleapiclient.errors import HttpError
+
+        self.api.quota = 2
+        self.api.add_file('Folder', id='folder')
+        client = DriveClient.from_api_key('fake', base_url=self.api.url)
+
+        with self.assertRaises(HttpError) as context:
+            for _ in range(10):
+                client.get_file('folder')
+
+        self.assertEqual(context.exception.resp.status, 429)
+        self.assertGreater(self.api.throttled_count, 0)
+
+    def test_grid_limits(self):
+        from googleapiclient.errors import HttpError
+
+        spreadsheet_id = self.api.add_spreadsheet('Report', {'Data': []})
+        client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        update = {'updateCells': {
+            'start': {'sheetId': 0, 'rowIndex': 1000, 'columnIndex': 0},
+            'rows': [{'values': [{'userEnteredValue': {'numberValue': 1}}]}],
+            'fields': 'userEnteredValue',
+        }}
+
+        with self.assertRaises(HttpError) as context:
+            client.push_updates(spreadsheet_id, [update])
+        self.assertEqual(context.exception.resp.status, 400)
+
+        client.push_updates(spreadsheet_id, [{'appendDimension': {
+            'sheetId': 0, 'dimension': 'ROWS', 'length': 1
+        }}, update])
+        self.assertEqual(self.api.values(spreadsheet_id, 'Data')[1000], [1])
+
+    def test_upload_range(self):
+        _, headers, _ = self.api.handle(
+            'POST', '/upload/drive/v3/files?uploadType=resumable', {}, b'{}'
+        )
+        location = headers['Location'][len(self.api.url) - 1:]
+
+        status, _, _ = self.api.handle(
+            'PUT', location, {'Content-Range': 'bytes 4-3/4'}, b''
+        )
+        self.assertEqual(status, 400)
@@ -0,0 +1,49 @@
+import unittest
+
+from google_objects.sheets import SheetsClient
+from google_objects.testing import FakeGoogleAPI
+from google_objects.transport import USER_AGENT
+
+
+class CompressingClient(SheetsClient):
+    compress_min_size = 1024
+
+
+class TestGzipTransport(unittest.TestCase):
+    """Test gzip negotiation against the fake API"""
+
+    def setUp(self):
+        self.api = FakeGoogleAPI().start()
+        self.addCleanup(self.api.stop)
+        self.rows = [['row {}'.format(i), 'same text'] for i in range(500)]
+
+    def test_responses(self):
+        spreadsheet_id = self.api.add_spreadsheet('Data', {'Data': self.rows})
+        client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+
+        block = client.get_values(spreadsheet_id, 'Data')
+        self.assertEqual(len(block.values), 500)
+        self.assertEqual(self.api.gzip_responses, 1)
+        self.assertEqual(client.stats.compressed_responses, 1)
+        self.assertGreater(client.stats.received_ratio, 4)
+        self.assertEqual(client.stats.compressed_requests, 0)
+
+    def test_requests(self):
+        client = CompressingClient.from_api_key('fake', base_url=self.api.url)
+        spreadsheet = client.create_spreadsheet_from_rows(self.rows)
+
+        self.assertEqual(self.api.gzip_requests, 1)
+        self.assertEqual(client.stats.compressed_requests, 1)
+        self.assertGreater(client.stats.sent_ratio, 4)
+
+        block = client.get_values(spreadsheet.id, 'A1:B')
+        self.assertEqual(block.values[-1], ['row 499', 'same text'])
+
+    def test_user_agent(self):
+        client = SheetsClient.from_api_key('fake', base_url=self.api.url)
+        http = client.resource._http
+        response, _ = http.request(self.api.url + 'v4/spreadsheets/missing',
+                                   headers={'user-agent': 'app/1.0'})
+        self.assertEqual(response.status, 404)
+        self.assertEqual(self.api.user_agents, {'app/1.0 ' + USER_AGENT})
+        self.assertEqual(client.stats.requests, 1)